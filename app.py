@@ -2,21 +2,23 @@ from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import requests
 import base64
 import os
 from openai import OpenAI
 from pathlib import Path
 import uuid
 import replicate
-import shutil
-from supabase import create_client, Client
-import asyncio
-import concurrent.futures
 import threading
-import aiohttp
 import aiofiles
-from bg_remover import remove_background
+from bg_worker_pool import bg_worker_pool, QueueFullError
+from executor_pools import executor_pools
+from job_queue import job_queue, JobWorker, JOB_EMBEDDED_WORKER
+from provider_limits import limit, provider_limits
+import resilience
+from resilience import call, call_async
+from replicate_runner import run_prediction
+from http_client import get_http_session, get_async_http_session, fetch_bytes_async, request_timeout, async_request_timeout, close_all_http_sessions
+from supabase_gateway import get_gateway
 from dotenv import load_dotenv
 
 # 환경변수 로드
@@ -38,13 +40,13 @@ app.add_middleware(
 
 print("[INIT] FastAPI 애플리케이션 초기화 시작")
 
-# Supabase 클라이언트 초기화
+# Supabase 게이트웨이 초기화 (프로세스당 하나의 클라이언트를 재사용)
 try:
-    print("[INIT] Supabase 클라이언트 초기화 시작")
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
-    print("[INIT] Supabase 클라이언트 초기화 완료")
+    print("[INIT] Supabase 게이트웨이 초기화 시작")
+    supabase = get_gateway(SUPABASE_URL, SUPABASE_ANON_KEY)
+    print("[INIT] Supabase 게이트웨이 초기화 완료")
 except Exception as e:
-    print(f"[ERROR] Supabase 클라이언트 초기화 실패: {str(e)}")
+    print(f"[ERROR] Supabase 게이트웨이 초기화 실패: {str(e)}")
 
 # OpenAI 클라이언트 초기화
 try:
@@ -54,7 +56,8 @@ try:
         print("[WARNING] OPENAI_ACCESS_KEY 환경변수가 설정되지 않았습니다.")
         client = None
     else:
-        client = OpenAI(api_key=openai_api_key)
+        # 재시도는 resilience 정책(백오프 + 서킷 브레이커)에서 한 번만 하도록 SDK 자체 재시도는 끔
+        client = OpenAI(api_key=openai_api_key, max_retries=0)
         print("[INIT] OpenAI 클라이언트 초기화 완료")
 except Exception as e:
     print(f"[ERROR] OpenAI 클라이언트 초기화 실패: {str(e)}")
@@ -68,6 +71,20 @@ try:
 except Exception as e:
     print(f"[ERROR] Replicate 클라이언트 초기화 실패: {str(e)}")
 
+def write_file_atomic(path: str, data: bytes):
+    """임시 파일에 쓴 뒤 이름을 바꿔 저장 (중간에 실패해도 불완전한 결과 파일이 남지 않음)"""
+    temp_path = f"{path}.part"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def reuse_step_result(path: str, step: str) -> bool:
+    """이전 시도에서 만든 유료 단계 결과 파일이 있으면 재사용 (작업 재시도 시 같은 단계를 다시 호출하지 않음)"""
+    if os.path.exists(path):
+        print(f"[BACKGROUND] {step}: 이전 시도의 결과 재사용: {path}")
+        return True
+    return False
+
 def encode_image(file_path):
     """이미지 파일을 base64로 인코딩"""
     print(f"[ENCODE] 이미지 인코딩 시작: {file_path}")
@@ -78,34 +95,41 @@ def encode_image(file_path):
         return base64_image
     except Exception as e:
         print(f"[ERROR] 이미지 인코딩 실패: {file_path}, 에러: {str(e)}")
-        return None
+        raise
 
 def create_file(file_path):
     print(f"[FILE_CREATE] OpenAI 파일 생성 시작: {file_path}")
     try:
-        with open(file_path, "rb") as file_content:
-            result = client.files.create(
-                file=file_content,
-                purpose="vision",
-            )
-            print(f"[FILE_CREATE] OpenAI 파일 생성 완료: {file_path}, ID: {result.id}")
-            return result.id
+        def upload():
+            with open(file_path, "rb") as file_content, limit("openai"):
+                return client.files.create(
+                    file=file_content,
+                    purpose="vision",
+                )
+
+        result = call("openai", upload)
+        print(f"[FILE_CREATE] OpenAI 파일 생성 완료: {file_path}, ID: {result.id}")
+        return result.id
     except Exception as e:
         print(f"[ERROR] OpenAI 파일 생성 실패: {file_path}, 에러: {str(e)}")
-        return None
+        raise
 
 async def download_image_from_url_async(url: str, save_path: str):
     """URL에서 이미지를 비동기로 다운로드하여 지정된 경로에 저장"""
     print(f"[DOWNLOAD] 이미지 다운로드 시작: {url} -> {save_path}")
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=300)) as response:
+        session = get_async_http_session()
+
+        async def download():
+            async with session.get(url, timeout=async_request_timeout()) as response:
                 response.raise_for_status()
                 print(f"[DOWNLOAD] 이미지 다운로드 응답 성공: {url}, 상태코드: {response.status}")
                 
                 async with aiofiles.open(save_path, "wb") as f:
                     async for chunk in response.content.iter_chunked(8192):
                         await f.write(chunk)
+
+        await call_async("image_download", download)
         
         file_size = os.path.getsize(save_path)
         print(f"[DOWNLOAD] 이미지 다운로드 완료: {save_path}, 파일 크기: {file_size} bytes")
@@ -118,8 +142,12 @@ def download_image_from_url(url: str, save_path: str):
     """URL에서 이미지를 다운로드하여 지정된 경로에 저장 (동기 버전)"""
     print(f"[DOWNLOAD] 이미지 다운로드 시작: {url} -> {save_path}")
     try:
-        response = requests.get(url, timeout=300)  # 5분으로 증가
-        response.raise_for_status()
+        def download():
+            response = get_http_session().get(url, timeout=request_timeout())
+            response.raise_for_status()
+            return response
+
+        response = call("image_download", download)
         print(f"[DOWNLOAD] 이미지 다운로드 응답 성공: {url}, 상태코드: {response.status_code}")
         
         with open(save_path, "wb") as f:
@@ -130,7 +158,7 @@ def download_image_from_url(url: str, save_path: str):
         return True
     except Exception as e:
         print(f"[ERROR] 이미지 다운로드 실패: {url}, 에러: {str(e)}")
-        return False
+        raise
 
 def cartoonify_image(image_url: str, output_path: str):
     """Replicate를 이용해 이미지를 캐리커쳐로 변환"""
@@ -141,22 +169,19 @@ def cartoonify_image(image_url: str, output_path: str):
         }
         
         print(f"[CARTOON] Replicate API 호출 시작")
-        output = replicate_client.run(
-            "flux-kontext-apps/cartoonify",
-            input=input_data
-        )
+        # 예측 생성 요청만 재시도하고(유료 예측이 중복 생성되지 않도록) 결과는 폴링으로 기다림
+        output = run_prediction(replicate_client, "flux-kontext-apps/cartoonify", input_data)
         print(f"[CARTOON] Replicate API 호출 완료")
         
         print(f"[CARTOON] 결과 이미지 저장 시작: {output_path}")
-        with open(output_path, "wb") as file:
-            file.write(output.read())
+        write_file_atomic(output_path, output.read())
         
         file_size = os.path.getsize(output_path)
         print(f"[CARTOON] 캐리커쳐 변환 완료: {output_path}, 파일 크기: {file_size} bytes")
         return True
     except Exception as e:
         print(f"[ERROR] 캐리커쳐 변환 실패: {image_url}, 에러: {str(e)}")
-        return False
+        raise
 
 def generate_face_swap_with_responses_api(base_image_path: str, face_image_path: str, output_path: str):
     """OpenAI Responses API를 이용해 얼굴 스왑 이미지 생성"""
@@ -167,10 +192,6 @@ def generate_face_swap_with_responses_api(base_image_path: str, face_image_path:
         base64_base = encode_image(base_image_path)
         base64_face = encode_image(face_image_path)
         
-        if not base64_base or not base64_face:
-            print(f"[ERROR] Base64 인코딩 실패")
-            return False
-        
         print(f"[FACE_SWAP] Base64 인코딩 완료")
         
         # 파일 ID 생성
@@ -178,10 +199,6 @@ def generate_face_swap_with_responses_api(base_image_path: str, face_image_path:
         file_id_base = create_file(base_image_path)
         file_id_face = create_file(face_image_path)
         
-        if not file_id_base or not file_id_face:
-            print(f"[ERROR] OpenAI 파일 ID 생성 실패")
-            return False
-        
         print(f"[FACE_SWAP] OpenAI 파일 ID 생성 완료: base={file_id_base}, face={file_id_face}")
         
         # /prompt = "Merge the face part of the second image with the face part of the first image, ensuring the result keeps the human facial shape and overall style of the first image. If a human face cannot be clearly detected in either image, leave the original face unchanged. Make the background completely transparent with no background color."
@@ -197,34 +214,39 @@ def generate_face_swap_with_responses_api(base_image_path: str, face_image_path:
         
         
         print(f"[FACE_SWAP] OpenAI Responses API 호출 시작")
-        response = client.responses.create(
-            model="gpt-4.1",
-            input=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "input_text", "text": prompt},
-                        {
-                            "type": "input_image",
-                            "image_url": f"data:image/png;base64,{base64_base}",
-                        },
-                        {
-                            "type": "input_image",
-                            "image_url": f"data:image/png;base64,{base64_face}",
-                        },
-                        {
-                            "type": "input_image",
-                            "file_id": file_id_base,
-                        },
+
+        def create_response():
+            with limit("openai"):
+                return client.responses.create(
+                    model="gpt-4.1",
+                    input=[
                         {
-                            "type": "input_image",
-                            "file_id": file_id_face,
+                            "role": "user",
+                            "content": [
+                                {"type": "input_text", "text": prompt},
+                                {
+                                    "type": "input_image",
+                                    "image_url": f"data:image/png;base64,{base64_base}",
+                                },
+                                {
+                                    "type": "input_image",
+                                    "image_url": f"data:image/png;base64,{base64_face}",
+                                },
+                                {
+                                    "type": "input_image",
+                                    "file_id": file_id_base,
+                                },
+                                {
+                                    "type": "input_image",
+                                    "file_id": file_id_face,
+                                }
+                            ],
                         }
                     ],
-                }
-            ],
-            tools=[{"type": "image_generation"}],
-        )
+                    tools=[{"type": "image_generation"}],
+                )
+
+        response = call("openai", create_response)
         print(f"[FACE_SWAP] OpenAI Responses API 호출 완료")
         
         # 이미지 생성 결과 추출
@@ -242,19 +264,17 @@ def generate_face_swap_with_responses_api(base_image_path: str, face_image_path:
         if image_data:
             print(f"[FACE_SWAP] 이미지 디코딩 및 저장 시작: {output_path}")
             image_base64 = image_data[0]
-            with open(output_path, "wb") as f:
-                f.write(base64.b64decode(image_base64))
+            write_file_atomic(output_path, base64.b64decode(image_base64))
             
             file_size = os.path.getsize(output_path)
             print(f"[FACE_SWAP] 얼굴 스왑 완료: {output_path}, 파일 크기: {file_size} bytes")
             return True
         
-        print(f"[ERROR] 생성된 이미지 데이터가 없음")
-        return False
+        raise RuntimeError("OpenAI 응답에 생성된 이미지 데이터가 없습니다.")
         
     except Exception as e:
         print(f"[ERROR] 얼굴 스왑 실패: {str(e)}")
-        return False
+        raise
 
 def upload_image_to_supabase(image_path: str, filename: str) -> str:
     """이미지를 Supabase Storage의 images 버킷에 업로드하고 공개 URL 반환"""
@@ -270,11 +290,8 @@ def upload_image_to_supabase(image_path: str, filename: str) -> str:
         
         # Supabase Storage에 업로드
         print(f"[UPLOAD] Supabase Storage 업로드 시작")
-        result = supabase.storage.from_("images").upload(
-            path=filename,
-            file=file_data,
-            file_options={"content-type": "image/png"}
-        )
+        # 재시도에서 같은 파일 이름으로 다시 올릴 수 있도록 덮어쓰기 허용
+        result = supabase.upload("images", filename, file_data, content_type="image/png", upsert=True)
         
         print(f"[UPLOAD] Supabase 업로드 응답 타입: {type(result)}")
         print(f"[UPLOAD] Supabase 업로드 응답 내용: {result}")
@@ -306,25 +323,24 @@ def upload_image_to_supabase(image_path: str, filename: str) -> str:
         if upload_success:
             # 공개 URL 생성
             print(f"[UPLOAD] 공개 URL 생성 시작")
-            public_url = supabase.storage.from_("images").get_public_url(filename)
+            public_url = supabase.get_public_url("images", filename)
             print(f"[UPLOAD] Supabase 업로드 완료: {public_url}")
             return public_url
         else:
-            print(f"[ERROR] Supabase 업로드 실패")
-            return None
+            raise RuntimeError(f"Supabase 업로드 실패: {result}")
             
     except Exception as e:
         print(f"[ERROR] Supabase 업로드 에러: {str(e)}")
-        return None
+        raise
 
-def create_job_record(job_id: str):
+async def create_job_record(job_id: str):
     """Supabase image 테이블에 새로운 job 레코드 생성"""
     print(f"[DB] job 레코드 생성 시작: {job_id}")
     try:
-        result = supabase.table("image").insert({
+        await supabase.insert_async("image", {
             "job_id": job_id,
             "url": None
-        }).execute()
+        })
         print(f"[DB] job 레코드 생성 완료: {job_id}")
         return True
     except Exception as e:
@@ -335,20 +351,21 @@ def update_job_result(job_id: str, image_url: str):
     """job 완료 후 결과 URL을 데이터베이스에 업데이트"""
     print(f"[DB] job 결과 업데이트 시작: {job_id} -> {image_url}")
     try:
-        result = supabase.table("image").update({
+        supabase.update("image", {
             "url": image_url
-        }).eq("job_id", job_id).execute()
+        }, {"job_id": job_id})
         print(f"[DB] job 결과 업데이트 완료: {job_id}")
         return True
     except Exception as e:
         print(f"[ERROR] job 결과 업데이트 실패: {job_id}, 에러: {str(e)}")
-        return False
-
-# ThreadPoolExecutor 초기화
-executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+        raise
 
 def process_face_swap_with_cartoon_sync(job_id: str, base_image_url: str, face_image_url: str):
-    """동기적으로 캐리커쳐 얼굴 스왑 작업을 수행 (ThreadPool에서 실행)"""
+    """
+    동기적으로 캐리커쳐 얼굴 스왑 작업을 수행 (ThreadPool에서 실행)
+    실패하면 원인 예외를 그대로 올려 작업 대기열이 last_error에 기록하고,
+    재시도에서는 이미 만든 캐리커쳐/얼굴 스왑 결과 파일을 재사용합니다.
+    """
     print(f"[BACKGROUND] 캐리커쳐 얼굴 스왑 백그라운드 작업 시작: {job_id}")
     
     try:
@@ -361,48 +378,40 @@ def process_face_swap_with_cartoon_sync(job_id: str, base_image_url: str, face_i
         # 1. 베이스 이미지 다운로드 (source 폴더에 저장)
         base_image_path = os.path.join("source", f"base_{job_id}.png")
         print(f"[BACKGROUND] 1단계: 베이스 이미지 다운로드 시작")
-        if not download_image_from_url(base_image_url, base_image_path):
-            print(f"[ERROR] 베이스 이미지 다운로드 실패")
-            return
+        download_image_from_url(base_image_url, base_image_path)
         print(f"[BACKGROUND] 1단계: 베이스 이미지 다운로드 완료")
         
         # 2. 얼굴 이미지를 캐리커쳐로 변환 (result 폴더에 저장)
         cartoon_image_path = os.path.join("result", f"cartoon_{job_id}.png")
-        print(f"[BACKGROUND] 2단계: 캐리커쳐 변환 시작")
-        if not cartoonify_image(face_image_url, cartoon_image_path):
-            print(f"[ERROR] 캐리커쳐 변환 실패")
-            return
-        print(f"[BACKGROUND] 2단계: 캐리커쳐 변환 완료")
+        if not reuse_step_result(cartoon_image_path, "2단계"):
+            print(f"[BACKGROUND] 2단계: 캐리커쳐 변환 시작")
+            cartoonify_image(face_image_url, cartoon_image_path)
+            print(f"[BACKGROUND] 2단계: 캐리커쳐 변환 완료")
         
         # 3. 얼굴 스왑 수행 (result 폴더에 저장)
         result_image_path = os.path.join("result", f"face_swapped_cartoon_{job_id}.png")
-        print(f"[BACKGROUND] 3단계: 얼굴 스왑 시작")
-        if not generate_face_swap_with_responses_api(base_image_path, cartoon_image_path, result_image_path):
-            print(f"[ERROR] 얼굴 스왑 실패")
-            return
-        print(f"[BACKGROUND] 3단계: 얼굴 스왑 완료")
+        if not reuse_step_result(result_image_path, "3단계"):
+            print(f"[BACKGROUND] 3단계: 얼굴 스왑 시작")
+            generate_face_swap_with_responses_api(base_image_path, cartoon_image_path, result_image_path)
+            print(f"[BACKGROUND] 3단계: 얼굴 스왑 완료")
         
         # 4. 결과 이미지를 Supabase Storage에 업로드
         filename = f"face_swapped_cartoon_{job_id}.png"
         print(f"[BACKGROUND] 4단계: Supabase 업로드 시작")
         uploaded_url = upload_image_to_supabase(result_image_path, filename)
-        
-        if not uploaded_url:
-            print(f"[ERROR] Supabase 업로드 실패")
-            return
         print(f"[BACKGROUND] 4단계: Supabase 업로드 완료")
         
         # 5. 데이터베이스에 결과 URL 업데이트
         print(f"[BACKGROUND] 5단계: 데이터베이스 업데이트 시작")
-        if not update_job_result(job_id, uploaded_url):
-            print(f"[ERROR] 데이터베이스 업데이트 실패")
-            return
+        update_job_result(job_id, uploaded_url)
         print(f"[BACKGROUND] 5단계: 데이터베이스 업데이트 완료")
         
         print(f"[BACKGROUND] 캐리커쳐 얼굴 스왑 백그라운드 작업 완료: {job_id}")
+        return True
         
     except Exception as e:
         print(f"[ERROR] 백그라운드 작업 에러: {job_id}, {str(e)}")
+        raise
     
     finally:
         # 임시 파일들 정리
@@ -424,20 +433,17 @@ async def process_face_swap_with_cartoon_background(job_id: str, base_image_url:
     """백그라운드에서 캐리커쳐 얼굴 스왑 작업을 비동기로 실행"""
     print(f"[ASYNC] 캐리커쳐 얼굴 스왑 비동기 작업 시작: {job_id}")
     
-    # ThreadPoolExecutor를 사용하여 CPU 집약적 작업을 별도 스레드에서 실행
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(
-        executor, 
-        process_face_swap_with_cartoon_sync, 
-        job_id, 
-        base_image_url, 
-        face_image_url
-    )
+    # 작업 종류별 스레드 풀에서 실행 (다른 종류의 느린 작업이 스레드를 모두 차지하지 않도록)
+    success = await executor_pools.run("face_swap_with_cartoon", process_face_swap_with_cartoon_sync, job_id, base_image_url, face_image_url)
     
     print(f"[ASYNC] 캐리커쳐 얼굴 스왑 비동기 작업 완료: {job_id}")
+    return success
 
 def process_face_swap_sync(job_id: str, base_image_url: str, face_image_url: str):
-    """동기적으로 일반 얼굴 스왑 작업을 수행 (ThreadPool에서 실행)"""
+    """
+    동기적으로 일반 얼굴 스왑 작업을 수행 (ThreadPool에서 실행)
+    실패하면 원인 예외를 그대로 올리고, 재시도에서는 이미 만든 얼굴 스왑 결과 파일을 재사용합니다.
+    """
     print(f"[BACKGROUND] 일반 얼굴 스왑 백그라운드 작업 시작: {job_id}")
     
     try:
@@ -450,48 +456,39 @@ def process_face_swap_sync(job_id: str, base_image_url: str, face_image_url: str
         # 베이스 이미지 다운로드 (source 폴더에 저장)
         base_image_path = os.path.join("source", f"base_{job_id}.png")
         print(f"[BACKGROUND] 1단계: 베이스 이미지 다운로드 시작")
-        if not download_image_from_url(base_image_url, base_image_path):
-            print(f"[ERROR] 베이스 이미지 다운로드 실패")
-            return
+        download_image_from_url(base_image_url, base_image_path)
         print(f"[BACKGROUND] 1단계: 베이스 이미지 다운로드 완료")
         
         # 얼굴 이미지 다운로드 (source 폴더에 저장)
         face_image_path = os.path.join("source", f"face_{job_id}.png")
         print(f"[BACKGROUND] 2단계: 얼굴 이미지 다운로드 시작")
-        if not download_image_from_url(face_image_url, face_image_path):
-            print(f"[ERROR] 얼굴 이미지 다운로드 실패")
-            return
+        download_image_from_url(face_image_url, face_image_path)
         print(f"[BACKGROUND] 2단계: 얼굴 이미지 다운로드 완료")
         
         # 얼굴 스왑 수행 (result 폴더에 저장)
         result_image_path = os.path.join("result", f"face_swapped_result_{job_id}.png")
-        print(f"[BACKGROUND] 3단계: 얼굴 스왑 시작")
-        if not generate_face_swap_with_responses_api(base_image_path, face_image_path, result_image_path):
-            print(f"[ERROR] 얼굴 스왑 실패")
-            return
-        print(f"[BACKGROUND] 3단계: 얼굴 스왑 완료")
+        if not reuse_step_result(result_image_path, "3단계"):
+            print(f"[BACKGROUND] 3단계: 얼굴 스왑 시작")
+            generate_face_swap_with_responses_api(base_image_path, face_image_path, result_image_path)
+            print(f"[BACKGROUND] 3단계: 얼굴 스왑 완료")
         
         # 결과 이미지를 Supabase Storage에 업로드
         filename = f"face_swapped_result_{job_id}.png"
         print(f"[BACKGROUND] 4단계: Supabase 업로드 시작")
         uploaded_url = upload_image_to_supabase(result_image_path, filename)
-        
-        if not uploaded_url:
-            print(f"[ERROR] Supabase 업로드 실패")
-            return
         print(f"[BACKGROUND] 4단계: Supabase 업로드 완료")
         
         # 데이터베이스에 결과 URL 업데이트
         print(f"[BACKGROUND] 5단계: 데이터베이스 업데이트 시작")
-        if not update_job_result(job_id, uploaded_url):
-            print(f"[ERROR] 데이터베이스 업데이트 실패")
-            return
+        update_job_result(job_id, uploaded_url)
         print(f"[BACKGROUND] 5단계: 데이터베이스 업데이트 완료")
         
         print(f"[BACKGROUND] 일반 얼굴 스왑 백그라운드 작업 완료: {job_id}")
+        return True
         
     except Exception as e:
         print(f"[ERROR] 백그라운드 작업 에러: {job_id}, {str(e)}")
+        raise
     
     finally:
         
@@ -513,20 +510,17 @@ async def process_face_swap_background(job_id: str, base_image_url: str, face_im
     """백그라운드에서 일반 얼굴 스왑 작업을 비동기로 실행"""
     print(f"[ASYNC] 일반 얼굴 스왑 비동기 작업 시작: {job_id}")
     
-    # ThreadPoolExecutor를 사용하여 CPU 집약적 작업을 별도 스레드에서 실행
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(
-        executor, 
-        process_face_swap_sync, 
-        job_id, 
-        base_image_url, 
-        face_image_url
-    )
+    # 작업 종류별 스레드 풀에서 실행 (다른 종류의 느린 작업이 스레드를 모두 차지하지 않도록)
+    success = await executor_pools.run("face_swap", process_face_swap_sync, job_id, base_image_url, face_image_url)
     
     print(f"[ASYNC] 일반 얼굴 스왑 비동기 작업 완료: {job_id}")
+    return success
 
 def process_cartoonify_sync(job_id: str, image_url: str):
-    """동기적으로 캐리커쳐 변환 작업을 수행 (ThreadPool에서 실행)"""
+    """
+    동기적으로 캐리커쳐 변환 작업을 수행 (ThreadPool에서 실행)
+    실패하면 원인 예외를 그대로 올리고, 재시도에서는 이미 만든 캐리커쳐 결과 파일을 재사용합니다.
+    """
     print(f"[BACKGROUND] 캐리커쳐 변환 백그라운드 작업 시작: {job_id}")
     
     try:
@@ -538,33 +532,28 @@ def process_cartoonify_sync(job_id: str, image_url: str):
         
         # 캐리커쳐 변환 (result 폴더에 저장)
         result_image_path = os.path.join("result", f"cartoon_only_{job_id}.png")
-        print(f"[BACKGROUND] 1단계: 캐리커쳐 변환 시작")
-        if not cartoonify_image(image_url, result_image_path):
-            print(f"[ERROR] 캐리커쳐 변환 실패")
-            return
-        print(f"[BACKGROUND] 1단계: 캐리커쳐 변환 완료")
+        if not reuse_step_result(result_image_path, "1단계"):
+            print(f"[BACKGROUND] 1단계: 캐리커쳐 변환 시작")
+            cartoonify_image(image_url, result_image_path)
+            print(f"[BACKGROUND] 1단계: 캐리커쳐 변환 완료")
         
         # 결과 이미지를 Supabase Storage에 업로드
         filename = f"cartoon_only_{job_id}.png"
         print(f"[BACKGROUND] 2단계: Supabase 업로드 시작")
         uploaded_url = upload_image_to_supabase(result_image_path, filename)
-        
-        if not uploaded_url:
-            print(f"[ERROR] Supabase 업로드 실패")
-            return
         print(f"[BACKGROUND] 2단계: Supabase 업로드 완료")
         
         # 데이터베이스에 결과 URL 업데이트
         print(f"[BACKGROUND] 3단계: 데이터베이스 업데이트 시작")
-        if not update_job_result(job_id, uploaded_url):
-            print(f"[ERROR] 데이터베이스 업데이트 실패")
-            return
+        update_job_result(job_id, uploaded_url)
         print(f"[BACKGROUND] 3단계: 데이터베이스 업데이트 완료")
         
         print(f"[BACKGROUND] 캐리커쳐 변환 백그라운드 작업 완료: {job_id}")
+        return True
         
     except Exception as e:
         print(f"[ERROR] 백그라운드 작업 에러: {job_id}, {str(e)}")
+        raise
     
     finally:
         # result 폴더의 파일 정리
@@ -580,16 +569,11 @@ async def process_cartoonify_background(job_id: str, image_url: str):
     """백그라운드에서 캐리커쳐 변환 작업을 비동기로 실행"""
     print(f"[ASYNC] 캐리커쳐 변환 비동기 작업 시작: {job_id}")
     
-    # ThreadPoolExecutor를 사용하여 CPU 집약적 작업을 별도 스레드에서 실행
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(
-        executor, 
-        process_cartoonify_sync, 
-        job_id, 
-        image_url
-    )
+    # 작업 종류별 스레드 풀에서 실행 (다른 종류의 느린 작업이 스레드를 모두 차지하지 않도록)
+    success = await executor_pools.run("cartoonify", process_cartoonify_sync, job_id, image_url)
     
     print(f"[ASYNC] 캐리커쳐 변환 비동기 작업 완료: {job_id}")
+    return success
 
 # Pydantic 모델 정의
 class FaceSwapRequest(BaseModel):
@@ -617,18 +601,19 @@ async def face_swap_with_cartoon(request: FaceSwapRequest):
     try:
         # 1. 데이터베이스에 job 레코드 생성
         print(f"[API] 데이터베이스에 job 레코드 생성 시작")
-        if not create_job_record(job_id):
+        if not await create_job_record(job_id):
             print(f"[ERROR] job 레코드 생성 실패")
             raise HTTPException(status_code=500, detail="작업 생성에 실패했습니다.")
         print(f"[API] 데이터베이스에 job 레코드 생성 완료")
         
-        # 2. 비동기 태스크 생성 (fire-and-forget)
-        print(f"[API] 비동기 태스크 생성")
-        asyncio.create_task(process_face_swap_with_cartoon_background(
-            job_id, 
-            request.base_image_url, 
-            request.face_image_url
-        ))
+        # 2. 작업 대기열에 등록 (워커 루프가 처리, 재시작 후에도 유지)
+        print(f"[API] 작업 대기열 등록")
+        await job_queue.enqueue_async("face_swap_with_cartoon", {
+            "job_id": job_id,
+            "base_image_url": request.base_image_url,
+            "face_image_url": request.face_image_url
+        }, job_id=job_id)
+        job_worker.notify()
         
         # 3. job_id 즉시 반환
         print(f"[API] /face-swap-with-cartoon job_id 반환: {job_id}")
@@ -658,18 +643,19 @@ async def face_swap(request: FaceSwapRequest):
     try:
         # 1. 데이터베이스에 job 레코드 생성
         print(f"[API] 데이터베이스에 job 레코드 생성 시작")
-        if not create_job_record(job_id):
+        if not await create_job_record(job_id):
             print(f"[ERROR] job 레코드 생성 실패")
             raise HTTPException(status_code=500, detail="작업 생성에 실패했습니다.")
         print(f"[API] 데이터베이스에 job 레코드 생성 완료")
         
-        # 2. 비동기 태스크 생성 (fire-and-forget)
-        print(f"[API] 비동기 태스크 생성")
-        asyncio.create_task(process_face_swap_background(
-            job_id, 
-            request.base_image_url, 
-            request.face_image_url
-        ))
+        # 2. 작업 대기열에 등록 (워커 루프가 처리, 재시작 후에도 유지)
+        print(f"[API] 작업 대기열 등록")
+        await job_queue.enqueue_async("face_swap", {
+            "job_id": job_id,
+            "base_image_url": request.base_image_url,
+            "face_image_url": request.face_image_url
+        }, job_id=job_id)
+        job_worker.notify()
         
         # 3. job_id 즉시 반환
         print(f"[API] /face-swap job_id 반환: {job_id}")
@@ -698,17 +684,18 @@ async def cartoonify_only(request: CartoonifyRequest):
     try:
         # 1. 데이터베이스에 job 레코드 생성
         print(f"[API] 데이터베이스에 job 레코드 생성 시작")
-        if not create_job_record(job_id):
+        if not await create_job_record(job_id):
             print(f"[ERROR] job 레코드 생성 실패")
             raise HTTPException(status_code=500, detail="작업 생성에 실패했습니다.")
         print(f"[API] 데이터베이스에 job 레코드 생성 완료")
         
-        # 2. 비동기 태스크 생성 (fire-and-forget)
-        print(f"[API] 비동기 태스크 생성")
-        asyncio.create_task(process_cartoonify_background(
-            job_id, 
-            request.image_url
-        ))
+        # 2. 작업 대기열에 등록 (워커 루프가 처리, 재시작 후에도 유지)
+        print(f"[API] 작업 대기열 등록")
+        await job_queue.enqueue_async("cartoonify", {
+            "job_id": job_id,
+            "image_url": request.image_url
+        }, job_id=job_id)
+        job_worker.notify()
         
         # 3. job_id 즉시 반환
         print(f"[API] /cartoonify-only job_id 반환: {job_id}")
@@ -733,22 +720,33 @@ async def get_job_status(job_id: str):
     
     try:
         # 데이터베이스에서 job 정보 조회
-        result = supabase.table("image").select("*").eq("job_id", job_id).execute()
+        rows = await supabase.select_async("image", "*", {"job_id": job_id})
         
-        if not result.data or len(result.data) == 0:
+        if not rows:
             print(f"[ERROR] job을 찾을 수 없음: {job_id}")
             raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
         
-        job_data = result.data[0]
+        job_data = rows[0]
         print(f"[API] job 데이터 조회 완료: {job_data}")
         
-        # url이 없으면 처리 중, 있으면 완료
+        # url이 없으면 처리 중, 있으면 완료 (대기열에서 최종 실패한 작업은 failed)
         if job_data["url"] is None:
+            queue_state = await job_queue.get_async(job_id)
+            if queue_state and queue_state["status"] == "failed":
+                return JSONResponse(content={
+                    "success": False,
+                    "job_id": job_id,
+                    "status": "failed",
+                    "message": f"작업이 실패했습니다: {queue_state['last_error']}",
+                    "attempts": queue_state["attempts"],
+                    "image_url": None
+                })
             return JSONResponse(content={
                 "success": True,
                 "job_id": job_id,
                 "status": "processing",
                 "message": "작업 처리 중입니다.",
+                "attempts": queue_state["attempts"] if queue_state else None,
                 "image_url": None
             })
         else:
@@ -778,45 +776,30 @@ async def remove_background_api(file: UploadFile = File(...)):
         if not file.filename.lower().endswith(('.png', '.jpg', '.jpeg')):
             raise HTTPException(status_code=400, detail="지원하지 않는 파일 형식입니다. PNG, JPG, JPEG 파일만 업로드하세요.")
         
-        # 2. 고유한 파일명 생성
+        # 2. 고유한 파일명 생성 (결과는 항상 PNG)
         file_id = str(uuid.uuid4())[:8]
         original_name = Path(file.filename).stem
-        file_extension = Path(file.filename).suffix
-        temp_filename = f"{original_name}_{file_id}{file_extension}"
-        temp_filepath = f"temp/{temp_filename}"
-        
-        # 3. temp 폴더 생성
-        os.makedirs("temp", exist_ok=True)
-        
-        # 4. 업로드된 파일 저장
-        print(f"[INFO] 임시 파일 저장: {temp_filepath}")
-        async with aiofiles.open(temp_filepath, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
-        
-        # 5. 배경 제거 처리
-        print(f"[INFO] 배경 제거 시작: {temp_filename}")
-        result_filename = remove_background(temp_filepath)
-        
-        if result_filename.startswith("오류") or result_filename.startswith("배경 제거 중 오류"):
-            raise HTTPException(status_code=500, detail=result_filename)
+        result_filename = f"{original_name}_{file_id}_post.png"
         
-        result_filepath = f"temp/{result_filename}"
+        # 3. 배경 제거 처리 (워커 프로세스에서 실행, 이벤트 루프를 막지 않음)
+        content = await file.read()
+        print(f"[INFO] 배경 제거 시작: {file.filename}")
+        try:
+            removal_result = await bg_worker_pool.remove_background_bytes(content)
+        except QueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e))
         
-        # 6. 결과 파일을 Supabase에 업로드
+        # 4. 결과 파일을 Supabase에 업로드
         print(f"[INFO] Supabase 업로드 시작: {result_filename}")
-        with open(result_filepath, 'rb') as f:
-            file_data = f.read()
-        
-        upload_result = supabase.storage.from_("image").upload(result_filename, file_data)
+        upload_result = await supabase.upload_async("image", result_filename, removal_result.png_data, content_type="image/png")
         
         if hasattr(upload_result, 'error') and upload_result.error:
             raise HTTPException(status_code=500, detail=f"파일 업로드 실패: {upload_result.error}")
         
-        # 7. 공개 URL 생성
-        public_url = supabase.storage.from_("image").get_public_url(result_filename)
+        # 5. 공개 URL 생성
+        public_url = await supabase.get_public_url_async("image", result_filename)
         
-        # 8. 데이터베이스에 저장
+        # 6. 데이터베이스에 저장
         job_id = str(uuid.uuid4())
         insert_data = {
             "job_id": job_id,
@@ -825,15 +808,11 @@ async def remove_background_api(file: UploadFile = File(...)):
             "url": public_url.data.get('publicUrl') if hasattr(public_url, 'data') else public_url,
             "type": "background_removal"
         }
+        if removal_result.crop:
+            # 투명 여백을 잘랐다면 원본 기준 오프셋을 결과 메타데이터에 저장
+            insert_data["result"] = {"crop": removal_result.crop}
         
-        db_result = supabase.table("image").insert(insert_data).execute()
-        
-        # 9. 임시 파일들 정리
-        try:
-            os.remove(temp_filepath)
-            os.remove(result_filepath)
-        except:
-            pass
+        db_result = await supabase.insert_async("image", insert_data)
         
         print(f"[SUCCESS] 배경 제거 완료: {result_filename}")
         return JSONResponse(content={
@@ -842,6 +821,7 @@ async def remove_background_api(file: UploadFile = File(...)):
             "original_filename": file.filename,
             "result_filename": result_filename,
             "image_url": insert_data["url"],
+            "crop": removal_result.crop,
             "message": "배경 제거가 완료되었습니다."
         })
     
@@ -875,7 +855,7 @@ async def remove_background_async_api(file: UploadFile = File(...)):
             "type": "background_removal"
         }
         
-        db_result = supabase.table("image").insert(insert_data).execute()
+        db_result = await supabase.insert_async("image", insert_data)
         print(f"[API] 데이터베이스 초기 상태 저장 완료")
         
         # 3. 업로드된 파일을 Supabase에 임시 저장
@@ -885,16 +865,17 @@ async def remove_background_async_api(file: UploadFile = File(...)):
         file_extension = Path(file.filename).suffix
         temp_filename = f"temp_{original_name}_{file_id}{file_extension}"
         
-        upload_result = supabase.storage.from_("image").upload(temp_filename, file_content)
-        temp_url = supabase.storage.from_("image").get_public_url(temp_filename)
+        upload_result = await supabase.upload_async("image", temp_filename, file_content)
+        temp_url = await supabase.get_public_url_async("image", temp_filename)
         
-        # 4. 백그라운드 작업 시작
-        asyncio.create_task(process_background_removal_background(
-            job_id, 
-            temp_url.data.get('publicUrl') if hasattr(temp_url, 'data') else temp_url,
-            temp_filename,
-            file.filename
-        ))
+        # 4. 작업 대기열에 등록 (워커 루프가 처리, 재시작 후에도 유지)
+        await job_queue.enqueue_async("background_removal", {
+            "job_id": job_id,
+            "image_url": temp_url.data.get('publicUrl') if hasattr(temp_url, 'data') else temp_url,
+            "temp_filename": temp_filename,
+            "original_filename": file.filename
+        }, job_id=job_id)
+        job_worker.notify()
         
         # 5. job_id 즉시 반환
         print(f"[API] /remove-background-async job_id 반환: {job_id}")
@@ -917,78 +898,106 @@ async def process_background_removal_background(job_id: str, image_url: str, tem
     try:
         print(f"[BACKGROUND] 배경 제거 백그라운드 작업 시작: {job_id}")
         
-        # 1. 작업 디렉토리 생성
-        work_dir = f"work/{job_id}"
-        os.makedirs(work_dir, exist_ok=True)
-        print(f"[BACKGROUND] 작업 디렉토리 생성 완료")
-        
-        # 2. 이미지 다운로드
+        # 1. 이미지 다운로드
         print(f"[BACKGROUND] 이미지 다운로드 시작")
-        async with aiohttp.ClientSession() as session:
-            async with session.get(image_url) as response:
-                if response.status == 200:
-                    image_data = await response.read()
-                    input_path = f"{work_dir}/input{Path(original_filename).suffix}"
-                    async with aiofiles.open(input_path, 'wb') as f:
-                        await f.write(image_data)
+        image_data = await call_async("image_download", fetch_bytes_async, image_url)
         print(f"[BACKGROUND] 이미지 다운로드 완료")
         
-        # 3. 배경 제거
+        # 2. 배경 제거 (워커 프로세스에서 실행)
         print(f"[BACKGROUND] 배경 제거 시작")
-        result_filename = remove_background(input_path)
-        
-        if result_filename.startswith("오류") or result_filename.startswith("배경 제거 중 오류"):
-            raise Exception(result_filename)
-        
-        result_path = f"{work_dir}/{result_filename}"
+        removal_result = await bg_worker_pool.remove_background_bytes(image_data)
         print(f"[BACKGROUND] 배경 제거 완료")
         
-        # 4. 결과를 Supabase에 업로드
+        # 3. 결과를 Supabase에 업로드
         print(f"[BACKGROUND] Supabase 업로드 시작")
-        with open(result_path, 'rb') as f:
-            result_data = f.read()
-        
-        final_filename = f"bg_removed_{job_id}_{result_filename}"
-        upload_result = supabase.storage.from_("image").upload(final_filename, result_data)
-        public_url = supabase.storage.from_("image").get_public_url(final_filename)
+        final_filename = f"bg_removed_{job_id}_{Path(original_filename).stem}_post.png"
+        upload_result = await supabase.upload_async("image", final_filename, removal_result.png_data,
+                                                    content_type="image/png", upsert=True)
+        public_url = await supabase.get_public_url_async("image", final_filename)
         print(f"[BACKGROUND] Supabase 업로드 완료")
         
-        # 5. 데이터베이스 업데이트
+        # 4. 데이터베이스 업데이트
         print(f"[BACKGROUND] 데이터베이스 업데이트 시작")
         update_data = {
             "result_filename": final_filename,
             "url": public_url.data.get('publicUrl') if hasattr(public_url, 'data') else public_url
         }
-        supabase.table("image").update(update_data).eq("job_id", job_id).execute()
+        if removal_result.crop:
+            update_data["result"] = {"crop": removal_result.crop}
+        await supabase.update_async("image", update_data, {"job_id": job_id})
         print(f"[BACKGROUND] 데이터베이스 업데이트 완료")
         
-        # 6. 임시 파일들 정리
+        # 5. 임시 파일 정리
         try:
-            supabase.storage.from_("image").remove([temp_filename])
-            shutil.rmtree(work_dir)
+            await supabase.remove_async("image", [temp_filename])
         except:
             pass
         
         print(f"[BACKGROUND] 배경 제거 백그라운드 작업 완료: {job_id}")
+        return True
         
     except Exception as e:
         print(f"[BACKGROUND] 배경 제거 백그라운드 작업 실패: {job_id}, 오류: {str(e)}")
-        # 오류 상태를 데이터베이스에 기록할 수 있음
+        # 예외를 올리면 작업 대기열이 오류 내용을 last_error에 남기고 백오프 후 재시도 (시도 횟수를 넘으면 failed)
+        raise
+
+# 작업 종류별 핸들러 (작업 대기열의 payload를 키워드 인자로 전달)
+JOB_HANDLERS = {
+    "face_swap_with_cartoon": lambda payload: process_face_swap_with_cartoon_background(**payload),
+    "face_swap": lambda payload: process_face_swap_background(**payload),
+    "cartoonify": lambda payload: process_cartoonify_background(**payload),
+    "background_removal": lambda payload: process_background_removal_background(**payload)
+}
+
+job_worker = JobWorker(job_queue, JOB_HANDLERS)
 
 @app.get("/")
 async def root():
     print(f"[API] / 엔드포인트 호출")
     return {"message": "Face Swap API", "version": "2.0.0", "endpoints": ["/face-swap-with-cartoon", "/face-swap", "/cartoonify-only", "/remove-background", "/remove-background-async", "/job/{job_id}"]}
 
+@app.get("/metrics")
+async def metrics():
+    print(f"[API] /metrics 엔드포인트 호출")
+    return {
+        "supabase": supabase.stats(),
+        "bg_workers": bg_worker_pool.stats(),
+        "job_queue": job_queue.stats(),
+        "job_worker": job_worker.stats(),
+        "executor_pools": executor_pools.stats(),
+        "provider_limits": provider_limits.stats(),
+        "resilience": resilience.stats()
+    }
+
 @app.get("/health")
 async def health_check():
     print(f"[API] /health 엔드포인트 호출")
     return {"status": "healthy"}
 
+@app.on_event("startup")
+async def startup_event():
+    """애플리케이션 시작 시 배경 제거 워커 풀 시작 (워커별 rembg 세션 로드 및 워밍업)"""
+    print("[STARTUP] 배경 제거 워커 풀 시작")
+    try:
+        await bg_worker_pool.start()
+    except Exception as e:
+        print(f"[STARTUP] 배경 제거 워커 풀 시작 실패 (첫 요청 시 재시도): {str(e)}")
+    # 재시작 전에 남아 있던 작업(대기 중 또는 임대 만료)부터 이어서 처리
+    if JOB_EMBEDDED_WORKER:
+        print("[STARTUP] 작업 대기열 워커 루프 시작")
+        job_worker.start()
+    else:
+        print("[STARTUP] 내장 워커 비활성화 - 작업은 대기열에 등록만 하고 worker.py가 처리")
+
 @app.on_event("shutdown")
 async def shutdown_event():
-    """애플리케이션 종료 시 ThreadPoolExecutor 정리"""
-    print("[SHUTDOWN] ThreadPoolExecutor 종료 시작")
-    executor.shutdown(wait=True)
-    print("[SHUTDOWN] ThreadPoolExecutor 종료 완료")
+    """애플리케이션 종료 시 작업 워커 루프와 작업 종류별 스레드 풀 정리"""
+    print("[SHUTDOWN] 작업 워커 루프 종료 시작 (처리 중인 작업이 끝날 때까지 기다림)")
+    await job_worker.stop()
+    print("[SHUTDOWN] 작업 스레드 풀 종료 시작")
+    executor_pools.shutdown(wait=True)
+    print("[SHUTDOWN] 작업 스레드 풀 종료 완료")
+    bg_worker_pool.shutdown()
+    print("[SHUTDOWN] 배경 제거 워커 풀 종료 완료")
+    await close_all_http_sessions()
 
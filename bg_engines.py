@@ -0,0 +1,268 @@
+"""
+배경 제거 엔진
+
+배경 제거 백엔드를 같은 인터페이스(이미지 바이트 + 원본 URL → PNG 바이트)로 감싸고,
+요청별 지정 또는 정책(BG_REMOVAL_ORDER)에 따른 순서로 시도하며 실패 시 다음 엔진으로 넘어갑니다.
+
+- chroma_key: 밝고 균일한 배경을 로컬에서 제거 (mask_engine, 신뢰도가 낮으면 양보)
+- rembg: 로컬 ONNX 세그멘테이션 모델 (bg_remover, 처음 사용할 때 세션 로드)
+- rapidapi: RapidAPI remove-background (이미지 URL 전송 후 결과 다운로드, "rapidapi" 제공자 제한기와 재시도 정책 사용,
+  RAPIDAPI_KEY가 없으면 건너뜀)
+
+로컬 엔진은 이미 받아둔 바이트를 사용하므로 이미지를 다시 다운로드하지 않습니다.
+엔진별 호출 수, 성공/양보/오류 수, 평균 지연시간을 기록합니다.
+"""
+
+import io
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Literal, Optional
+
+from http_client import get_http_session, request_timeout
+from mask_engine import remove_light_background
+from provider_limits import limit
+from resilience import call
+
+# 기본 시도 순서 (쉼표 구분, 앞에서부터 시도)
+BG_REMOVAL_ORDER = [name.strip() for name in os.getenv("BG_REMOVAL_ORDER", "chroma_key,rapidapi").split(",") if name.strip()]
+
+RAPIDAPI_URL = "https://remove-background18.p.rapidapi.com/public/remove-background"
+RAPIDAPI_HOST = "remove-background18.p.rapidapi.com"
+RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
+# 요청에서 지정할 수 있는 엔진 이름 (각 엔진 클래스의 name)
+EngineName = Literal["chroma_key", "rembg", "rapidapi"]
+
+# RapidAPI 응답에서 결과 URL이 들어 있을 수 있는 키 (순서대로 확인)
+RAPIDAPI_RESULT_KEYS = ("result_url", "url", "output_url", "image_url")
+
+
+class BackgroundRemovalEngine(ABC):
+    """배경 제거 엔진 인터페이스"""
+
+    name = ""
+    needs_image_data = True
+
+    def available(self) -> bool:
+        """엔진을 사용할 수 있는지 반환합니다. (False면 라우터가 건너뜀)"""
+        return True
+
+    @abstractmethod
+    def remove(self, image_data: Optional[bytes], image_url: Optional[str]) -> Optional[bytes]:
+        """
+        배경을 제거합니다.
+
+        Args:
+            image_data: 이미 받아둔 이미지 데이터 (없으면 None)
+            image_url: 원본 이미지 URL (없으면 None)
+
+        Returns:
+            bytes: 배경이 제거된 PNG 이미지 데이터
+            None: 이 엔진으로 처리할 수 없는 경우 (다음 엔진으로 대체)
+
+        Raises:
+            Exception: 처리 중 오류 (다음 엔진으로 대체, 오류로 집계)
+        """
+
+
+class ChromaKeyEngine(BackgroundRemovalEngine):
+    """밝고 균일한 배경을 테두리 연결 flood fill + 크로마 키로 제거하는 로컬 엔진"""
+
+    name = "chroma_key"
+
+    def remove(self, image_data: Optional[bytes], image_url: Optional[str]) -> Optional[bytes]:
+        background_removed_data, confidence = remove_light_background(image_data)
+        print(f"[BG_ENGINE] chroma_key 신뢰도: {confidence:.2f}")
+        return background_removed_data
+
+
+class RembgEngine(BackgroundRemovalEngine):
+    """rembg 세그멘테이션 모델을 사용하는 로컬 엔진"""
+
+    name = "rembg"
+
+    def remove(self, image_data: Optional[bytes], image_url: Optional[str]) -> Optional[bytes]:
+        # onnxruntime 로드 비용이 크므로 처음 사용할 때만 import
+        from PIL import Image
+        from bg_remover import remove_background_image
+
+        output_image = remove_background_image(Image.open(io.BytesIO(image_data)))
+        output_buffer = io.BytesIO()
+        output_image.save(output_buffer, format="PNG")
+        return output_buffer.getvalue()
+
+
+class RapidAPIEngine(BackgroundRemovalEngine):
+    """RapidAPI remove-background를 사용하는 원격 엔진 (이미지 URL 필요)"""
+
+    name = "rapidapi"
+    needs_image_data = False
+
+    def available(self) -> bool:
+        return bool(RAPIDAPI_KEY)
+
+    def remove(self, image_data: Optional[bytes], image_url: Optional[str]) -> Optional[bytes]:
+        if not image_url:
+            return None
+
+        session = get_http_session()
+
+        def post():
+            with limit("rapidapi") as limiter:
+                res = session.post(
+                    RAPIDAPI_URL,
+                    data={"image_url": image_url},
+                    headers={
+                        "x-rapidapi-key": RAPIDAPI_KEY,
+                        "x-rapidapi-host": RAPIDAPI_HOST,
+                        "Content-Type": "application/x-www-form-urlencoded"
+                    },
+                    timeout=request_timeout()
+                )
+                print(f"[BG_ENGINE] RapidAPI 응답 상태: {res.status_code}")
+                # 실패 상태 코드는 슬롯 안에서 HTTPError로 올려 재시도 여부(429/5xx)를 판별
+                # (429는 슬롯이 예외에서 한 번만 반영하고, 성공으로 기록해 속도를 되돌리지 않음)
+                res.raise_for_status()
+                # 성공 응답의 남은 요청 수 헤더를 제한기에 반영
+                limiter.observe_response(res.status_code, res.headers)
+            return res
+
+        res = call("rapidapi", post)
+        if res.status_code != 200:
+            raise RuntimeError(f"RapidAPI 요청 실패: HTTP {res.status_code}")
+
+        try:
+            response_data = json.loads(res.content.decode("utf-8"))
+        except json.JSONDecodeError:
+            raise RuntimeError(f"RapidAPI JSON 응답 파싱 실패: {res.content[:200]!r}")
+
+        result_url = self._extract_result_url(response_data)
+        if not result_url:
+            raise RuntimeError(f"RapidAPI 응답에서 결과 URL을 찾을 수 없습니다: {response_data}")
+
+        def download():
+            result = session.get(result_url, timeout=request_timeout())
+            result.raise_for_status()
+            return result.content
+
+        return call("image_download", download)
+
+    @staticmethod
+    def _extract_result_url(response_data) -> Optional[str]:
+        if not isinstance(response_data, dict):
+            return None
+        for key in RAPIDAPI_RESULT_KEYS:
+            if response_data.get(key):
+                return response_data[key]
+        data_obj = response_data.get("data")
+        if isinstance(data_obj, dict):
+            return data_obj.get("url")
+        return None
+
+
+class BackgroundRemovalRouter:
+    """엔진을 정해진 순서로 시도하고 엔진별 지연시간/오류율을 기록합니다."""
+
+    def __init__(self, engines: list, default_order: list = BG_REMOVAL_ORDER):
+        """
+        Args:
+            engines: 사용할 엔진 목록
+            default_order: 기본 시도 순서 (엔진 이름 목록)
+        """
+        self.engines = {engine.name: engine for engine in engines}
+        unknown = [name for name in default_order if name not in self.engines]
+        if unknown:
+            print(f"[BG_ENGINE] 알 수 없는 엔진은 순서에서 제외: {unknown}")
+        self.default_order = [name for name in default_order if name in self.engines]
+        self._lock = threading.Lock()
+        self._stats = {
+            name: {"calls": 0, "successes": 0, "declines": 0, "errors": 0, "total_seconds": 0.0}
+            for name in self.engines
+        }
+
+    def resolve_order(self, preferred: Optional[str] = None) -> list:
+        """
+        요청에서 지정한 엔진을 맨 앞에 두고 나머지 기본 순서를 대체 경로로 붙입니다.
+
+        Raises:
+            ValueError: 알 수 없는 엔진 이름인 경우
+        """
+        if not preferred:
+            return list(self.default_order)
+        if preferred not in self.engines:
+            raise ValueError(f"알 수 없는 배경 제거 엔진입니다: {preferred} (사용 가능: {', '.join(self.engines)})")
+        return [preferred] + [name for name in self.default_order if name != preferred]
+
+    def remove(self, image_data: Optional[bytes], image_url: Optional[str],
+               preferred: Optional[str] = None) -> tuple:
+        """
+        엔진을 순서대로 시도하여 배경을 제거합니다.
+
+        Args:
+            image_data: 이미 받아둔 이미지 데이터 (없으면 None)
+            image_url: 원본 이미지 URL
+            preferred: 먼저 시도할 엔진 이름 (None이면 기본 순서)
+
+        Returns:
+            tuple: (배경이 제거된 PNG 바이트 또는 None, 처리한 엔진 이름 또는 None)
+        """
+        for name in self.resolve_order(preferred):
+            engine = self.engines[name]
+            if engine.needs_image_data and image_data is None:
+                continue
+            if not engine.available():
+                print(f"[BG_ENGINE] {name} 사용 불가 (설정 없음) - 다음 엔진으로 대체")
+                continue
+
+            call_start = time.time()
+            outcome = "declines"
+            result = None
+            try:
+                result = engine.remove(image_data, image_url)
+                if result:
+                    outcome = "successes"
+            except Exception as e:
+                outcome = "errors"
+                print(f"[BG_ENGINE] {name} 배경 제거 오류 - 다음 엔진으로 대체: {str(e)}")
+            finally:
+                self._record(name, outcome, time.time() - call_start)
+
+            if result:
+                print(f"[BG_ENGINE] {name} 배경 제거 완료 (크기: {len(result)} bytes)")
+                return result, name
+            if outcome == "declines":
+                print(f"[BG_ENGINE] {name} 처리 불가 - 다음 엔진으로 대체")
+
+        return None, None
+
+    def _record(self, name: str, outcome: str, elapsed: float):
+        with self._lock:
+            stats = self._stats[name]
+            stats["calls"] += 1
+            stats[outcome] += 1
+            stats["total_seconds"] += elapsed
+
+    def stats(self) -> dict:
+        """엔진별 호출 수, 성공/양보/오류 수, 오류율, 평균 지연시간을 반환합니다."""
+        with self._lock:
+            return {
+                "order": list(self.default_order),
+                "engines": {
+                    name: {
+                        "calls": stats["calls"],
+                        "successes": stats["successes"],
+                        "declines": stats["declines"],
+                        "errors": stats["errors"],
+                        "error_rate": round(stats["errors"] / stats["calls"], 4) if stats["calls"] else 0.0,
+                        "avg_seconds": round(stats["total_seconds"] / stats["calls"], 3) if stats["calls"] else 0.0
+                    }
+                    for name, stats in self._stats.items()
+                }
+            }
+
+
+def create_default_router() -> BackgroundRemovalRouter:
+    """기본 엔진(chroma_key, rembg, rapidapi)으로 라우터를 만듭니다."""
+    return BackgroundRemovalRouter([ChromaKeyEngine(), RembgEngine(), RapidAPIEngine()])
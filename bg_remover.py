@@ -1,50 +1,474 @@
 from rembg import remove
-from PIL import Image
+from rembg.sessions import sessions_class
+from PIL import Image, ImageOps
+import numpy as np
+import onnxruntime as ort
+from mask_engine import BG_AUTOCROP, crop_to_alpha
+import io
 import os
+import sys
+import threading
+import time
+from typing import Optional
 
-def remove_background(input_path: str) -> str:
+# rembg 세션 설정
+# REMBG_MODELS: 시작 시 미리 로드할 모델 목록 (예: "u2net,isnet-general-use")
+REMBG_MODELS = [name.strip() for name in os.getenv("REMBG_MODELS", "u2net").split(",") if name.strip()]
+REMBG_DEFAULT_MODEL = os.getenv("REMBG_DEFAULT_MODEL", REMBG_MODELS[0] if REMBG_MODELS else "u2net")
+# ONNX Runtime 스레드 수 (0이면 ONNX Runtime 기본값 사용)
+REMBG_INTRA_OP_THREADS = int(os.getenv("REMBG_INTRA_OP_THREADS", "0"))
+REMBG_INTER_OP_THREADS = int(os.getenv("REMBG_INTER_OP_THREADS", "0"))
+REMBG_WARMUP = os.getenv("REMBG_WARMUP", "1") == "1"
+
+# 저해상도 마스크 모드: 마스크는 모델 해상도로만 예측하고,
+# 알파는 원본 이미지를 가이드로 한 가이디드 필터로 원본 크기까지 업샘플링합니다.
+REMBG_LOWRES_MASK = os.getenv("REMBG_LOWRES_MASK", "0") == "1"
+REMBG_GUIDE_SIZE = int(os.getenv("REMBG_GUIDE_SIZE", "1024"))  # 가이디드 필터 계수를 계산할 긴 변 크기
+REMBG_GUIDED_RADIUS = int(os.getenv("REMBG_GUIDED_RADIUS", "8"))
+REMBG_GUIDED_EPS = float(os.getenv("REMBG_GUIDED_EPS", "1e-3"))
+# 저해상도 마스크 모드에서 JPEG는 마스크 예측용 이미지를 DCT 축소 디코딩(Image.draft)으로 따로 만듦
+REMBG_DRAFT_DECODE = os.getenv("REMBG_DRAFT_DECODE", "1") == "1"
+
+# 모델별 입력 전처리 (평균, 표준편차, 입력 크기) - rembg 세션의 normalize와 동일
+# 여기에 없는 모델은 rembg의 predict를 이미지별로 호출합니다.
+U2NET_PREPROCESSING = ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320))
+MODEL_PREPROCESSING = {
+    "u2net": U2NET_PREPROCESSING,
+    "u2netp": U2NET_PREPROCESSING,
+    "u2net_human_seg": U2NET_PREPROCESSING,
+    "silueta": U2NET_PREPROCESSING,
+    "isnet-general-use": ((0.5, 0.5, 0.5), (1.0, 1.0, 1.0), (1024, 1024)),
+}
+
+
+class RembgSessionManager:
+    """
+    rembg 세션을 모델별로 한 번만 생성하여 모든 호출에서 재사용합니다.
+    세션 생성 시 ONNX 모델 로드가 일어나므로, 시작 시 미리 생성하고
+    더미 이미지로 한 번 추론하여 첫 요청의 지연을 없앱니다.
+    """
+
+    def __init__(self,
+                 model_names: list = REMBG_MODELS,
+                 intra_op_threads: int = REMBG_INTRA_OP_THREADS,
+                 inter_op_threads: int = REMBG_INTER_OP_THREADS):
+        self.model_names = list(model_names)
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self._sessions = {}
+        self._load_times = {}
+        self._warmup_times = {}
+        self._lock = threading.Lock()
+
+    def _session_options(self) -> ort.SessionOptions:
+        sess_opts = ort.SessionOptions()
+        if self.intra_op_threads > 0:
+            sess_opts.intra_op_num_threads = self.intra_op_threads
+        if self.inter_op_threads > 0:
+            sess_opts.inter_op_num_threads = self.inter_op_threads
+        return sess_opts
+
+    def _create_session(self, model_name: str):
+        for session_class in sessions_class:
+            if session_class.name() == model_name:
+                return session_class(model_name, self._session_options())
+        raise ValueError(f"지원하지 않는 rembg 모델입니다: {model_name}")
+
+    def get_session(self, model_name: Optional[str] = None):
+        """
+        모델 이름에 해당하는 공유 세션을 반환합니다. (없으면 생성)
+
+        Args:
+            model_name (Optional[str]): rembg 모델 이름 (None이면 기본 모델)
+
+        Returns:
+            rembg 세션 객체
+        """
+        model_name = model_name or REMBG_DEFAULT_MODEL
+        with self._lock:
+            session = self._sessions.get(model_name)
+            if session is None:
+                load_start = time.time()
+                session = self._create_session(model_name)
+                self._sessions[model_name] = session
+                self._load_times[model_name] = round(time.time() - load_start, 3)
+                print(f"[BG_REMOVER] rembg 세션 생성: {model_name} ({self._load_times[model_name]}초)")
+            return session
+
+    def supports_batch(self, model_name: Optional[str] = None) -> bool:
+        """모델 입력의 배치 차원이 동적이면 True (한 번의 추론으로 여러 이미지 처리 가능)"""
+        batch_dim = self.get_session(model_name).inner_session.get_inputs()[0].shape[0]
+        return not isinstance(batch_dim, int)
+
+    def warmup(self, model_name: str):
+        """더미 이미지로 한 번 추론하여 ONNX Runtime 초기화 비용을 미리 지불합니다."""
+        session = self.get_session(model_name)
+        warmup_start = time.time()
+        remove(Image.new("RGB", (64, 64), (255, 255, 255)), session=session)
+        self._warmup_times[model_name] = round(time.time() - warmup_start, 3)
+        print(f"[BG_REMOVER] rembg 세션 워밍업 완료: {model_name} ({self._warmup_times[model_name]}초)")
+
+    def preload(self, warmup: bool = REMBG_WARMUP):
+        """설정된 모든 모델의 세션을 생성하고 (선택적으로) 워밍업합니다."""
+        for model_name in self.model_names:
+            self.get_session(model_name)
+            if warmup:
+                self.warmup(model_name)
+
+    def stats(self) -> dict:
+        """로드된 세션과 로드/워밍업 소요시간을 반환합니다."""
+        with self._lock:
+            return {
+                "models": list(self._sessions.keys()),
+                "default_model": REMBG_DEFAULT_MODEL,
+                "load_seconds": dict(self._load_times),
+                "warmup_seconds": dict(self._warmup_times),
+                "intra_op_threads": self.intra_op_threads,
+                "inter_op_threads": self.inter_op_threads,
+                "lowres_mask": REMBG_LOWRES_MASK
+            }
+
+
+session_manager = RembgSessionManager()
+
+
+def preload_sessions():
+    """시작 시 rembg 세션을 미리 로드합니다."""
+    session_manager.preload()
+
+
+def remove_background_image(input_image: Image.Image, model_name: Optional[str] = None) -> Image.Image:
+    """
+    공유 세션으로 PIL 이미지의 배경을 제거합니다.
+
+    Args:
+        input_image: 입력 PIL 이미지
+        model_name: rembg 모델 이름 (None이면 기본 모델)
+
+    Returns:
+        Image.Image: 배경이 제거된 RGBA 이미지
+    """
+    return remove(input_image, session=session_manager.get_session(model_name))
+
+
+def _normalize_for_model(image: Image.Image, mean: tuple, std: tuple, size: tuple,
+                         fast: bool = False) -> np.ndarray:
+    """
+    (3, H, W) float32 모델 입력 텐서를 만듭니다.
+    기본은 rembg 세션의 normalize와 같은 리사이즈/연산이고,
+    fast(저해상도 마스크 모드)는 큰 이미지를 정수 배율로 먼저 줄인 뒤(reducing_gap) float32로 계산합니다.
+    """
+    rgb = image.convert("RGB")
+    if not fast:
+        resized = np.asarray(rgb.resize(size, Image.Resampling.LANCZOS))
+        resized = resized / max(np.max(resized), 1e-6)
+        resized = (resized - np.array(mean)) / np.array(std)
+        return resized.transpose((2, 0, 1)).astype(np.float32)
+
+    resized = rgb.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+    resized = np.asarray(resized, dtype=np.float32)
+    resized /= max(float(resized.max()), 1e-6)
+    resized -= np.array(mean, dtype=np.float32)
+    resized /= np.array(std, dtype=np.float32)
+    return resized.transpose((2, 0, 1))
+
+
+def _prediction_to_mask(prediction: np.ndarray, size: Optional[tuple]) -> Image.Image:
+    """모델 출력(H, W)을 0~255로 정규화하고 마스크로 변환합니다. (size가 None이면 모델 해상도 유지)"""
+    low = np.min(prediction)
+    high = np.max(prediction)
+    scaled = (prediction - low) / max(high - low, 1e-6)
+    mask = Image.fromarray((scaled.clip(0, 1) * 255).astype(np.uint8), mode="L")
+    if size is None:
+        return mask
+    return mask.resize(size, Image.Resampling.LANCZOS)
+
+
+def predict_masks(images: list, model_name: Optional[str] = None, full_size: bool = True) -> list:
+    """
+    여러 이미지의 전경 마스크를 예측합니다.
+    모델이 동적 배치를 지원하면 한 번의 ONNX 추론으로, 아니면 이미지별로 추론합니다.
+
+    Args:
+        images: 입력 PIL 이미지 목록
+        model_name: rembg 모델 이름 (None이면 기본 모델)
+        full_size: True면 원본 크기로 리사이즈, False면 모델 해상도 그대로 반환
+
+    Returns:
+        list: 이미지별 L 모드 마스크
+    """
+    model_name = model_name or REMBG_DEFAULT_MODEL
+    session = session_manager.get_session(model_name)
+    preprocessing = MODEL_PREPROCESSING.get(model_name)
+    if preprocessing is None:
+        return [session.predict(image)[0] for image in images]
+
+    mean, std, size = preprocessing
+    input_name = session.inner_session.get_inputs()[0].name
+    # 원본 크기 마스크(기본 모드)는 rembg와 같은 전처리, 저해상도 마스크 모드만 빠른 축소 사용
+    tensors = [_normalize_for_model(image, mean, std, size, fast=not full_size) for image in images]
+
+    if len(tensors) > 1 and session_manager.supports_batch(model_name):
+        outputs = session.inner_session.run(None, {input_name: np.stack(tensors)})[0]
+        predictions = [outputs[i, 0] for i in range(len(tensors))]
+    else:
+        predictions = [
+            session.inner_session.run(None, {input_name: tensor[np.newaxis]})[0][0, 0]
+            for tensor in tensors
+        ]
+
+    return [
+        _prediction_to_mask(prediction, image.size if full_size else None)
+        for prediction, image in zip(predictions, images)
+    ]
+
+
+def _box_mean(values: np.ndarray, radius: int) -> np.ndarray:
+    """적분 영상으로 (2r+1)x(2r+1) 창의 평균을 구합니다. (경계에서는 창 안의 화소 수로 나눔)"""
+    height, width = values.shape
+    integral = np.zeros((height + 1, width + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(values, axis=0, dtype=np.float64), axis=1, out=integral[1:, 1:])
+
+    rows = np.arange(height)
+    cols = np.arange(width)
+    top = np.clip(rows - radius, 0, height)
+    bottom = np.clip(rows + radius + 1, 0, height)
+    left = np.clip(cols - radius, 0, width)
+    right = np.clip(cols + radius + 1, 0, width)
+
+    window_sum = (integral[bottom][:, right] - integral[top][:, right]
+                  - integral[bottom][:, left] + integral[top][:, left])
+    window_count = (bottom - top)[:, None] * (right - left)[None, :]
+    return (window_sum / window_count).astype(np.float32)
+
+
+def upsample_alpha(mask: Image.Image, guide: Image.Image,
+                   guide_size: int = REMBG_GUIDE_SIZE,
+                   radius: int = REMBG_GUIDED_RADIUS,
+                   eps: float = REMBG_GUIDED_EPS) -> Image.Image:
+    """
+    저해상도 마스크를 원본 이미지의 경계에 맞추어 원본 크기 알파로 업샘플링합니다. (Fast Guided Filter)
+    가이디드 필터 계수(a, b)는 축소된 가이드에서 계산하고, 계수만 원본 크기로 보간하여
+    alpha = a * I + b 를 원본 화소에 적용합니다.
+
+    Args:
+        mask: 모델 해상도의 L 모드 마스크
+        guide: 원본 크기 이미지
+        guide_size: 계수를 계산할 가이드의 긴 변 크기
+        radius: 가이디드 필터 반경 (축소된 가이드 기준)
+        eps: 정규화 계수 (클수록 부드러움)
+
+    Returns:
+        Image.Image: 원본 크기의 L 모드 알파
+    """
+    full_size = guide.size
+    scale = min(1.0, guide_size / max(full_size))
+    work_size = (max(1, round(full_size[0] * scale)), max(1, round(full_size[1] * scale)))
+
+    guide_gray = guide.convert("L")
+    low_guide = np.asarray(
+        guide_gray.resize(work_size, Image.Resampling.BILINEAR, reducing_gap=2.0), dtype=np.float32
+    ) / 255
+    low_mask = np.asarray(mask.resize(work_size, Image.Resampling.BILINEAR), dtype=np.float32) / 255
+
+    mean_guide = _box_mean(low_guide, radius)
+    mean_mask = _box_mean(low_mask, radius)
+    covariance = _box_mean(low_guide * low_mask, radius) - mean_guide * mean_mask
+    variance = _box_mean(low_guide * low_guide, radius) - mean_guide * mean_guide
+    coef_a = covariance / (variance + eps)
+    coef_b = mean_mask - coef_a * mean_guide
+
+    # 계수만 원본 크기로 보간한 뒤 원본 가이드에 적용 (제자리 연산으로 임시 배열 최소화)
+    alpha = np.asarray(
+        Image.fromarray(_box_mean(coef_a, radius), mode="F").resize(full_size, Image.Resampling.BILINEAR),
+        dtype=np.float32
+    ).copy()
+    alpha *= np.asarray(guide_gray, dtype=np.float32)
+    alpha /= 255
+    alpha += np.asarray(
+        Image.fromarray(_box_mean(coef_b, radius), mode="F").resize(full_size, Image.Resampling.BILINEAR),
+        dtype=np.float32
+    )
+    np.clip(alpha, 0, 1, out=alpha)
+    alpha *= 255
+    return Image.fromarray(alpha.astype(np.uint8), mode="L")
+
+
+def apply_alpha_inplace(image: Image.Image, alpha: Image.Image) -> Image.Image:
+    """새 RGBA 캔버스를 만들지 않고 이미지에 알파 채널을 직접 넣습니다."""
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGB")
+    image.putalpha(alpha)
+    return image
+
+
+def draft_for_mask(image_data: bytes, model_name: Optional[str] = None) -> Optional[Image.Image]:
+    """
+    JPEG 데이터를 모델 입력 크기보다 작아지지 않는 가장 큰 배율(1/2, 1/4, 1/8)로 축소 디코딩합니다.
+    마스크 예측에만 사용하며, JPEG가 아니거나 모델 입력 크기를 모르면 None을 반환합니다.
+    """
+    preprocessing = MODEL_PREPROCESSING.get(model_name or REMBG_DEFAULT_MODEL)
+    if preprocessing is None:
+        return None
+    image = Image.open(io.BytesIO(image_data))
+    if image.format != "JPEG":
+        return None
+    image.draft("RGB", preprocessing[2])
+    image.load()
+    return image
+
+
+def remove_background_batch(input_images: list, model_name: Optional[str] = None,
+                            mask_images: Optional[list] = None,
+                            lowres: bool = REMBG_LOWRES_MASK) -> list:
+    """
+    여러 이미지의 배경을 한 번에 제거합니다.
+    기본 모드는 rembg.remove의 기본 동작과 같은 결과를, 저해상도 마스크 모드(REMBG_LOWRES_MASK)는
+    가이디드 필터로 업샘플링한 알파를 적용한 결과를 반환합니다.
+
+    Args:
+        input_images: 입력 PIL 이미지 목록
+        model_name: rembg 모델 이름 (None이면 기본 모델)
+        mask_images: 저해상도 마스크 모드에서 마스크 예측에 쓸 축소 디코딩 이미지 목록 (draft_for_mask, 항목별 None 가능)
+        lowres: 저해상도 마스크 모드 사용 여부
+
+    Returns:
+        list: 배경이 제거된 RGBA 이미지 목록
+    """
+    images = [ImageOps.exif_transpose(image) for image in input_images]
+
+    if lowres:
+        # 저해상도 마스크 + 가장자리 보존 업샘플링, 알파는 원본 이미지에 제자리 합성
+        mask_sources = [
+            ImageOps.exif_transpose(mask_image) if mask_image is not None else image
+            for image, mask_image in zip(images, mask_images or [None] * len(images))
+        ]
+        masks = predict_masks(mask_sources, model_name, full_size=False)
+        return [apply_alpha_inplace(image, upsample_alpha(mask, image)) for image, mask in zip(images, masks)]
+
+    masks = predict_masks(images, model_name)
+    return [
+        Image.composite(image.convert("RGBA"), Image.new("RGBA", image.size, (0, 0, 0, 0)), mask)
+        for image, mask in zip(images, masks)
+    ]
+
+
+def remove_background(input_path: str, model_name: Optional[str] = None) -> str:
     """
     이미지의 배경을 제거하고 '_post'가 붙은 파일명으로 저장합니다.
-    
+
     Args:
         input_path: 입력 이미지 파일 경로
-        
+        model_name: rembg 모델 이름 (None이면 기본 모델)
+
     Returns:
         str: 성공 시 결과 파일명, 실패 시 오류 메시지
     """
     try:
         print(f"[BG_REMOVER] 배경 제거 시작: {input_path}")
-        
+
         # 파일 존재 확인
         if not os.path.exists(input_path):
             error_msg = f"오류: 파일을 찾을 수 없습니다 - {input_path}"
             print(f"[BG_REMOVER] {error_msg}")
             return error_msg
-        
+
         # 이미지 열기
         input_image = Image.open(input_path)
         print(f"[BG_REMOVER] 이미지 로드 완료: {input_image.size}")
-        
-        # 배경 제거
-        output_image = remove(input_image)
+
+        # 배경 제거 (미리 로드된 세션 재사용)
+        output_image = remove_background_image(input_image, model_name)
         print(f"[BG_REMOVER] 배경 제거 완료")
-        
+
+        # 투명 여백 자르기 (선택)
+        if BG_AUTOCROP:
+            output_image, crop = crop_to_alpha(output_image)
+            if crop:
+                print(f"[BG_REMOVER] 투명 여백 자르기 완료: {crop}")
+
         # 출력 파일명 생성 (확장자 앞에 _post 추가)
         base_name = os.path.splitext(input_path)[0]
         extension = os.path.splitext(input_path)[1]
         output_path = f"{base_name}_post{extension}"
-        
+
         # 결과 저장
         output_image.save(output_path)
         print(f"[BG_REMOVER] 결과 저장 완료: {output_path}")
-        
+
         # 파일명만 반환 (경로 제외)
         result_filename = os.path.basename(output_path)
         print(f"[BG_REMOVER] 배경 제거 성공: {result_filename}")
-        
+
         return result_filename
-        
+
     except Exception as e:
         error_msg = f"배경 제거 중 오류 발생: {str(e)}"
         print(f"[BG_REMOVER] {error_msg}")
         return error_msg
+
+
+def _benchmark_runs(image_data: bytes, model_name: Optional[str]) -> dict:
+    """벤치마크할 모드별 실행 함수 (디코딩부터 배경 제거까지)"""
+    def decode():
+        image = Image.open(io.BytesIO(image_data))
+        image.load()
+        return image
+
+    return {
+        "default": lambda: remove_background_batch([decode()], model_name, lowres=False),
+        "lowres_mask": lambda: remove_background_batch([decode()], model_name, lowres=True),
+        "lowres_mask_draft": lambda: remove_background_batch(
+            [decode()], model_name, mask_images=[draft_for_mask(image_data, model_name)], lowres=True
+        ),
+    }
+
+
+def _benchmark_mode(image_data: bytes, model_name: Optional[str], mode: str, rounds: int) -> tuple:
+    """
+    새 프로세스에서 한 모드를 실행하고 (평균 소요 시간(초), 세션 로드 후 늘어난 최대 RSS(MB))를 반환합니다.
+    최대 RSS는 프로세스 단위 최고치라서 모드마다 프로세스를 따로 띄워 측정합니다.
+    """
+    import resource
+
+    session_manager.get_session(model_name)
+    run = _benchmark_runs(image_data, model_name)[mode]
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    run()  # 워밍업 (최대 메모리는 여기서 측정됨)
+    peak_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_kb) / 1024  # Linux: KB 단위
+    start = time.perf_counter()
+    for _ in range(rounds):
+        run()
+    return (time.perf_counter() - start) / rounds, peak_mb
+
+
+def benchmark(image_path: str, model_name: Optional[str] = None, rounds: int = 3):
+    """
+    기본 모드, 저해상도 마스크 모드, 저해상도 마스크 + 축소 디코딩의 메가픽셀당 처리 시간과 최대 메모리를 비교합니다.
+    디코딩부터 배경 제거까지 측정하며, 각 모드는 별도 프로세스(spawn)에서 실행합니다.
+
+        python bg_remover.py --benchmark [이미지 경로] [반복 횟수]
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    with open(image_path, "rb") as f:
+        image_data = f.read()
+    with Image.open(io.BytesIO(image_data)) as image:
+        width, height = image.size
+    megapixels = width * height / 1_000_000
+    print(f"📊 배경 제거 벤치마크: {image_path} ({megapixels:.2f}MP, {rounds}회)")
+    for mode in _benchmark_runs(image_data, model_name):
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            elapsed, peak_mb = executor.submit(_benchmark_mode, image_data, model_name, mode, rounds).result()
+        print(f"   - {mode}: {elapsed:.3f}초 ({elapsed / megapixels:.3f}초/MP), "
+              f"최대 메모리 +{peak_mb:.1f}MB ({peak_mb / megapixels:.1f}MB/MP)")
+
+
+if __name__ == "__main__":
+    # python bg_remover.py --benchmark [이미지 경로] [반복 횟수]: 모드별 메가픽셀당 처리 시간 비교
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        benchmark(
+            sys.argv[2] if len(sys.argv) > 2 else "test_remove_bg.jpg",
+            rounds=int(sys.argv[3]) if len(sys.argv) > 3 else 3
+        )
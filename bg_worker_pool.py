@@ -0,0 +1,338 @@
+"""
+rembg 배경 제거 프로세스 풀
+
+ONNX 추론은 CPU를 오래 점유하므로 API 프로세스(이벤트 루프)가 아닌
+별도 프로세스에서 실행합니다. 각 워커는 시작 시 rembg 세션을 미리 로드하고,
+이미지 바이트를 받아 PNG 바이트를 반환합니다.
+
+- 마이크로 배칭: 최대 BG_BATCH_MAX_WAIT_MS 동안 또는 BG_BATCH_MAX_SIZE장까지 모아
+  한 번의 ONNX 추론으로 처리하고 결과를 각 호출자에게 나누어 돌려줍니다.
+  기본 모델의 배치 차원이 고정(예: 1)이면 어차피 이미지별로 추론하므로 기다리지 않고 바로 처리합니다.
+- 대기열 깊이 제한: 실행 중 + 대기 중 작업 수가 한도를 넘으면 QueueFullError
+- 워커별 처리 건수, 추론 시간, 사용률, 최대 메모리 통계 및 배치 크기 분포/처리량/배칭 지연 통계
+- 메가픽셀당 처리 시간 (REMBG_LOWRES_MASK 모드와 기본 모드 비교용)
+"""
+
+import asyncio
+import io
+import multiprocessing
+import os
+import resource
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import NamedTuple, Optional
+
+from PIL import Image
+
+# 워커 풀 설정
+BG_WORKER_PROCESSES = int(os.getenv("BG_WORKER_PROCESSES", str(min(2, os.cpu_count() or 1))))
+BG_WORKER_MAX_QUEUE = int(os.getenv("BG_WORKER_MAX_QUEUE", "16"))
+BG_BATCH_MAX_SIZE = int(os.getenv("BG_BATCH_MAX_SIZE", "4"))  # 1이면 배칭 없이 즉시 처리
+BG_BATCH_MAX_WAIT_MS = float(os.getenv("BG_BATCH_MAX_WAIT_MS", "10"))
+# 워커의 bg_remover와 같은 환경변수 (API 프로세스에서 rembg를 import하지 않도록 직접 읽음)
+REMBG_LOWRES_MASK = os.getenv("REMBG_LOWRES_MASK", "0") == "1"
+
+
+class QueueFullError(Exception):
+    """배경 제거 대기열이 가득 찬 경우"""
+
+
+class BackgroundRemovalResult(NamedTuple):
+    png_data: bytes          # 배경이 제거된 PNG 이미지 데이터
+    crop: Optional[dict]     # 투명 여백을 잘랐다면 원본 기준 오프셋/크기 (BG_AUTOCROP)
+
+
+def _init_worker():
+    """워커 프로세스 시작 시 rembg 세션을 로드하고 워밍업합니다."""
+    from bg_remover import preload_sessions
+    print(f"[BG_WORKER] 워커 시작: pid={os.getpid()}")
+    preload_sessions()
+
+
+def _ping_worker() -> tuple:
+    """워커 pid와 기본 모델을 한 번의 추론으로 여러 장 처리할 수 있는지(동적 배치 차원) 반환합니다."""
+    from bg_remover import MODEL_PREPROCESSING, REMBG_DEFAULT_MODEL, session_manager
+    batch_inference = (REMBG_DEFAULT_MODEL in MODEL_PREPROCESSING
+                       and session_manager.supports_batch(REMBG_DEFAULT_MODEL))
+    return os.getpid(), batch_inference
+
+
+def _remove_background_batch_in_worker(images_data: list, model_name: Optional[str]) -> tuple:
+    """
+    워커 프로세스에서 여러 이미지의 배경을 한 번에 제거합니다.
+
+    Returns:
+        tuple: (이미지별 (PNG 바이트 또는 None, 자르기 정보 또는 None, 오류 메시지 또는 None) 목록, pid, 처리 시간,
+                처리한 메가픽셀, 워커 최대 RSS(MB))
+    """
+    from bg_remover import REMBG_DRAFT_DECODE, draft_for_mask, remove_background_batch
+    from mask_engine import BG_AUTOCROP, crop_to_alpha
+
+    work_start = time.time()
+    results = [None] * len(images_data)
+    decoded = []
+    for index, image_data in enumerate(images_data):
+        try:
+            input_image = Image.open(io.BytesIO(image_data))
+            input_image.load()
+            decoded.append((index, input_image))
+        except Exception as e:
+            # 디코딩 실패한 이미지만 실패 처리하고 나머지는 계속 배치 처리
+            results[index] = (None, None, f"이미지 디코딩 실패: {str(e)}")
+
+    megapixels = sum(image.width * image.height for _, image in decoded) / 1_000_000
+    if decoded:
+        mask_images = None
+        if REMBG_LOWRES_MASK and REMBG_DRAFT_DECODE:
+            # 마스크는 모델 해상도면 충분하므로 JPEG는 축소 디코딩한 이미지로 예측
+            mask_images = [draft_for_mask(images_data[index], model_name) for index, _ in decoded]
+        output_images = remove_background_batch([image for _, image in decoded], model_name, mask_images)
+        for (index, _), output_image in zip(decoded, output_images):
+            crop = None
+            if BG_AUTOCROP:
+                output_image, crop = crop_to_alpha(output_image)
+            output_buffer = io.BytesIO()
+            output_image.save(output_buffer, format="PNG")
+            results[index] = (output_buffer.getvalue(), crop, None)
+
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KB 단위
+    return results, os.getpid(), time.time() - work_start, megapixels, max_rss_mb
+
+
+class BackgroundRemovalPool:
+    """미리 로드된 rembg 세션을 가진 프로세스 풀"""
+
+    def __init__(self,
+                 processes: int = BG_WORKER_PROCESSES,
+                 max_queue: int = BG_WORKER_MAX_QUEUE,
+                 max_batch_size: int = BG_BATCH_MAX_SIZE,
+                 max_batch_wait_ms: float = BG_BATCH_MAX_WAIT_MS):
+        """
+        Args:
+            processes (int): 워커 프로세스 수
+            max_queue (int): 실행 중인 작업 외에 대기할 수 있는 최대 작업 수
+            max_batch_size (int): 한 번의 추론에 묶을 최대 이미지 수
+            max_batch_wait_ms (float): 배치를 채우기 위해 기다리는 최대 시간(ms)
+        """
+        self.processes = max(1, processes)
+        self.max_queue = max_queue
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_batch_wait = max(0.0, max_batch_wait_ms) / 1000
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._started_at: Optional[float] = None
+        self._pending = 0
+        self._workers = {}
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_queue_wait = 0.0
+        self._batches = {}
+        self._flush_handles = {}
+        self._batch_tasks = set()
+        self.batch_sizes = Counter()
+        self.total_batch_wait = 0.0
+        self.total_busy_seconds = 0.0
+        self.total_megapixels = 0.0
+        self.restarts = 0
+        self.batch_inference: Optional[bool] = None  # 기본 모델의 배치 추론 가능 여부 (워커 시작 후 확인)
+
+    @property
+    def max_pending(self) -> int:
+        return self.processes + self.max_queue
+
+    async def start(self):
+        """
+        워커 프로세스를 생성하고 모델 로드가 끝날 때까지 기다립니다.
+        모델 로드에 실패하면 풀을 정리하고 예외를 올리므로 다음 호출에서 다시 시작합니다.
+        """
+        if self._executor is not None:
+            return
+        # fork 시 부모의 스레드/소켓 상태가 복제되지 않도록 spawn 사용
+        executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker
+        )
+        loop = asyncio.get_running_loop()
+        try:
+            pings = await asyncio.gather(*[
+                loop.run_in_executor(executor, _ping_worker) for _ in range(self.processes)
+            ])
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        if self._executor is not None:
+            # 동시에 시작한 다른 호출이 먼저 풀을 준비한 경우
+            executor.shutdown(wait=False)
+            return
+        self._executor = executor
+        self._started_at = time.time()
+        self.batch_inference = all(batch_inference for _, batch_inference in pings)
+        print(f"[BG_WORKER] 워커 풀 준비 완료: {sorted(set(pid for pid, _ in pings))}")
+        if not self.batch_inference and self.max_batch_size > 1:
+            print("[BG_WORKER] 기본 모델의 배치 차원이 고정되어 있어 배칭 대기 없이 이미지별로 처리합니다.")
+
+    def _reset_broken(self, executor: Optional[ProcessPoolExecutor]):
+        """워커 프로세스가 비정상 종료(OOM 등)된 풀을 버려 다음 요청에서 다시 만들도록 합니다."""
+        if executor is None or self._executor is not executor:
+            return
+        print("[BG_WORKER] 워커 프로세스가 비정상 종료되어 풀을 다시 만듭니다.")
+        self._executor = None
+        self.restarts += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def remove_background_bytes(self, image_data: bytes, model_name: Optional[str] = None) -> BackgroundRemovalResult:
+        """
+        워커 프로세스에서 이미지 바이트의 배경을 제거합니다.
+
+        Args:
+            image_data (bytes): 입력 이미지 데이터
+            model_name (Optional[str]): rembg 모델 이름 (None이면 기본 모델)
+
+        Returns:
+            BackgroundRemovalResult: 배경이 제거된 PNG 이미지 데이터와 자르기 정보
+
+        Raises:
+            QueueFullError: 대기열이 가득 찬 경우
+        """
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise QueueFullError(f"배경 제거 대기열이 가득 찼습니다 ({self._pending}/{self.max_pending})")
+        if self._executor is None:
+            await self.start()
+
+        self._pending += 1
+        try:
+            return await self._submit_to_batch(image_data, model_name)
+        finally:
+            self._pending -= 1
+
+    async def _submit_to_batch(self, image_data: bytes, model_name: Optional[str]) -> BackgroundRemovalResult:
+        """이미지를 모델별 배치에 추가하고, 배치가 차거나 대기 시간이 지나면 처리합니다."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._batches.setdefault(model_name, [])
+        batch.append((image_data, future, time.time()))
+
+        if len(batch) >= self._effective_batch_size(model_name):
+            self._flush(model_name)
+        elif len(batch) == 1:
+            self._flush_handles[model_name] = loop.call_later(self.max_batch_wait, self._flush, model_name)
+
+        return await future
+
+    def _effective_batch_size(self, model_name: Optional[str]) -> int:
+        """배치 추론이 안 되는 기본 모델은 모아도 이미지별로 추론하므로 1 (배칭 대기 생략)"""
+        if model_name is None and self.batch_inference is False:
+            return 1
+        return self.max_batch_size
+
+    def _flush(self, model_name: Optional[str]):
+        """모아둔 배치를 워커로 보냅니다."""
+        handle = self._flush_handles.pop(model_name, None)
+        if handle is not None:
+            handle.cancel()
+        batch = self._batches.pop(model_name, None)
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(model_name, batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, model_name: Optional[str], batch: list):
+        """배치를 한 번의 워커 호출로 처리하고 결과를 각 호출자에게 돌려줍니다."""
+        dispatched_at = time.time()
+        self.batch_sizes[len(batch)] += 1
+        self.total_batch_wait += sum(dispatched_at - enqueued_at for _, _, enqueued_at in batch)
+
+        executor = self._executor
+        try:
+            if executor is None:
+                # 이전 배치에서 풀이 깨져 버려진 경우 다시 시작
+                await self.start()
+                executor = self._executor
+            loop = asyncio.get_running_loop()
+            results, pid, busy_seconds, megapixels, max_rss_mb = await loop.run_in_executor(
+                executor, _remove_background_batch_in_worker,
+                [image_data for image_data, _, _ in batch], model_name
+            )
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._reset_broken(executor)
+            self.failed += len(batch)
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        worker = self._workers.setdefault(pid, {"jobs": 0, "batches": 0, "busy_seconds": 0.0, "max_rss_mb": 0.0})
+        worker["jobs"] += len(batch)
+        worker["batches"] += 1
+        worker["busy_seconds"] += busy_seconds
+        worker["max_rss_mb"] = max_rss_mb
+        self.total_busy_seconds += busy_seconds
+        self.total_megapixels += megapixels
+        self.total_queue_wait += max(0.0, time.time() - dispatched_at - busy_seconds) * len(batch)
+
+        for (_, future, _), (png_data, crop, error) in zip(batch, results):
+            if error is not None:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(ValueError(error))
+            else:
+                self.completed += 1
+                if not future.done():
+                    future.set_result(BackgroundRemovalResult(png_data, crop))
+
+    def shutdown(self):
+        """워커 프로세스를 종료합니다."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        """대기열 깊이와 워커별 사용률 통계를 반환합니다."""
+        uptime = time.time() - self._started_at if self._started_at else 0.0
+        images = sum(size * count for size, count in self.batch_sizes.items())
+        batches = sum(self.batch_sizes.values())
+        return {
+            "processes": self.processes,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+            "avg_queue_wait_seconds": round(self.total_queue_wait / images, 3) if images else 0.0,
+            "batching": {
+                "max_batch_size": self.max_batch_size,
+                "batch_inference": self.batch_inference,
+                "effective_max_batch_size": self._effective_batch_size(None),
+                "max_wait_ms": round(self.max_batch_wait * 1000, 1),
+                "batches": batches,
+                "avg_batch_size": round(images / batches, 2) if batches else 0.0,
+                "batch_size_histogram": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+                "avg_batching_delay_ms": round(self.total_batch_wait / images * 1000, 2) if images else 0.0,
+                "images_per_busy_second": round(images / self.total_busy_seconds, 2) if self.total_busy_seconds else 0.0,
+                "images_per_second": round(self.completed / uptime, 3) if uptime else 0.0
+            },
+            "per_megapixel": {
+                "lowres_mask": REMBG_LOWRES_MASK,
+                "megapixels": round(self.total_megapixels, 2),
+                "seconds_per_megapixel": round(self.total_busy_seconds / self.total_megapixels, 4) if self.total_megapixels else 0.0
+            },
+            "workers": {
+                str(pid): {
+                    "jobs": worker["jobs"],
+                    "batches": worker["batches"],
+                    "busy_seconds": round(worker["busy_seconds"], 3),
+                    "max_rss_mb": round(worker["max_rss_mb"], 1),
+                    "utilization": round(worker["busy_seconds"] / uptime, 4) if uptime else 0.0
+                }
+                for pid, worker in self._workers.items()
+            }
+        }
+
+
+bg_worker_pool = BackgroundRemovalPool()
@@ -0,0 +1,196 @@
+"""
+공용 캐시 저장소
+
+- LRUCache: 스레드 안전한 메모리 LRU 캐시 (TTL, 최대 항목 수, 적중/제거 통계)
+- open_sqlite: 영속 캐시 계층이 공유하는 SQLite 연결 생성
+- SQLiteKVStore: 재시작 후에도 유지되는 SQLite 기반 키-값 저장소 (TTL, 최대 행 수)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class LRUCache:
+    """최근에 사용되지 않은 항목부터 제거하는 메모리 캐시"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        """
+        Args:
+            max_entries (int): 최대 항목 수
+            ttl_seconds (Optional[float]): 항목 유효 시간(초), None이면 만료 없음
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """항목을 조회합니다. 없거나 만료된 경우 None을 반환합니다."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = item
+            if self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds:
+                del self._items[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """항목을 저장하고, 최대 항목 수를 넘으면 가장 오래된 항목을 제거합니다."""
+        with self._lock:
+            self._items[key] = (value, time.time())
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def stats(self) -> dict:
+        """적중률 및 제거 통계를 반환합니다."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+
+def open_sqlite(db_path: str) -> sqlite3.Connection:
+    """
+    여러 스레드에서 공유할 SQLite 연결을 엽니다. (호출 측에서 락으로 직렬화해야 합니다)
+
+    Args:
+        db_path (str): 데이터베이스 파일 경로
+
+    Returns:
+        sqlite3.Connection: WAL 모드가 설정된 연결
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SQLiteKVStore:
+    """SQLite 파일에 문자열 값을 저장하는 영속 키-값 저장소"""
+
+    def __init__(self, db_path: str, table: str, max_rows: int = 100000, ttl_seconds: Optional[float] = None):
+        """
+        Args:
+            db_path (str): 데이터베이스 파일 경로
+            table (str): 사용할 테이블 이름
+            max_rows (int): 최대 행 수 (초과 시 가장 오래 사용되지 않은 행부터 삭제)
+            ttl_seconds (Optional[float]): 행 유효 시간(초), None이면 만료 없음
+        """
+        self.table = table
+        self.max_rows = max_rows
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(db_path)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_last_access ON {table}(last_access)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """값을 조회합니다. 없거나 만료된 경우 None을 반환합니다."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: str):
+        """값을 저장합니다."""
+        self.put_many([(key, value)])
+
+    def put_many(self, items: list):
+        """여러 (키, 값) 쌍을 한 트랜잭션으로 저장합니다."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                [(key, value, now, now) for key, value in items]
+            )
+            self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self):
+        """최대 행 수를 넘는 만큼 가장 오래 사용되지 않은 행을 삭제합니다."""
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        overflow = count - self.max_rows
+        if overflow > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY last_access LIMIT ?)",
+                (overflow,)
+            )
+            self.evictions += overflow
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def stats(self) -> dict:
+        """적중률 및 제거 통계를 반환합니다."""
+        rows = len(self)
+        lookups = self.hits + self.misses
+        return {
+            "rows": rows,
+            "max_rows": self.max_rows,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
@@ -0,0 +1,150 @@
+"""
+캐릭터 카탈로그 캐시
+
+character 테이블의 picture_cartoon 목록은 거의 바뀌지 않으므로,
+시작 시 전체를 메모리에 적재하고 요청마다 메모리에서 랜덤 이미지를 고릅니다.
+TTL마다 백그라운드에서 갱신하며, 명시적으로 무효화(즉시 재적재)할 수도 있습니다.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+
+def extract_picture_urls(picture_cartoon) -> list:
+    """
+    picture_cartoon 컬럼 값에서 이미지 URL 목록을 추출합니다.
+
+    Args:
+        picture_cartoon: 문자열 또는 {"url": ...} 딕셔너리의 리스트
+
+    Returns:
+        list: 유효한 이미지 URL 목록
+    """
+    if not picture_cartoon or not isinstance(picture_cartoon, list):
+        return []
+
+    urls = []
+    for item in picture_cartoon:
+        # 딕셔너리 형태인 경우 url 키의 값을 추출
+        if isinstance(item, dict) and 'url' in item:
+            urls.append(item['url'])
+        # 문자열인 경우 그대로 사용
+        elif isinstance(item, str):
+            urls.append(item)
+        else:
+            print(f"[CATALOG] 예상치 못한 데이터 형태: {type(item)}, 값: {item}")
+    return urls
+
+
+class CharacterCatalog:
+    """캐릭터 ID별 picture_cartoon URL 목록을 메모리에 보관하는 캐시"""
+
+    def __init__(self, gateway_factory: Callable, ttl_seconds: float = 300):
+        """
+        Args:
+            gateway_factory: SupabaseGateway를 반환하는 함수
+            ttl_seconds (float): 백그라운드 갱신 주기(초)
+        """
+        self.gateway_factory = gateway_factory
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        self._last_refresh_error: Optional[str] = None
+
+    def refresh(self) -> int:
+        """
+        character 테이블 전체를 다시 읽어 카탈로그를 교체합니다.
+
+        Returns:
+            int: 적재된 캐릭터 수
+        """
+        try:
+            rows = self.gateway_factory().select("character", "id, picture_cartoon")
+        except Exception as e:
+            self._last_refresh_error = str(e)
+            print(f"[CATALOG] 캐릭터 카탈로그 갱신 실패: {str(e)}")
+            raise
+
+        entries = {str(row.get("id")): extract_picture_urls(row.get("picture_cartoon")) for row in rows}
+        with self._lock:
+            self._entries = entries
+            self._loaded_at = time.time()
+            self._refreshes += 1
+            self._last_refresh_error = None
+        print(f"[CATALOG] 캐릭터 카탈로그 갱신 완료: {len(entries)}개")
+        return len(entries)
+
+    def _load_single(self, character_id: str) -> list:
+        """카탈로그에 없는 캐릭터 하나를 조회하여 카탈로그에 추가합니다."""
+        rows = self.gateway_factory().select("character", "picture_cartoon", {"id": character_id})
+        if not rows:
+            return []
+        urls = extract_picture_urls(rows[0].get("picture_cartoon"))
+        with self._lock:
+            self._entries[character_id] = urls
+        return urls
+
+    def pick(self, character_id: str) -> Optional[str]:
+        """
+        캐릭터의 picture_cartoon 중 랜덤한 이미지 URL을 반환합니다.
+
+        Args:
+            character_id (str): 캐릭터 ID
+
+        Returns:
+            str: 랜덤하게 선택된 이미지 URL
+            None: 캐릭터가 없거나 이미지 목록이 비어있는 경우
+        """
+        character_id = str(character_id)
+        with self._lock:
+            urls = self._entries.get(character_id)
+            if urls is not None:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+        # 카탈로그에 없는 캐릭터는 (새로 추가된 경우일 수 있으므로) 직접 조회
+        if urls is None:
+            urls = self._load_single(character_id)
+
+        if not urls:
+            return None
+        return random.choice(urls)
+
+    async def run_refresh_loop(self, executor=None):
+        """TTL마다 카탈로그를 백그라운드에서 갱신합니다. (취소될 때까지 실행)"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.ttl_seconds)
+            try:
+                await loop.run_in_executor(executor, self.refresh)
+            except Exception:
+                # 실패 시 기존 카탈로그를 계속 사용하고 다음 주기에 재시도
+                pass
+
+    def stats(self) -> dict:
+        """
+        카탈로그 통계를 반환합니다.
+
+        Returns:
+            dict: 적중률, 카탈로그 나이 등
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "characters": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "age_seconds": round(time.time() - self._loaded_at, 1) if self._loaded_at else None,
+                "ttl_seconds": self.ttl_seconds,
+                "refreshes": self._refreshes,
+                "last_refresh_error": self._last_refresh_error
+            }
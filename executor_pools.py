@@ -0,0 +1,128 @@
+"""
+작업 종류별 스레드 풀
+
+모든 작업이 하나의 ThreadPoolExecutor를 나눠 쓰면 느린 작업(OpenAI 얼굴 스왑)이 스레드를 모두 차지해
+빠른 작업(캐리커쳐 변환)이 몇 분씩 밀릴 수 있으므로, 작업 종류마다 별도의 풀을 둡니다.
+풀 크기는 작업 대기열의 종류별 동시 처리 수(JOB_TYPE_CONCURRENCY)를 따릅니다.
+
+풀마다 대기 중인 작업 수, 실행 중인 작업 수, 제출부터 실행 시작까지의 대기 시간, 실행 시간을 기록합니다.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from job_queue import concurrency_for
+
+
+class InstrumentedExecutor:
+    """대기 길이와 대기 시간을 기록하는 스레드 풀"""
+
+    def __init__(self, name: str, max_workers: int):
+        """
+        Args:
+            name (str): 풀 이름 (작업 종류)
+            max_workers (int): 최대 스레드 수
+        """
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"job-{name}")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    async def run(self, func, *args):
+        """함수를 풀의 스레드에서 실행하고 결과를 기다립니다."""
+        submitted_at = time.time()
+        with self._lock:
+            self.queued += 1
+
+        def instrumented():
+            started_at = time.time()
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self.total_wait_seconds += started_at - submitted_at
+                self.max_wait_seconds = max(self.max_wait_seconds, started_at - submitted_at)
+            succeeded = False
+            try:
+                result = func(*args)
+                succeeded = True
+                return result
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.total_run_seconds += time.time() - started_at
+                    if succeeded:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+        # 작업 데드라인(resilience.deadline_scope)이 스레드에서도 보이도록 컨텍스트를 복사
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, context.run, instrumented)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def stats(self) -> dict:
+        """대기/실행 중인 작업 수와 평균/최대 대기 시간, 평균 실행 시간을 반환합니다."""
+        with self._lock:
+            finished = self.completed + self.failed
+            started = finished + self.active
+            return {
+                "max_workers": self.max_workers,
+                "queued": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait_seconds": round(self.total_wait_seconds / started, 3) if started else 0.0,
+                "max_wait_seconds": round(self.max_wait_seconds, 3),
+                "avg_run_seconds": round(self.total_run_seconds / finished, 3) if finished else 0.0
+            }
+
+
+class ExecutorPools:
+    """작업 종류별 스레드 풀 모음 (처음 사용할 때 생성)"""
+
+    def __init__(self):
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> InstrumentedExecutor:
+        """작업 종류의 풀을 반환합니다."""
+        with self._lock:
+            pool = self._pools.get(name)
+            if pool is None:
+                pool = InstrumentedExecutor(name, concurrency_for(name))
+                self._pools[name] = pool
+                print(f"[EXECUTOR] 작업 풀 생성: {name} (스레드 {pool.max_workers}개)")
+            return pool
+
+    async def run(self, name: str, func, *args):
+        """작업 종류의 풀에서 함수를 실행합니다."""
+        return await self.get(name).run(func, *args)
+
+    def shutdown(self, wait: bool = True):
+        """모든 풀을 종료합니다."""
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.shutdown(wait=wait)
+
+    def stats(self) -> dict:
+        """풀별 통계를 반환합니다."""
+        with self._lock:
+            pools = dict(self._pools)
+        return {name: pool.stats() for name, pool in pools.items()}
+
+
+executor_pools = ExecutorPools()
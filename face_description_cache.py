@@ -0,0 +1,226 @@
+"""
+얼굴 묘사 캐시
+
+같은 셀카를 여러 캐릭터/프롬프트로 반복 제출하는 경우가 많으므로,
+이미지 바이트 해시 + 프롬프트 해시를 키로 Gemini 묘사 결과를 저장합니다.
+
+- 1단계: 메모리 LRU (정확히 같은 이미지)
+- 2단계: SQLite (재시작 후에도 유지)
+- 근사 적중: 지각 해시(dHash)의 해밍 거리가 임계값 이하인 이미지 (재인코딩/리사이즈된 재업로드)
+
+근사 검색은 64비트 해시를 16비트씩 4개 밴드로 나누어 인덱싱합니다.
+해밍 거리 3 이하인 두 해시는 최소 한 밴드가 완전히 일치하므로 (비둘기집 원리)
+밴드 일치 후보만 조회하여 거리를 계산합니다.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from PIL import Image
+
+from cache_store import LRUCache, open_sqlite
+
+# 캐시 설정
+FACE_CACHE_ENABLED = os.getenv("FACE_CACHE_ENABLED", "1") == "1"
+FACE_CACHE_MEMORY_SIZE = int(os.getenv("FACE_CACHE_MEMORY_SIZE", "1024"))
+FACE_CACHE_MAX_ROWS = int(os.getenv("FACE_CACHE_MAX_ROWS", "50000"))
+FACE_CACHE_TTL = float(os.getenv("FACE_CACHE_TTL", str(7 * 24 * 3600)))  # 기본 7일
+FACE_CACHE_DB_PATH = os.getenv("FACE_CACHE_DB_PATH", "cache/face_descriptions.sqlite3")
+FACE_CACHE_PHASH_DISTANCE = int(os.getenv("FACE_CACHE_PHASH_DISTANCE", "3"))  # 4개 밴드 기준 최대 3까지 보장
+
+PHASH_BANDS = 4
+
+
+class FaceCacheKey(NamedTuple):
+    content_hash: str
+    prompt_hash: str
+    phash: int
+
+    @property
+    def exact(self) -> str:
+        return f"{self.content_hash}:{self.prompt_hash}"
+
+    @property
+    def bands(self) -> tuple:
+        return tuple((self.phash >> (16 * i)) & 0xFFFF for i in range(PHASH_BANDS))
+
+
+def compute_dhash(image: Image.Image) -> int:
+    """
+    이미지의 64비트 차분 해시(dHash)를 계산합니다.
+
+    Args:
+        image: PIL 이미지 객체
+
+    Returns:
+        int: 64비트 지각 해시
+    """
+    small = image.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+
+class FaceDescriptionCache:
+    """메모리 LRU + SQLite 2단계 얼굴 묘사 캐시"""
+
+    def __init__(self,
+                 db_path: str = FACE_CACHE_DB_PATH,
+                 memory_size: int = FACE_CACHE_MEMORY_SIZE,
+                 max_rows: int = FACE_CACHE_MAX_ROWS,
+                 ttl_seconds: float = FACE_CACHE_TTL,
+                 max_phash_distance: int = FACE_CACHE_PHASH_DISTANCE):
+        self.max_rows = max_rows
+        self.ttl_seconds = ttl_seconds
+        self.max_phash_distance = max_phash_distance
+        self.memory = LRUCache(max_entries=memory_size, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(db_path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS face_descriptions ("
+            "content_hash TEXT NOT NULL, prompt_hash TEXT NOT NULL, phash TEXT NOT NULL, "
+            "band0 INTEGER NOT NULL, band1 INTEGER NOT NULL, band2 INTEGER NOT NULL, band3 INTEGER NOT NULL, "
+            "description TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL, "
+            "PRIMARY KEY (content_hash, prompt_hash))"
+        )
+        for band in range(PHASH_BANDS):
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_face_band{band} ON face_descriptions(prompt_hash, band{band})"
+            )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_face_last_access ON face_descriptions(last_access)")
+        self._conn.commit()
+        self.disk_hits = 0
+        self.phash_hits = 0
+        self.misses = 0
+        self.disk_evictions = 0
+        self.disk_expirations = 0
+
+    def make_key(self, image_data: bytes, image: Image.Image, prompt: str) -> FaceCacheKey:
+        """이미지 바이트, 디코딩된 이미지, 프롬프트로 캐시 키를 만듭니다."""
+        return FaceCacheKey(
+            content_hash=hashlib.sha256(image_data).hexdigest(),
+            prompt_hash=hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:32],
+            phash=compute_dhash(image)
+        )
+
+    def get(self, key: FaceCacheKey) -> Optional[str]:
+        """
+        캐시된 얼굴 묘사를 조회합니다.
+
+        Returns:
+            str: 캐시된 묘사 (정확히 같은 이미지 또는 지각 해시가 가까운 이미지)
+            None: 캐시에 없는 경우
+        """
+        description = self.memory.get(key.exact)
+        if description is not None:
+            return description
+
+        now = time.time()
+        min_created_at = now - self.ttl_seconds
+        with self._lock:
+            # 정확히 같은 이미지
+            row = self._conn.execute(
+                "SELECT description, created_at FROM face_descriptions WHERE content_hash = ? AND prompt_hash = ?",
+                (key.content_hash, key.prompt_hash)
+            ).fetchone()
+            if row is not None and row[1] < min_created_at:
+                self._conn.execute(
+                    "DELETE FROM face_descriptions WHERE content_hash = ? AND prompt_hash = ?",
+                    (key.content_hash, key.prompt_hash)
+                )
+                self._conn.commit()
+                self.disk_expirations += 1
+                row = None
+            if row is not None:
+                self._touch_locked(key.content_hash, key.prompt_hash, now)
+                self.disk_hits += 1
+                self.memory.put(key.exact, row[0])
+                return row[0]
+
+            # 지각 해시가 가까운 이미지 (밴드 일치 후보만 조회)
+            bands = key.bands
+            candidates = self._conn.execute(
+                "SELECT content_hash, phash, description FROM face_descriptions "
+                "WHERE prompt_hash = ? AND created_at >= ? "
+                "AND (band0 = ? OR band1 = ? OR band2 = ? OR band3 = ?)",
+                (key.prompt_hash, min_created_at, *bands)
+            ).fetchall()
+
+            best = None
+            for content_hash, phash_hex, description in candidates:
+                distance = bin(int(phash_hex, 16) ^ key.phash).count("1")
+                if distance <= self.max_phash_distance and (best is None or distance < best[0]):
+                    best = (distance, content_hash, description)
+
+            if best is not None:
+                self._touch_locked(best[1], key.prompt_hash, now)
+                self.phash_hits += 1
+                self.memory.put(key.exact, best[2])
+                return best[2]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: FaceCacheKey, description: str):
+        """얼굴 묘사를 메모리와 SQLite에 저장합니다."""
+        self.memory.put(key.exact, description)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO face_descriptions "
+                "(content_hash, prompt_hash, phash, band0, band1, band2, band3, description, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key.content_hash, key.prompt_hash, f"{key.phash:016x}", *key.bands, description, now, now)
+            )
+            self._evict_locked()
+            self._conn.commit()
+
+    def _touch_locked(self, content_hash: str, prompt_hash: str, now: float):
+        self._conn.execute(
+            "UPDATE face_descriptions SET last_access = ? WHERE content_hash = ? AND prompt_hash = ?",
+            (now, content_hash, prompt_hash)
+        )
+        self._conn.commit()
+
+    def _evict_locked(self):
+        """최대 행 수를 넘는 만큼 가장 오래 사용되지 않은 행을 삭제합니다."""
+        count = self._conn.execute("SELECT COUNT(*) FROM face_descriptions").fetchone()[0]
+        overflow = count - self.max_rows
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM face_descriptions WHERE rowid IN "
+                "(SELECT rowid FROM face_descriptions ORDER BY last_access LIMIT ?)",
+                (overflow,)
+            )
+            self.disk_evictions += overflow
+
+    def stats(self) -> dict:
+        """캐시 적중/제거 통계를 반환합니다."""
+        with self._lock:
+            rows = self._conn.execute("SELECT COUNT(*) FROM face_descriptions").fetchone()[0]
+        memory_stats = self.memory.stats()
+        hits = memory_stats["hits"] + self.disk_hits + self.phash_hits
+        lookups = hits + self.misses
+        return {
+            "memory": memory_stats,
+            "disk": {
+                "rows": rows,
+                "max_rows": self.max_rows,
+                "exact_hits": self.disk_hits,
+                "phash_hits": self.phash_hits,
+                "evictions": self.disk_evictions,
+                "expirations": self.disk_expirations
+            },
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "ttl_seconds": self.ttl_seconds,
+            "max_phash_distance": self.max_phash_distance
+        }
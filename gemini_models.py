@@ -0,0 +1,107 @@
+"""
+Gemini 모델 레지스트리
+
+genai.configure와 GenerativeModel 생성을 호출마다 반복하지 않도록
+API 키 설정은 프로세스당 한 번, 모델 객체는 모델 이름당 하나만 만들어 재사용합니다.
+모델 객체가 재사용되므로 내부 gRPC 클라이언트(전송 계층)도 함께 재사용됩니다.
+
+generate_content_async는 genai의 비동기 클라이언트를 사용하므로
+Gemini 호출 동안 실행기 스레드를 점유하지 않습니다.
+모든 호출은 "gemini" 제공자 제한기(provider_limits)를 거치고, 일시적 오류는 resilience 정책에 따라 재시도합니다.
+"""
+
+import os
+import threading
+from typing import Optional
+
+import google.generativeai as genai
+
+from provider_limits import limit, limit_async
+from resilience import call, call_async
+
+DEFAULT_MODEL_NAME = "gemini-2.0-flash-exp"
+
+_models = {}
+_lock = threading.Lock()
+_configured_key: Optional[str] = None
+
+
+def configure(api_key: Optional[str] = None):
+    """
+    Gemini API 키를 설정합니다. 같은 키로는 한 번만 설정합니다.
+
+    Args:
+        api_key (Optional[str]): API 키 (None이면 GEMINI_API_KEY 환경변수 사용)
+
+    Raises:
+        ValueError: API 키가 없는 경우
+    """
+    global _configured_key
+
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY 환경변수가 설정되지 않았습니다.")
+
+    with _lock:
+        if _configured_key != api_key:
+            genai.configure(api_key=api_key)
+            _configured_key = api_key
+            # 키가 바뀌면 기존 모델 객체의 클라이언트도 다시 만들어야 함
+            _models.clear()
+            print("[GEMINI] Gemini API 설정 완료")
+
+
+def get_model(model_name: str = DEFAULT_MODEL_NAME) -> genai.GenerativeModel:
+    """
+    모델 이름에 해당하는 공유 GenerativeModel을 반환합니다. (최초 호출 시 생성)
+
+    Args:
+        model_name (str): Gemini 모델 이름
+
+    Returns:
+        genai.GenerativeModel: 공유 모델 객체
+    """
+    if _configured_key is None:
+        configure()
+
+    with _lock:
+        model = _models.get(model_name)
+        if model is None:
+            model = genai.GenerativeModel(model_name)
+            _models[model_name] = model
+            print(f"[GEMINI] 모델 생성: {model_name}")
+        return model
+
+
+def preload(model_names: list):
+    """시작 시 사용할 모델들을 미리 생성합니다."""
+    for model_name in model_names:
+        get_model(model_name)
+
+
+def generate_content(contents, model_name: str = DEFAULT_MODEL_NAME, **kwargs):
+    """공유 모델로 동기 generate_content를 호출합니다."""
+    model = get_model(model_name)
+
+    def attempt():
+        with limit("gemini"):
+            return model.generate_content(contents, **kwargs)
+
+    return call("gemini", attempt)
+
+
+async def generate_content_async(contents, model_name: str = DEFAULT_MODEL_NAME, **kwargs):
+    """공유 모델로 비동기 generate_content를 호출합니다. (실행기 스레드를 사용하지 않음)"""
+    model = get_model(model_name)
+
+    async def attempt():
+        async with limit_async("gemini"):
+            return await model.generate_content_async(contents, **kwargs)
+
+    return await call_async("gemini", attempt)
+
+
+def loaded_models() -> list:
+    """현재 생성되어 있는 모델 이름 목록을 반환합니다."""
+    with _lock:
+        return list(_models.keys())
@@ -6,11 +6,18 @@ import numpy as np
 import cv2
 import base64
 import io
+import sys
+import time
 import uuid
+from mask_engine import background_mask_tiled, border_connected_mask, mean_border_color
 
 # .env 파일에서 환경변수 로드
 load_dotenv()
 
+# 마스크 생성 설정
+MASK_DISTANCE_THRESHOLD = 50  # 배경 색상과의 거리가 이보다 가까우면 배경
+MASK_FLOOD_FILL = os.getenv("MASK_FLOOD_FILL", "0") == "1"  # 1이면 테두리와 연결된 배경만 제거 (기본은 이전 동작과 같음)
+
 def get_gemini_client():
     """Gemini 2.5 Flash 클라이언트를 설정합니다."""
     api_key = os.getenv("GEMINI_API_KEY")
@@ -28,45 +35,89 @@ def load_image_from_file(image_path: str):
         print(f"이미지 로드 중 오류 발생: {str(e)}")
         return None
 
-def create_mask_from_analysis(image: Image.Image, analysis_result: str):
+def create_mask_from_analysis(image: Image.Image, analysis_result: str, flood_fill: bool = MASK_FLOOD_FILL):
     """
     Gemini 분석 결과를 바탕으로 간단한 마스크를 생성합니다.
     실제로는 rembg나 다른 라이브러리를 사용하는 것이 더 정확하지만,
     여기서는 Gemini API만 사용하라는 요청에 따라 기본적인 처리만 합니다.
+    
+    가장자리의 평균 색상을 배경으로 간주하고, 배경 색상과의 거리가 임계값보다 가까운 픽셀을
+    행 타일 단위 벡터 연산으로 찾습니다. flood_fill이 True면 테두리와 연결된 영역만 배경으로 보아
+    피사체 안쪽의 배경색과 비슷한 픽셀은 유지합니다.
     """
-    # 이미지를 numpy 배열로 변환
-    img_array = np.array(image)
+    # 이미지를 RGB numpy 배열로 변환
+    img_array = np.asarray(image.convert("RGB"))
+    
+    # 가장자리 픽셀들의 평균 색상 계산
+    bg_color = mean_border_color(img_array)
+    
+    # 배경 색상과 유사한 픽셀을 찾아 마스크 생성 (임계값 조정 가능)
+    background = background_mask_tiled(img_array, bg_color, MASK_DISTANCE_THRESHOLD)
+    if flood_fill:
+        background = border_connected_mask(background)
+    
+    mask = np.full(background.shape, 255, dtype=np.uint8)  # 전경 (보존할 부분)
+    mask[background] = 0  # 배경 (제거할 부분)
     
-    # 기본적인 색상 기반 배경 제거 시도
-    # 가장자리의 평균 색상을 배경으로 간주
+    return Image.fromarray(mask, mode='L')
+
+def create_mask_per_pixel(image: Image.Image) -> Image.Image:
+    """벤치마크 비교용: 픽셀마다 거리를 계산하던 이전 방식의 마스크 생성"""
+    img_array = np.array(image.convert("RGB"))
     height, width = img_array.shape[:2]
     
-    # 가장자리 픽셀들의 평균 색상 계산
     edge_pixels = []
-    edge_pixels.extend(img_array[0, :].tolist())  # 상단
-    edge_pixels.extend(img_array[-1, :].tolist())  # 하단
-    edge_pixels.extend(img_array[:, 0].tolist())  # 좌측
-    edge_pixels.extend(img_array[:, -1].tolist())  # 우측
+    edge_pixels.extend(img_array[0, :].tolist())
+    edge_pixels.extend(img_array[-1, :].tolist())
+    edge_pixels.extend(img_array[:, 0].tolist())
+    edge_pixels.extend(img_array[:, -1].tolist())
+    bg_color = np.mean(np.array(edge_pixels), axis=0)
     
-    edge_pixels = np.array(edge_pixels)
-    bg_color = np.mean(edge_pixels, axis=0)
-    
-    # 배경 색상과 유사한 픽셀을 찾아 마스크 생성
     mask = np.zeros((height, width), dtype=np.uint8)
-    
     for y in range(height):
         for x in range(width):
-            pixel = img_array[y, x]
-            # 배경 색상과의 거리 계산
-            distance = np.sqrt(np.sum((pixel - bg_color) ** 2))
-            # 임계값보다 가까우면 배경으로 간주
-            if distance < 50:  # 임계값 조정 가능
-                mask[y, x] = 0  # 배경 (제거할 부분)
-            else:
-                mask[y, x] = 255  # 전경 (보존할 부분)
+            distance = np.sqrt(np.sum((img_array[y, x] - bg_color) ** 2))
+            mask[y, x] = 0 if distance < MASK_DISTANCE_THRESHOLD else 255
     
     return Image.fromarray(mask, mode='L')
 
+def benchmark_mask(image_path: str, legacy_size: int = 256):
+    """
+    벡터화된 마스크 생성과 이전 픽셀 루프 방식의 속도를 비교합니다.
+    픽셀 루프는 매우 느리므로 legacy_size로 축소한 이미지에서 측정하여 메가픽셀당 시간으로 비교합니다.
+    """
+    image = load_image_from_file(image_path)
+    if image is None:
+        return
+    
+    small = image.convert("RGB")
+    small.thumbnail((legacy_size, legacy_size))
+    small_megapixels = small.width * small.height / 1_000_000
+    full_megapixels = image.width * image.height / 1_000_000
+    
+    start = time.perf_counter()
+    create_mask_per_pixel(small)
+    legacy_per_mp = (time.perf_counter() - start) / small_megapixels
+    
+    start = time.perf_counter()
+    create_mask_from_analysis(small, "", flood_fill=False)
+    small_elapsed = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    create_mask_from_analysis(image, "", flood_fill=False)
+    vectorized_per_mp = (time.perf_counter() - start) / full_megapixels
+    
+    start = time.perf_counter()
+    create_mask_from_analysis(image, "", flood_fill=True)
+    flood_fill_per_mp = (time.perf_counter() - start) / full_megapixels
+    
+    print(f"📊 마스크 생성 벤치마크: {image_path} ({image.width}x{image.height})")
+    print(f"   - 픽셀 루프 (축소 {small.width}x{small.height}): {legacy_per_mp:.3f}초/MP")
+    print(f"   - 벡터화 (축소): {small_elapsed * 1000:.1f}ms")
+    print(f"   - 벡터화 (원본): {vectorized_per_mp:.4f}초/MP")
+    print(f"   - 벡터화 + flood fill (원본): {flood_fill_per_mp:.4f}초/MP")
+    print(f"   - 속도 향상: {legacy_per_mp / max(vectorized_per_mp, 1e-9):.0f}배")
+
 def remove_background_with_gemini(image_path: str, output_path: str = None):
     """
     Gemini 2.5 Flash를 사용하여 이미지를 분석하고 배경을 제거합니다.
@@ -178,6 +229,11 @@ def main():
     
     print(f"📂 입력 파일: {input_file}")
     
+    # python gemini_remove_bg.py --benchmark: 마스크 생성 속도 비교만 실행
+    if "--benchmark" in sys.argv:
+        benchmark_mask(input_file)
+        return
+    
     # 배경 제거 실행
     result_path = remove_background_with_gemini(input_file)
     
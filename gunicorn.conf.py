@@ -1,11 +1,12 @@
 # Gunicorn 설정 파일 (프로덕션 환경용)
+import os
 
 # 서버 소켓
 bind = "0.0.0.0:8000"
 backlog = 2048
 
-# 워커 프로세스
-workers = 1
+# 워커 프로세스 (작업은 공유 대기열에서 처리하므로 웹 워커 수는 독립적으로 조정 가능)
+workers = int(os.getenv("GUNICORN_WORKERS", "1"))
 worker_class = "uvicorn.workers.UvicornWorker"
 worker_connections = 1000
 max_requests = 0  # 무제한
@@ -0,0 +1,170 @@
+"""
+프로세스 전역에서 공유하는 HTTP 클라이언트
+
+이미지 다운로드와 외부 API 호출마다 새 연결을 여는 대신,
+keep-alive 커넥션 풀을 재사용하여 TLS 핸드셰이크 비용을 줄입니다.
+
+- 동기 호출: requests.Session + 호스트별 커넥션 풀 (스레드 풀에서 공유)
+- 비동기 호출: aiohttp.ClientSession + TCPConnector (호스트별 연결 제한, DNS 캐시)
+
+requests와 aiohttp는 HTTP/2를 지원하지 않으므로 HTTP/1.1 keep-alive로 연결을 재사용합니다.
+"""
+
+import os
+import threading
+from typing import Optional
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from resilience import remaining_time
+
+# 커넥션 풀 설정
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "32"))  # 캐시할 호스트별 풀 개수
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))  # 호스트당 최대 연결 수
+HTTP_TOTAL_LIMIT = int(os.getenv("HTTP_TOTAL_LIMIT", "100"))  # 비동기 세션 전체 연결 수
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))  # DNS 캐시 유지 시간(초)
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "60"))  # 유휴 연결 유지 시간(초)
+
+# 타임아웃 설정 (모든 경로에서 동일하게 사용)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "300"))
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+MIN_ATTEMPT_TIMEOUT = 0.1  # 데드라인 직전에도 0 이하의 타임아웃을 넘기지 않도록 하는 하한(초)
+
+# 일부 사이트의 봇 차단 우회를 위한 기본 헤더
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+_sync_session: Optional[requests.Session] = None
+_sync_session_lock = threading.Lock()
+_async_session: Optional[aiohttp.ClientSession] = None
+
+
+def get_http_session() -> requests.Session:
+    """
+    프로세스 전역 동기 HTTP 세션을 반환합니다. (최초 호출 시 생성)
+
+    Returns:
+        requests.Session: keep-alive 커넥션 풀이 설정된 세션
+    """
+    global _sync_session
+
+    if _sync_session is None:
+        with _sync_session_lock:
+            if _sync_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                    pool_block=False
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                _sync_session = session
+                print(f"[HTTP] 동기 HTTP 세션 생성 (호스트당 최대 연결: {HTTP_POOL_MAXSIZE})")
+
+    return _sync_session
+
+
+def get_async_http_session() -> aiohttp.ClientSession:
+    """
+    프로세스 전역 비동기 HTTP 세션을 반환합니다. (이벤트 루프 안에서 호출해야 합니다)
+
+    Returns:
+        aiohttp.ClientSession: 호스트별 연결 제한과 DNS 캐시가 설정된 세션
+    """
+    global _async_session
+
+    if _async_session is None or _async_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_TOTAL_LIMIT,
+            limit_per_host=HTTP_POOL_MAXSIZE,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT
+        )
+        _async_session = aiohttp.ClientSession(
+            connector=connector,
+            headers=DEFAULT_HEADERS,
+            timeout=aiohttp.ClientTimeout(
+                total=None,
+                connect=HTTP_CONNECT_TIMEOUT,
+                sock_read=HTTP_READ_TIMEOUT
+            )
+        )
+        print(f"[HTTP] 비동기 HTTP 세션 생성 (전체 연결: {HTTP_TOTAL_LIMIT}, 호스트당: {HTTP_POOL_MAXSIZE})")
+
+    return _async_session
+
+
+def request_timeout() -> tuple:
+    """
+    requests에 넘길 (연결, 읽기) 타임아웃을 반환합니다.
+    deadline_scope 안이면 한 번의 시도가 남은 시간보다 오래 걸리지 않도록 줄입니다.
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return DEFAULT_TIMEOUT
+    remaining = max(remaining, MIN_ATTEMPT_TIMEOUT)
+    return (min(HTTP_CONNECT_TIMEOUT, remaining), min(HTTP_READ_TIMEOUT, remaining))
+
+
+def async_request_timeout() -> aiohttp.ClientTimeout:
+    """
+    aiohttp 요청에 넘길 타임아웃을 반환합니다.
+    deadline_scope 안이면 요청 전체(total)를 남은 시간으로 제한합니다.
+    """
+    remaining = remaining_time()
+    return aiohttp.ClientTimeout(
+        total=None if remaining is None else max(remaining, MIN_ATTEMPT_TIMEOUT),
+        connect=HTTP_CONNECT_TIMEOUT,
+        sock_read=HTTP_READ_TIMEOUT
+    )
+
+
+async def fetch_bytes_async(url: str) -> bytes:
+    """
+    공유 비동기 세션으로 URL의 내용을 다운로드합니다.
+
+    Args:
+        url (str): 다운로드할 URL
+
+    Returns:
+        bytes: 응답 본문
+
+    Raises:
+        aiohttp.ClientResponseError: 응답 상태 코드가 실패인 경우
+    """
+    async with get_async_http_session().get(url, timeout=async_request_timeout()) as response:
+        response.raise_for_status()
+        return await response.read()
+
+
+def close_http_session():
+    """동기 HTTP 세션을 닫습니다."""
+    global _sync_session
+
+    with _sync_session_lock:
+        if _sync_session is not None:
+            _sync_session.close()
+            _sync_session = None
+            print("[HTTP] 동기 HTTP 세션 종료")
+
+
+async def close_async_http_session():
+    """비동기 HTTP 세션을 닫습니다."""
+    global _async_session
+
+    if _async_session is not None and not _async_session.closed:
+        await _async_session.close()
+        print("[HTTP] 비동기 HTTP 세션 종료")
+    _async_session = None
+
+
+async def close_all_http_sessions():
+    """애플리케이션 종료 시 모든 공유 HTTP 세션을 닫습니다."""
+    await close_async_http_session()
+    close_http_session()
@@ -0,0 +1,582 @@
+"""
+영속 작업 대기열
+
+API 프로세스 안의 fire-and-forget 태스크 대신 SQLite 파일에 작업을 기록하고,
+워커 루프가 임대(lease)하여 처리합니다. 프로세스가 재시작되어도 작업이 사라지지 않습니다.
+
+- 상태: queued → leased → completed / failed (실패 시 백오프 후 queued로 재시도)
+- 임대: 워커가 작업을 가져가면 JOB_LEASE_SECONDS 동안 소유하고, 처리 중에는 하트비트로 연장
+- 임대가 만료된 작업(워커 비정상 종료)은 다른 워커가 다시 가져감
+- 최대 시도 횟수를 넘으면 failed로 남기고 마지막 오류를 기록
+- 종료 시 처리 중이던 작업은 시도 횟수를 되돌리고 대기열로 반환
+- 작업 종류별 동시 처리 수(JOB_TYPE_CONCURRENCY): 느린 얼굴 스왑이 빠른 캐리커쳐 작업을 막지 않도록
+  종류마다 별도의 워커 루프를 두고, 종류별 대기 길이와 대기 시간을 기록
+"""
+
+import asyncio
+import json
+import os
+import socket
+import time
+import threading
+import uuid
+from collections import defaultdict
+from typing import NamedTuple, Optional
+
+from cache_store import open_sqlite
+from resilience import deadline_scope
+
+# 대기열 설정
+JOB_QUEUE_DB_PATH = os.getenv("JOB_QUEUE_DB_PATH", "queue/jobs.sqlite3")
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "300"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))  # 완료/실패 작업 보관 기간
+
+# 워커 루프 설정
+JOB_EMBEDDED_WORKER = os.getenv("JOB_EMBEDDED_WORKER", "1") == "1"  # 0이면 API 프로세스는 등록만 하고 worker.py가 처리
+JOB_TYPE_CONCURRENCY_SPEC = os.getenv(
+    "JOB_TYPE_CONCURRENCY", "face_swap=2,face_swap_with_cartoon=2,cartoonify=2,background_removal=2"
+)
+JOB_DEFAULT_TYPE_CONCURRENCY = int(os.getenv("JOB_DEFAULT_TYPE_CONCURRENCY", "1"))  # 설정에 없는 작업 종류
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_SHUTDOWN_GRACE_SECONDS = float(os.getenv("JOB_SHUTDOWN_GRACE_SECONDS", "30"))
+JOB_DEADLINE_SECONDS = float(os.getenv("JOB_DEADLINE_SECONDS", "900"))  # 작업 한 번의 외부 호출 데드라인 (재시도 대기 포함)
+JOB_PURGE_INTERVAL = 3600.0
+
+JOB_STATUSES = ("queued", "leased", "completed", "failed")
+LEASE_EXPIRED_ERROR = "임대 만료: 처리 중 워커가 응답하지 않았습니다. (최대 시도 횟수 초과)"
+
+
+def parse_concurrency(spec: str) -> dict:
+    """
+    'face_swap=2,cartoonify=4' 형식의 설정을 {작업 종류: 동시 처리 수}로 변환합니다.
+
+    Raises:
+        ValueError: 형식이 잘못된 경우
+    """
+    concurrency = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.partition("=")
+        if not name.strip() or not value.strip():
+            raise ValueError(f"동시 처리 수 설정 형식이 잘못되었습니다: {item!r} (예: face_swap=2)")
+        concurrency[name.strip()] = max(1, int(value))
+    return concurrency
+
+
+JOB_TYPE_CONCURRENCY = parse_concurrency(JOB_TYPE_CONCURRENCY_SPEC)
+
+
+def concurrency_for(job_type: str) -> int:
+    """작업 종류의 동시 처리 수를 반환합니다."""
+    return JOB_TYPE_CONCURRENCY.get(job_type, max(1, JOB_DEFAULT_TYPE_CONCURRENCY))
+
+
+class Job(NamedTuple):
+    job_id: str
+    job_type: str
+    payload: dict
+    attempts: int        # 이번 임대를 포함한 시도 횟수
+    max_attempts: int
+
+
+class JobQueue:
+    """SQLite 파일 기반 작업 대기열 (여러 프로세스가 같은 파일을 공유할 수 있음)"""
+
+    def __init__(self, db_path: str = JOB_QUEUE_DB_PATH,
+                 lease_seconds: float = JOB_LEASE_SECONDS,
+                 max_attempts: int = JOB_MAX_ATTEMPTS):
+        """
+        Args:
+            db_path (str): 데이터베이스 파일 경로
+            lease_seconds (float): 임대 유지 시간(초), 하트비트가 없으면 만료
+            max_attempts (int): 작업별 기본 최대 시도 횟수
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self._lock = threading.Lock()
+        self._conn = None
+        self.enqueued = 0
+        self.leased = 0
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        self.reclaimed = 0
+        self.released = 0
+        self._lease_waits = defaultdict(lambda: {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+
+    def _connection(self):
+        """처음 사용할 때 데이터베이스를 열고 테이블을 만듭니다. (호출 측에서 락을 잡아야 합니다)"""
+        if self._conn is None:
+            conn = open_sqlite(self.db_path)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, job_type TEXT NOT NULL, payload TEXT NOT NULL, "
+                "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, "
+                "available_at REAL NOT NULL, lease_owner TEXT, lease_expires_at REAL, last_error TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_available ON jobs(status, available_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def enqueue(self, job_type: str, payload: dict, job_id: Optional[str] = None,
+                max_attempts: Optional[int] = None) -> str:
+        """
+        작업을 대기열에 추가합니다. 같은 job_id가 이미 있으면 다시 추가하지 않습니다.
+
+        Args:
+            job_type (str): 작업 종류 (워커의 핸들러 이름)
+            payload (dict): 핸들러에 전달할 JSON 직렬화 가능한 인자
+            job_id (Optional[str]): 작업 ID (None이면 새로 생성)
+            max_attempts (Optional[int]): 최대 시도 횟수 (None이면 기본값)
+
+        Returns:
+            str: 작업 ID
+        """
+        job_id = job_id or str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, job_type, payload, status, attempts, max_attempts, "
+                "available_at, created_at, updated_at) VALUES (?, ?, ?, 'queued', 0, ?, ?, ?, ?)",
+                (job_id, job_type, json.dumps(payload, ensure_ascii=False),
+                 max_attempts or self.max_attempts, now, now, now)
+            )
+            conn.commit()
+            inserted = cursor.rowcount > 0
+            if inserted:
+                self.enqueued += 1
+        if inserted:
+            print(f"[JOB_QUEUE] 작업 등록: {job_type} {job_id}")
+        return job_id
+
+    async def enqueue_async(self, job_type: str, payload: dict, job_id: Optional[str] = None,
+                            max_attempts: Optional[int] = None) -> str:
+        """enqueue의 비동기 버전 (이벤트 루프를 막지 않도록 스레드에서 실행)"""
+        return await asyncio.to_thread(self.enqueue, job_type, payload, job_id, max_attempts)
+
+    def lease(self, worker_id: str, job_types: Optional[list] = None) -> Optional[Job]:
+        """
+        처리할 작업 하나를 임대합니다. 대기 중인 작업이 없으면 임대가 만료된 작업을 가져갑니다.
+
+        Args:
+            worker_id (str): 임대하는 워커 ID
+            job_types (Optional[list]): 가져올 작업 종류 (None이면 전체)
+
+        Returns:
+            Optional[Job]: 임대한 작업 (없으면 None)
+        """
+        now = time.time()
+        type_filter = ""
+        type_params = []
+        if job_types:
+            type_filter = f" AND job_type IN ({', '.join('?' for _ in job_types)})"
+            type_params = list(job_types)
+
+        with self._lock:
+            conn = self._connection()
+            # 다른 프로세스와 같은 작업을 동시에 가져가지 않도록 쓰기 잠금을 먼저 잡음
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 처리 중 워커가 죽는 작업(OOM 등)이 무한히 다시 임대되지 않도록 시도 횟수를 다 쓴 만료 작업은 실패 처리
+                exhausted = conn.execute(
+                    "UPDATE jobs SET status = 'failed', lease_owner = NULL, lease_expires_at = NULL, "
+                    "last_error = ?, updated_at = ? "
+                    f"WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= max_attempts{type_filter}",
+                    [LEASE_EXPIRED_ERROR, now, now] + type_params
+                ).rowcount
+                row = conn.execute(
+                    "SELECT job_id, job_type, payload, status, attempts, max_attempts, available_at FROM jobs "
+                    "WHERE ((status = 'queued' AND available_at <= ?) OR (status = 'leased' AND lease_expires_at < ?))"
+                    f"{type_filter} ORDER BY available_at LIMIT 1",
+                    [now, now] + type_params
+                ).fetchone()
+                if row is None:
+                    conn.commit()
+                    self._record_exhausted(exhausted)
+                    return None
+
+                job_id, job_type, payload, status, attempts, max_attempts, available_at = row
+                conn.execute(
+                    "UPDATE jobs SET status = 'leased', attempts = ?, lease_owner = ?, lease_expires_at = ?, "
+                    "updated_at = ? WHERE job_id = ?",
+                    (attempts + 1, worker_id, now + self.lease_seconds, now, job_id)
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            self._record_exhausted(exhausted)
+            self.leased += 1
+            # 실행 가능해진 시점부터 임대까지 기다린 시간 (종류별)
+            wait = self._lease_waits[job_type]
+            wait["count"] += 1
+            wait["total_seconds"] += max(0.0, now - available_at)
+            wait["max_seconds"] = max(wait["max_seconds"], now - available_at)
+            if status == "leased":
+                self.reclaimed += 1
+                print(f"[JOB_QUEUE] 임대 만료 작업 회수: {job_type} {job_id}")
+
+        return Job(job_id, job_type, json.loads(payload), attempts + 1, max_attempts)
+
+    def _record_exhausted(self, count: int):
+        if count:
+            self.failed += count
+            print(f"[JOB_QUEUE] 시도 횟수를 모두 쓴 임대 만료 작업 실패 처리: {count}개")
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """
+        임대를 연장합니다.
+
+        Returns:
+            bool: 연장 성공 여부 (다른 워커가 회수했다면 False)
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires_at = ?, updated_at = ? "
+                "WHERE job_id = ? AND status = 'leased' AND lease_owner = ?",
+                (now + self.lease_seconds, now, job_id, worker_id)
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def complete(self, job_id: str, worker_id: str) -> bool:
+        """작업을 완료 상태로 표시합니다."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'completed', lease_owner = NULL, lease_expires_at = NULL, "
+                "last_error = NULL, updated_at = ? WHERE job_id = ? AND lease_owner = ?",
+                (now, job_id, worker_id)
+            )
+            conn.commit()
+            if cursor.rowcount:
+                self.completed += 1
+            return cursor.rowcount > 0
+
+    def fail(self, job: Job, worker_id: str, error: str) -> bool:
+        """
+        작업 실패를 기록합니다. 시도 횟수가 남았으면 지수 백오프 후 재시도하도록 대기열로 돌려놓습니다.
+
+        Returns:
+            bool: 재시도 예약 여부 (False면 최종 실패)
+        """
+        now = time.time()
+        retry = job.attempts < job.max_attempts
+        with self._lock:
+            conn = self._connection()
+            if retry:
+                delay = min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = 'queued', available_at = ?, lease_owner = NULL, "
+                    "lease_expires_at = NULL, last_error = ?, updated_at = ? WHERE job_id = ? AND lease_owner = ?",
+                    (now + delay, error, now, job.job_id, worker_id)
+                )
+            else:
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = 'failed', lease_owner = NULL, lease_expires_at = NULL, "
+                    "last_error = ?, updated_at = ? WHERE job_id = ? AND lease_owner = ?",
+                    (error, now, job.job_id, worker_id)
+                )
+            conn.commit()
+            if cursor.rowcount:
+                if retry:
+                    self.retried += 1
+                else:
+                    self.failed += 1
+
+        if retry:
+            print(f"[JOB_QUEUE] 작업 재시도 예약 ({job.attempts}/{job.max_attempts}, {delay:.1f}초 후): {job.job_id}")
+        else:
+            print(f"[JOB_QUEUE] 작업 최종 실패 ({job.attempts}/{job.max_attempts}): {job.job_id}, {error}")
+        return retry
+
+    def release(self, job: Job, worker_id: str) -> bool:
+        """임대했지만 처리를 시작하지 않은 작업을 시도 횟수를 되돌려 즉시 대기열로 반환합니다. (종료 시 사용)"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = attempts - 1, available_at = ?, "
+                "lease_owner = NULL, lease_expires_at = NULL, updated_at = ? WHERE job_id = ? AND lease_owner = ?",
+                (now, now, job.job_id, worker_id)
+            )
+            conn.commit()
+            if cursor.rowcount:
+                self.released += 1
+            return cursor.rowcount > 0
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """작업의 대기열 상태를 조회합니다. 없으면 None을 반환합니다."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT job_type, status, attempts, max_attempts, available_at, last_error, created_at, updated_at "
+                "FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job_type, status, attempts, max_attempts, available_at, last_error, created_at, updated_at = row
+        return {
+            "job_type": job_type,
+            "status": status,
+            "attempts": attempts,
+            "max_attempts": max_attempts,
+            "available_at": available_at,
+            "last_error": last_error,
+            "created_at": created_at,
+            "updated_at": updated_at
+        }
+
+    async def get_async(self, job_id: str) -> Optional[dict]:
+        """get의 비동기 버전"""
+        return await asyncio.to_thread(self.get, job_id)
+
+    def purge(self, older_than: float = JOB_RETENTION_SECONDS) -> int:
+        """보관 기간이 지난 완료/실패 작업을 삭제합니다."""
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status IN ('completed', 'failed') AND updated_at < ?",
+                (time.time() - older_than,)
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> dict:
+        """
+        작업 종류/상태별 개수와 종류별 대기 시간, 처리 통계를 반환합니다.
+
+        종류별 ready는 지금 바로 처리할 수 있는 대기 작업 수(대기 길이),
+        oldest_ready_wait_seconds는 그중 가장 오래 기다린 작업의 대기 시간,
+        avg/max_lease_wait_seconds는 이 프로세스가 임대한 작업들이 실제로 기다린 시간입니다.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute("SELECT job_type, status, COUNT(*) FROM jobs GROUP BY job_type, status").fetchall()
+            ready_rows = conn.execute(
+                "SELECT job_type, COUNT(*), MIN(available_at) FROM jobs "
+                "WHERE status = 'queued' AND available_at <= ? GROUP BY job_type", (now,)
+            ).fetchall()
+            lease_waits = {job_type: dict(wait) for job_type, wait in self._lease_waits.items()}
+
+        by_type = {}
+
+        def type_stats(job_type):
+            return by_type.setdefault(job_type, {
+                **{name: 0 for name in JOB_STATUSES},
+                "ready": 0,
+                "oldest_ready_wait_seconds": 0.0,
+                "avg_lease_wait_seconds": 0.0,
+                "max_lease_wait_seconds": 0.0
+            })
+
+        for job_type, status, count in rows:
+            type_stats(job_type)[status] = count
+        for job_type, count, oldest in ready_rows:
+            type_stats(job_type)["ready"] = count
+            type_stats(job_type)["oldest_ready_wait_seconds"] = round(now - oldest, 3)
+        for job_type, wait in lease_waits.items():
+            type_stats(job_type)["avg_lease_wait_seconds"] = round(wait["total_seconds"] / wait["count"], 3)
+            type_stats(job_type)["max_lease_wait_seconds"] = round(wait["max_seconds"], 3)
+
+        oldest_ready = max((stats["oldest_ready_wait_seconds"] for stats in by_type.values()), default=0.0)
+        return {
+            "db_path": self.db_path,
+            "by_type": by_type,
+            "oldest_ready_wait_seconds": oldest_ready,
+            "enqueued": self.enqueued,
+            "leased": self.leased,
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "reclaimed": self.reclaimed,
+            "released": self.released
+        }
+
+
+class JobWorker:
+    """대기열에서 작업을 임대해 핸들러로 처리하는 워커 루프 묶음 (작업 종류마다 별도의 루프)"""
+
+    def __init__(self, queue: JobQueue, handlers: dict,
+                 concurrency: Optional[dict] = None,
+                 poll_interval: float = JOB_POLL_INTERVAL):
+        """
+        Args:
+            queue (JobQueue): 작업 대기열
+            handlers (dict): 작업 종류 → 비동기 핸들러(payload) 매핑, 핸들러는 성공 여부(bool)를 반환
+            concurrency (Optional[dict]): 작업 종류별 동시 처리 수 (None이면 JOB_TYPE_CONCURRENCY)
+            poll_interval (float): 대기열이 비었을 때 다시 확인하는 간격(초)
+        """
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = {
+            job_type: max(1, (concurrency or {}).get(job_type, concurrency_for(job_type)))
+            for job_type in handlers
+        }
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._tasks = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._last_purge = 0.0
+        self._type_stats = {
+            job_type: {"active": 0, "processed": 0, "succeeded": 0, "failed": 0, "total_run_seconds": 0.0}
+            for job_type in handlers
+        }
+
+    def start(self):
+        """워커 루프를 시작합니다. (이벤트 루프 안에서 호출)"""
+        if self._tasks:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._loop(job_type))
+            for job_type, slots in self.concurrency.items()
+            for _ in range(slots)
+        ]
+        print(f"[JOB_WORKER] 워커 루프 시작: {self.worker_id}, 작업 종류별 동시 처리 수: {self.concurrency}")
+
+    def notify(self):
+        """새 작업이 등록되었음을 알려 대기 중인 루프를 바로 깨웁니다."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self, grace_seconds: float = JOB_SHUTDOWN_GRACE_SECONDS):
+        """
+        새 작업 임대를 멈추고 처리 중인 작업을 기다립니다.
+        유예 시간이 지나면 루프를 취소하지만, 실행 중인 핸들러는 스레드를 중단할 수 없으므로 끝까지 기다려 결과를 기록합니다.
+        """
+        if not self._tasks:
+            return
+        self._stopping = True
+        self.notify()
+        done, pending = await asyncio.wait(self._tasks, timeout=grace_seconds)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+        print(f"[JOB_WORKER] 워커 루프 종료: {self.worker_id} (유예 시간 내 끝나지 않은 루프: {len(pending)}개)")
+
+    async def _loop(self, job_type: str):
+        while not self._stopping:
+            try:
+                job = await asyncio.to_thread(self.queue.lease, self.worker_id, [job_type])
+            except Exception as e:
+                print(f"[JOB_WORKER] 작업 임대 오류: {str(e)}")
+                job = None
+
+            if job is None:
+                await self._idle()
+                continue
+            if self._stopping:
+                # 임대 직후 종료가 시작된 경우 처리하지 않고 바로 반환
+                await asyncio.to_thread(self.queue.release, job, self.worker_id)
+                break
+            await self._run(job)
+
+    async def _idle(self):
+        """새 작업 알림이나 폴링 간격까지 기다리고, 가끔 오래된 작업을 정리합니다."""
+        now = time.time()
+        if now - self._last_purge > JOB_PURGE_INTERVAL:
+            self._last_purge = now
+            try:
+                purged = await asyncio.to_thread(self.queue.purge)
+                if purged:
+                    print(f"[JOB_WORKER] 보관 기간이 지난 작업 정리: {purged}개")
+            except Exception as e:
+                print(f"[JOB_WORKER] 작업 정리 오류: {str(e)}")
+
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _heartbeat(self, job: Job):
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            if not await asyncio.to_thread(self.queue.heartbeat, job.job_id, self.worker_id):
+                print(f"[JOB_WORKER] 임대를 잃었습니다 (다른 워커가 회수): {job.job_id}")
+                return
+
+    async def _run(self, job: Job):
+        print(f"[JOB_WORKER] 작업 시작 ({job.attempts}/{job.max_attempts}): {job.job_type} {job.job_id}")
+        run_start = time.time()
+        type_stats = self._type_stats[job.job_type]
+        type_stats["active"] += 1
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        error = None
+        cancelled = False
+        handler = self.handlers[job.job_type]
+        with deadline_scope(JOB_DEADLINE_SECONDS):
+            # 태스크는 만들 때의 컨텍스트(데드라인)를 복사함
+            handler_task = asyncio.ensure_future(handler(job.payload))
+        try:
+            try:
+                await asyncio.shield(handler_task)
+            except asyncio.CancelledError:
+                if handler_task.done():
+                    raise
+                # 실행기 스레드의 핸들러는 중단되지 않으므로 대기열로 반환하면 같은 작업이 두 번 실행됨
+                cancelled = True
+                print(f"[JOB_WORKER] 종료 중 - 처리 중인 작업이 끝날 때까지 기다림: {job.job_id}")
+                await asyncio.wait({handler_task})
+            if not handler_task.result():
+                error = "핸들러가 실패를 반환했습니다."
+        except asyncio.CancelledError:
+            # 임대를 연장하지 않으므로 만료 후 다른 워커가 회수 (최대 시도 횟수를 넘으면 실패 처리)
+            print(f"[JOB_WORKER] 처리 중 종료 - 임대 만료 후 다시 처리됨: {job.job_id}")
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        finally:
+            heartbeat.cancel()
+            type_stats["active"] -= 1
+            type_stats["processed"] += 1
+            type_stats["total_run_seconds"] += time.time() - run_start
+
+        if error is None:
+            type_stats["succeeded"] += 1
+            await asyncio.to_thread(self.queue.complete, job.job_id, self.worker_id)
+            print(f"[JOB_WORKER] 작업 완료: {job.job_id}")
+        else:
+            type_stats["failed"] += 1
+            print(f"[JOB_WORKER] 작업 실패: {job.job_id}, {error}")
+            await asyncio.to_thread(self.queue.fail, job, self.worker_id, error)
+        if cancelled:
+            raise asyncio.CancelledError()
+
+    def stats(self) -> dict:
+        """작업 종류별 동시 처리 수, 처리 중인 작업 수와 처리 통계를 반환합니다."""
+        return {
+            "worker_id": self.worker_id,
+            "running": bool(self._tasks) and not self._stopping,
+            "by_type": {
+                job_type: {
+                    "concurrency": self.concurrency[job_type],
+                    "active": stats["active"],
+                    "processed": stats["processed"],
+                    "succeeded": stats["succeeded"],
+                    "failed": stats["failed"],
+                    "avg_run_seconds": round(stats["total_run_seconds"] / stats["processed"], 3) if stats["processed"] else 0.0
+                }
+                for job_type, stats in self._type_stats.items()
+            }
+        }
+
+
+job_queue = JobQueue()
@@ -3,23 +3,37 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, HttpUrl
 from typing import Optional
 import os
-import google.generativeai as genai
 from dotenv import load_dotenv
-import requests
 from PIL import Image
 import io
 import uvicorn
-from supabase import create_client, Client
-import random
 import replicate
 from datetime import datetime
 import uuid
 import json
 import time
+import re
+import sys
+import threading
 import numpy as np
-from scipy.ndimage import gaussian_filter
 import tempfile
 from urllib.parse import urlparse
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from http_client import fetch_bytes_async, close_all_http_sessions
+from supabase_gateway import SupabaseGateway, get_gateway
+from character_catalog import CharacterCatalog
+from face_description_cache import FaceDescriptionCache, FACE_CACHE_ENABLED
+from translation_cache import TranslationCache, TRANSLATION_CACHE_ENABLED, TRANSLATION_PREWARM_FILE
+import gemini_models
+from bg_engines import EngineName, create_default_router
+from mask_engine import background_alpha_tiled, mean_border_color, smooth_alpha_tiled, autocrop_png, BG_AUTOCROP
+from provider_limits import provider_limits
+import resilience
+from resilience import call_async, deadline_scope
+from replicate_runner import run_prediction
 
 # .env 파일에서 환경변수 로드
 load_dotenv()
@@ -40,6 +54,66 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 블로킹 작업 실행기
+# requests, Gemini, Replicate, Supabase 호출은 모두 동기 방식이므로
+# 이벤트 루프에서 직접 호출하면 단일 워커 전체가 멈춥니다.
+# 크기가 제한된 전용 스레드 풀에서 실행하여 동시 요청이 겹쳐서 처리되도록 합니다.
+BLOCKING_EXECUTOR_WORKERS = int(os.getenv("BLOCKING_EXECUTOR_WORKERS", "32"))
+blocking_executor = ThreadPoolExecutor(
+    max_workers=BLOCKING_EXECUTOR_WORKERS,
+    thread_name_prefix="blocking-io"
+)
+
+# /cartoonize 요청 하나의 외부 호출 데드라인 (재시도 대기 포함)
+CARTOONIZE_DEADLINE_SECONDS = float(os.getenv("CARTOONIZE_DEADLINE_SECONDS", "600"))
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    블로킹 함수를 전용 스레드 풀에서 실행하고 결과를 비동기로 기다립니다.
+    
+    Args:
+        func: 실행할 동기 함수
+        *args, **kwargs: 함수에 전달할 인자
+    
+    Returns:
+        함수의 반환값
+    """
+    # 요청 데드라인(resilience.deadline_scope)이 스레드에서도 보이도록 컨텍스트를 복사
+    context = contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, context.run, functools.partial(func, *args, **kwargs))
+
+async def run_timed_stage(func, *args):
+    """
+    단일 단계를 실행하고 결과와 해당 단계의 소요시간을 함께 반환합니다.
+    코루틴 함수는 이벤트 루프에서 직접, 동기 함수는 실행기에서 실행합니다.
+    
+    Returns:
+        tuple: (결과, 소요시간(초))
+    """
+    stage_start = time.time()
+    if asyncio.iscoroutinefunction(func):
+        result = await func(*args)
+    else:
+        result = await run_blocking(func, *args)
+    return result, round(time.time() - stage_start, 2)
+
+async def run_parallel_stages(stages: dict) -> dict:
+    """
+    서로 의존성이 없는 단계들을 동시에 실행하고 모두 끝날 때까지 기다립니다.
+    
+    Args:
+        stages (dict): {단계 이름: (함수, *인자)} 형태의 단계 정의
+    
+    Returns:
+        dict: {단계 이름: (결과, 소요시간)}
+    """
+    names = list(stages.keys())
+    results = await asyncio.gather(*(
+        run_timed_stage(stage[0], *stage[1:]) for stage in stages.values()
+    ))
+    return dict(zip(names, results))
+
 # 요청/응답 모델
 class ImageDescribeRequest(BaseModel):
     image_url: HttpUrl
@@ -52,6 +126,8 @@ class CartoonizeRequest(BaseModel):
     character_id: str
     custom_prompt: str
     job_id: Optional[str] = None
+    fused: Optional[bool] = None  # None이면 GEMINI_FUSED_MODE 설정을 따름
+    background_engine: Optional[EngineName] = None  # None이면 BG_REMOVAL_ORDER 순서를 따름. 알 수 없는 이름은 제공자 호출 전에 422로 거절
     
 class ImageDescribeResponse(BaseModel):
     success: bool
@@ -66,10 +142,14 @@ class TimingInfo(BaseModel):
     character_image_fetch: Optional[float] = None
     face_description: Optional[float] = None
     prompt_translation: Optional[float] = None
+    translation_skipped: Optional[bool] = None
+    fused_call: Optional[bool] = None
     image_generation: Optional[float] = None
     background_removal: Optional[float] = None
+    background_engine: Optional[str] = None
     image_upload: Optional[float] = None
     total_time: Optional[float] = None
+    critical_path_time: Optional[float] = None
 
 class CartoonizeResponse(BaseModel):
     success: bool
@@ -80,33 +160,31 @@ class CartoonizeResponse(BaseModel):
     translated_prompt: Optional[str] = None
     face_description: Optional[str] = None
     timing: Optional[TimingInfo] = None
+    background_crop: Optional[dict] = None  # BG_AUTOCROP 사용 시 원본 기준 자르기 오프셋/크기
     job_id: Optional[str] = None
     error: Optional[str] = None
 
-def get_gemini_client():
-    """Gemini 클라이언트를 설정합니다."""
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY 환경변수가 설정되지 않았습니다.")
-    
-    genai.configure(api_key=api_key)
-    return genai.GenerativeModel('gemini-2.0-flash-exp')
-
-# Gemini 기반 배경 제거 구현
-
-def get_supabase_client() -> Client:
-    """Supabase 클라이언트를 설정합니다."""
+def get_supabase_gateway() -> SupabaseGateway:
+    """Supabase 게이트웨이를 반환합니다. (프로세스당 한 번만 생성되어 연결을 재사용)"""
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_ACCESS_KEY")
     
     if not url or not key:
         raise ValueError("SUPABASE_URL 또는 SUPABASE_ACCESS_KEY 환경변수가 설정되지 않았습니다.")
     
-    return create_client(url, key)
+    return get_gateway(url, key, executor=blocking_executor)
+
+# 캐릭터 카탈로그 캐시 (시작 시 적재, TTL마다 백그라운드 갱신)
+character_catalog = CharacterCatalog(
+    get_supabase_gateway,
+    ttl_seconds=float(os.getenv("CHARACTER_CATALOG_TTL", "300"))
+)
+catalog_refresh_task: Optional[asyncio.Task] = None
 
 def get_random_character_image(character_id: str) -> Optional[str]:
     """
-    character_id를 이용해 character 테이블에서 picture_cartoon 중 랜덤한 이미지 URL을 반환합니다.
+    character_id를 이용해 메모리 카탈로그의 picture_cartoon 중 랜덤한 이미지 URL을 반환합니다.
+    카탈로그에 없는 캐릭터는 character 테이블에서 직접 조회합니다.
     
     Args:
         character_id (str): 찾을 캐릭터의 ID
@@ -116,84 +194,154 @@ def get_random_character_image(character_id: str) -> Optional[str]:
         None: 에러가 발생하거나 데이터가 없는 경우
     """
     try:
-        supabase = get_supabase_client()
-        
-        # character 테이블에서 해당 ID의 picture_cartoon 가져오기
-        response = supabase.table("character").select("picture_cartoon").eq("id", character_id).execute()
+        image_url = character_catalog.pick(character_id)
         
-        if not response.data:
-            print(f"캐릭터 ID {character_id}를 찾을 수 없습니다.")
+        if not image_url:
+            print(f"캐릭터 ID {character_id}를 찾을 수 없거나 picture_cartoon이 비어있습니다.")
             return None
         
-        picture_cartoon = response.data[0].get("picture_cartoon")
-        
-        if not picture_cartoon or not isinstance(picture_cartoon, list) or len(picture_cartoon) == 0:
-            print(f"캐릭터 ID {character_id}의 picture_cartoon이 비어있거나 올바르지 않습니다.")
-            return None
-        
-        # 리스트에서 랜덤하게 하나 선택
-        random_item = random.choice(picture_cartoon)
-        
-        # 딕셔너리 형태인 경우 url 키의 값을 추출
-        if isinstance(random_item, dict) and 'url' in random_item:
-            return random_item['url']
-        # 문자열인 경우 그대로 반환
-        elif isinstance(random_item, str):
-            return random_item
-        else:
-            print(f"예상치 못한 데이터 형태: {type(random_item)}, 값: {random_item}")
-            return None
+        return image_url
         
     except Exception as e:
         print(f"캐릭터 이미지 가져오기 중 오류 발생: {str(e)}")
         return None
 
-def load_image_from_url(image_url: str) -> Optional[Image.Image]:
-    """URL에서 이미지를 다운로드하여 PIL Image로 변환합니다."""
-    try:
-        response = requests.get(image_url)
-        response.raise_for_status()
-        return Image.open(io.BytesIO(response.content))
-    except Exception as e:
-        print(f"이미지 로드 중 오류 발생: {str(e)}")
-        return None
+# Gemini 호출 모드별 지연시간/토큰 사용량 (fused vs split 비교용)
+gemini_usage_lock = threading.Lock()
+gemini_usage = {}
+
+def record_gemini_usage(mode: str, elapsed: float, response=None):
+    """
+    Gemini 호출의 지연시간과 토큰 사용량을 모드별로 누적합니다.
+    
+    Args:
+        mode (str): 호출 모드 (fused, split_describe, split_translate 등)
+        elapsed (float): 호출 소요시간(초)
+        response: Gemini 응답 객체 (usage_metadata 추출용)
+    """
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+    output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+    with gemini_usage_lock:
+        stat = gemini_usage.setdefault(mode, {
+            "calls": 0, "total_seconds": 0.0, "prompt_tokens": 0, "output_tokens": 0
+        })
+        stat["calls"] += 1
+        stat["total_seconds"] += elapsed
+        stat["prompt_tokens"] += prompt_tokens
+        stat["output_tokens"] += output_tokens
 
-def describe_face_simple(image_url: str, custom_prompt: Optional[str] = None) -> Optional[str]:
+def gemini_usage_stats() -> dict:
+    """
+    모드별 호출당 평균 지연시간/토큰과 fused vs split 비교 결과를 반환합니다.
+    split 비용은 묘사 호출 1회 + 번역 호출 1회의 평균 합계입니다.
+    """
+    with gemini_usage_lock:
+        per_mode = {
+            mode: {
+                "calls": stat["calls"],
+                "avg_seconds": round(stat["total_seconds"] / stat["calls"], 3),
+                "avg_prompt_tokens": round(stat["prompt_tokens"] / stat["calls"], 1),
+                "avg_output_tokens": round(stat["output_tokens"] / stat["calls"], 1)
+            }
+            for mode, stat in gemini_usage.items() if stat["calls"]
+        }
+    
+    comparison = None
+    fused = per_mode.get("fused")
+    describe = per_mode.get("split_describe")
+    translate = per_mode.get("split_translate")
+    if fused and describe and translate:
+        comparison = {
+            "fused_avg_seconds": fused["avg_seconds"],
+            "split_avg_seconds": round(describe["avg_seconds"] + translate["avg_seconds"], 3),
+            "fused_avg_tokens": fused["avg_prompt_tokens"] + fused["avg_output_tokens"],
+            "split_avg_tokens": round(
+                describe["avg_prompt_tokens"] + describe["avg_output_tokens"]
+                + translate["avg_prompt_tokens"] + translate["avg_output_tokens"], 1
+            )
+        }
+    return {"modes": per_mode, "fused_vs_split": comparison}
+
+DEFAULT_FACE_PROMPT = """Please describe the person's appearance in simple keywords. Focus only on:
+1. Eyes: size and features (big eyes, small eyes, wear glasses, etc.)
+2. Face: basic features (round face, oval face, etc.)
+3. Facial accessories: if any (wear glasses, earrings, etc.)
+
+Respond with simple phrases like: "big brown eyes, round face, wear glasses"
+Keep it very simple and use only basic descriptive phrases."""
+
+# 얼굴 묘사 캐시 (이미지 해시 + 지각 해시 + 프롬프트 해시 기준)
+face_description_cache = FaceDescriptionCache() if FACE_CACHE_ENABLED else None
+
+async def describe_face_simple(image_url: str, custom_prompt: Optional[str] = None) -> Optional[str]:
     """
     이미지를 영어로 묘사하는 함수
+    같은(또는 거의 같은) 이미지와 프롬프트 조합은 캐시된 묘사를 반환합니다.
     
     Args:
         image_url (str): 분석할 이미지의 URL
         custom_prompt (Optional[str]): 사용자 정의 프롬프트
     
+    Returns:
+        str: 영어로 된 이미지 묘사
+        None: 에러가 발생한 경우
+    """
+    # 이미지 다운로드 (캐시 키 계산을 위해 원본 바이트 보관)
+    image_data = await download_image_from_url_async(image_url)
+    if image_data is None:
+        return None
+    return await describe_face_image(image_data, custom_prompt)
+
+def lookup_face_description_cache(image_data: bytes, prompt: str) -> tuple:
+    """
+    이미지 디코딩과 캐시 키 계산(CPU 작업)을 수행하고 얼굴 묘사 캐시를 조회합니다.
+    
+    Args:
+        image_data (bytes): 이미지 데이터
+        prompt (str): 묘사 프롬프트
+    
+    Returns:
+        tuple: (PIL 이미지, 캐시 키 또는 None, 캐시된 묘사 또는 None)
+    """
+    image = Image.open(io.BytesIO(image_data))
+    image.load()
+    if face_description_cache is None:
+        return image, None, None
+    cache_key = face_description_cache.make_key(image_data, image, prompt)
+    return image, cache_key, face_description_cache.get(cache_key)
+
+async def describe_face_image(image_data: bytes, custom_prompt: Optional[str] = None) -> Optional[str]:
+    """
+    이미 다운로드한 이미지 데이터를 영어로 묘사합니다.
+    
+    Args:
+        image_data (bytes): 분석할 이미지 데이터
+        custom_prompt (Optional[str]): 사용자 정의 프롬프트
+    
     Returns:
         str: 영어로 된 이미지 묘사
         None: 에러가 발생한 경우
     """
     try:
-        model = get_gemini_client()
-        
-        # 이미지 로드
-        image = load_image_from_url(image_url)
-        if image is None:
-            return None
-        
         # 사용자 정의 프롬프트가 있으면 사용, 없으면 기본 프롬프트 사용
-        if custom_prompt:
-            prompt = custom_prompt
-        else:
-            prompt = """Please describe the person's appearance in simple keywords. Focus only on:
-1. Eyes: size and features (big eyes, small eyes, wear glasses, etc.)
-2. Face: basic features (round face, oval face, etc.)
-3. Facial accessories: if any (wear glasses, earrings, etc.)
+        prompt = custom_prompt if custom_prompt else DEFAULT_FACE_PROMPT
 
-Respond with simple phrases like: "big brown eyes, round face, wear glasses"
-Keep it very simple and use only basic descriptive phrases."""
+        # 캐시 조회
+        image, cache_key, cached_description = await run_blocking(lookup_face_description_cache, image_data, prompt)
+        if cached_description:
+            print("⚡ 얼굴 묘사 캐시 적중 - Gemini 호출 생략")
+            return cached_description
 
-        response = model.generate_content([prompt, image])
+        call_start = time.time()
+        response = await gemini_models.generate_content_async([prompt, image])
+        record_gemini_usage("split_describe", time.time() - call_start, response)
         
         if response.text:
-            return response.text.strip()
+            description = response.text.strip()
+            if cache_key is not None:
+                await run_blocking(face_description_cache.put, cache_key, description)
+            return description
         else:
             return None
         
@@ -201,10 +349,12 @@ Keep it very simple and use only basic descriptive phrases."""
         print(f"이미지 묘사 중 오류 발생: {str(e)}")
         return None
 
-def translate_to_english(korean_text: str) -> Optional[str]:
+# 프롬프트 번역 캐시 (정규화된 프롬프트 기준)
+translation_cache = TranslationCache() if TRANSLATION_CACHE_ENABLED else None
+
+async def translate_to_english(korean_text: str) -> Optional[str]:
     """
-    한국어 텍스트를 영어로 번역합니다.
-    직업적 표현은 제거하고 외모와 행동 묘사만 번역합니다.
+    한국어 텍스트를 영어로 번역합니다. 이전에 번역한 프롬프트는 캐시된 결과를 반환합니다.
     
     Args:
         korean_text (str): 번역할 한국어 텍스트
@@ -213,10 +363,106 @@ def translate_to_english(korean_text: str) -> Optional[str]:
         str: 영어로 번역된 텍스트
         None: 에러가 발생한 경우
     """
-    try:
-        model = get_gemini_client()
-        
-        prompt = f"""Translate this Korean text to English, but follow these rules:
+    if translation_cache is not None:
+        try:
+            cached_translation = await run_blocking(translation_cache.get, korean_text)
+            if cached_translation:
+                print("⚡ 번역 캐시 적중 - Gemini 호출 생략")
+                return cached_translation
+        except Exception as e:
+            print(f"번역 캐시 조회 중 오류 발생: {str(e)}")
+    
+    translated = await translate_with_gemini(korean_text)
+    
+    if translated and translation_cache is not None:
+        try:
+            await run_blocking(translation_cache.put, korean_text, translated)
+        except Exception as e:
+            print(f"번역 캐시 저장 중 오류 발생: {str(e)}")
+    
+    return translated
+
+# 한글 음절/자모 범위
+HANGUL_PATTERN = re.compile(r"[\u1100-\u11FF\u3130-\u318F\uA960-\uA97F\uAC00-\uD7A3\uD7B0-\uD7FF]")
+
+# 번역 프롬프트의 직업 표현 제거 규칙을 로컬에서 적용하기 위한 직업 단어 목록
+OCCUPATION_TERMS = [
+    "navy officer", "police officer", "military officer", "officer", "policeman", "policewoman",
+    "firefighter", "fireman", "soldier", "sailor", "captain", "pilot", "astronaut",
+    "doctor", "nurse", "dentist", "pharmacist", "surgeon", "teacher", "professor",
+    "lawyer", "judge", "engineer", "scientist", "programmer", "developer",
+    "chef", "farmer", "businessman", "businesswoman", "ceo", "president", "manager",
+    "athlete", "singer", "actor", "actress", "musician", "painter", "artist",
+    "employee", "office worker", "worker", "driver"
+]
+_OCCUPATION_ALTERNATION = "|".join(
+    re.escape(term) for term in sorted(OCCUPATION_TERMS, key=len, reverse=True)
+)
+# 소유격("painter's hat", "officers' cap")은 관사를 남기고 직업 단어만 제거,
+# 그 외에는 "as a doctor" 같은 앞 표현까지 함께 제거
+OCCUPATION_PATTERN = re.compile(
+    rf"\b(?:{_OCCUPATION_ALTERNATION})(?:'s|s')(?!\w)"
+    rf"|\b(?:(?:dressed\s+)?(?:as|like)\s+)?(?:an?\s+|the\s+)?(?:{_OCCUPATION_ALTERNATION})s?\b(?!')",
+    re.IGNORECASE
+)
+# 직업 표현을 모두 제거하고 남는 내용이 없을 때 사용하는 중립 프롬프트
+NEUTRAL_PROMPT = "a natural pose"
+
+def is_english_prompt(text: str) -> bool:
+    """
+    프롬프트가 번역 없이 사용할 수 있는 영어(ASCII) 프롬프트인지 확인합니다.
+    
+    Args:
+        text (str): 확인할 프롬프트
+    
+    Returns:
+        bool: 한글이 없고 모든 문자가 ASCII인 경우 True
+    """
+    if not text or HANGUL_PATTERN.search(text):
+        return False
+    return text.isascii()
+
+def strip_occupations(text: str) -> str:
+    """
+    영어 프롬프트에서 직업/직함 표현을 제거합니다. (translate_with_gemini 규칙의 로컬 적용)
+    
+    Args:
+        text (str): 영어 프롬프트
+    
+    Returns:
+        str: 직업 표현이 제거된 프롬프트 (모두 제거되면 빈 문자열)
+    """
+    stripped = OCCUPATION_PATTERN.sub(" ", text)
+    stripped = re.sub(r"\s+([,.!?])", r"\1", stripped)
+    stripped = re.sub(r"(?:,\s*){2,}", ", ", stripped)
+    stripped = re.sub(r"\s+", " ", stripped).strip(" ,")
+    # 제거 후 앞뒤에 남은 접속사 정리 ("teachers and doctors" -> "")
+    stripped = re.sub(r"^(?:(?:and|or)\b[\s,]*)+|(?:[\s,]*\b(?:and|or))+$", "", stripped, flags=re.IGNORECASE)
+    # 문장부호만 남은 경우도 빈 문자열로 처리
+    return stripped if re.search(r"\w", stripped) else ""
+
+async def prepare_custom_prompt(custom_prompt: str) -> tuple:
+    """
+    커스텀 프롬프트를 이미지 생성용 영어 프롬프트로 준비합니다.
+    이미 영어인 프롬프트는 Gemini 번역을 생략하고 직업 표현만 로컬에서 제거합니다.
+    
+    Args:
+        custom_prompt (str): 사용자 커스텀 프롬프트
+    
+    Returns:
+        tuple: (영어 프롬프트 또는 None, 번역 생략 여부)
+    """
+    if is_english_prompt(custom_prompt):
+        print("⚡ 영어 프롬프트 감지 - Gemini 번역 생략")
+        stripped = strip_occupations(custom_prompt)
+        if not stripped:
+            print(f"⚠️ 프롬프트가 직업 표현뿐이라 중립 프롬프트 사용: {NEUTRAL_PROMPT}")
+        return stripped or NEUTRAL_PROMPT, True
+    
+    return await translate_to_english(custom_prompt), False
+
+# 번역 규칙 (번역 단독 호출과 fused 호출에서 공통 사용)
+TRANSLATION_RULES = """Translate this Korean text to English, but follow these rules:
 
 1. INCLUDE hair descriptions (hair color, hairstyle, hair length, etc.)
 2. EXCLUDE professional/occupational expressions (like "navy officer", "doctor", "teacher", etc.)
@@ -227,13 +473,189 @@ def translate_to_english(korean_text: str) -> Optional[str]:
    - Expressions and emotions
 
 4. Remove any mentions of jobs, titles, or professional roles
-5. Focus only on what the person looks like and what they are doing
+5. Focus only on what the person looks like and what they are doing"""
+
+# Gemini 얼굴 묘사 + 프롬프트 번역 단일 호출(fused) 모드
+GEMINI_FUSED_MODE = os.getenv("GEMINI_FUSED_MODE", "0") == "1"
+
+FUSED_PROMPT_TEMPLATE = """You will receive a photo of a person and a Korean text. Do two tasks and respond ONLY with a JSON object.
+
+Task 1 - face_description:
+{face_prompt}
+
+Task 2 - translated_prompt:
+{translation_rules}
+
+Korean text: {korean_text}
+
+Respond with exactly this JSON shape:
+{{"face_description": "<simple phrases>", "translated_prompt": "<translated English text>"}}"""
+
+async def describe_and_translate_fused(image: Image.Image, korean_text: str) -> Optional[tuple]:
+    """
+    이미지와 한국어 프롬프트를 한 번의 Gemini 호출로 보내
+    얼굴 묘사와 번역 결과를 구조화된 JSON으로 받습니다.
+    
+    Args:
+        image (Image.Image): 얼굴 이미지
+        korean_text (str): 번역할 한국어 텍스트
+    
+    Returns:
+        tuple: (얼굴 묘사, 번역된 프롬프트)
+        None: 호출 또는 JSON 파싱에 실패한 경우
+    """
+    try:
+        prompt = FUSED_PROMPT_TEMPLATE.format(
+            face_prompt=DEFAULT_FACE_PROMPT,
+            translation_rules=TRANSLATION_RULES,
+            korean_text=korean_text
+        )
+        
+        call_start = time.time()
+        response = await gemini_models.generate_content_async(
+            [prompt, image],
+            generation_config={"response_mime_type": "application/json"}
+        )
+        record_gemini_usage("fused", time.time() - call_start, response)
+        
+        result = json.loads(response.text)
+        face_description = str(result.get("face_description") or "").strip()
+        translated_prompt = str(result.get("translated_prompt") or "").strip()
+        if not face_description or not translated_prompt:
+            print(f"⚠️ fused 응답에 필수 필드가 없습니다: {result}")
+            return None
+        
+        return face_description, translated_prompt
+        
+    except Exception as e:
+        print(f"⚠️ fused 묘사/번역 실패: {str(e)}")
+        return None
+
+async def describe_face_and_prepare_prompt(image_url: str, custom_prompt: str) -> tuple:
+    """
+    얼굴 묘사와 프롬프트 준비를 fused 모드로 수행합니다.
+    캐시로 해결되거나 영어 프롬프트인 경우에는 필요한 호출만 수행하고,
+    fused 호출이 실패하면 기존 2회 호출 방식으로 대체합니다.
+    
+    Args:
+        image_url (str): 얼굴 이미지 URL
+        custom_prompt (str): 사용자 커스텀 프롬프트
+    
+    Returns:
+        tuple: (얼굴 묘사, 영어 프롬프트, 번역 생략 여부, fused 호출 여부)
+    """
+    image_data = await download_image_from_url_async(image_url)
+    if image_data is None:
+        return None, None, None, False
+    
+    # 영어 프롬프트 또는 번역 캐시 적중 시 묘사 호출만 필요
+    if is_english_prompt(custom_prompt):
+        translated_prompt, translation_skipped = await prepare_custom_prompt(custom_prompt)
+        return await describe_face_image(image_data), translated_prompt, translation_skipped, False
+    
+    if translation_cache is not None:
+        try:
+            cached_translation = await run_blocking(translation_cache.get, custom_prompt)
+        except Exception as e:
+            print(f"⚠️ 번역 캐시 조회 실패: {str(e)}")
+            cached_translation = None
+        if cached_translation:
+            print("⚡ 번역 캐시 적중 - 얼굴 묘사만 수행")
+            return await describe_face_image(image_data), cached_translation, False, False
+    
+    # 얼굴 묘사 캐시 적중 시 번역 호출만 필요
+    try:
+        image, cache_key, cached_description = await run_blocking(
+            lookup_face_description_cache, image_data, DEFAULT_FACE_PROMPT
+        )
+    except Exception as e:
+        # 이미지 디코딩 또는 캐시 조회 실패 시 fused 호출 없이 개별 호출 경로로 진행
+        print(f"⚠️ 얼굴 이미지 준비/캐시 조회 실패: {str(e)}")
+        image, cache_key, cached_description = None, None, None
+    if cached_description:
+        print("⚡ 얼굴 묘사 캐시 적중 - 번역만 수행")
+        return cached_description, await translate_to_english(custom_prompt), False, False
+    
+    fused_result = None
+    if image is not None:
+        print("🔗 fused 모드: 얼굴 묘사 + 프롬프트 번역 단일 Gemini 호출")
+        fused_result = await describe_and_translate_fused(image, custom_prompt)
+    if fused_result:
+        face_description, translated_prompt = fused_result
+        try:
+            if cache_key is not None:
+                await run_blocking(face_description_cache.put, cache_key, face_description)
+            if translation_cache is not None:
+                await run_blocking(translation_cache.put, custom_prompt, translated_prompt)
+        except Exception as e:
+            print(f"⚠️ fused 결과 캐시 저장 실패: {str(e)}")
+        return face_description, translated_prompt, False, True
+    
+    # fused 실패 시 기존 2회 호출 방식으로 대체 (두 호출은 병렬 실행)
+    print("↩️ fused 실패 - 묘사/번역 개별 호출로 대체")
+    face_description, translated_prompt = await asyncio.gather(
+        describe_face_image(image_data),
+        translate_to_english(custom_prompt)
+    )
+    return face_description, translated_prompt, False, False
+
+async def benchmark_fused_vs_split(image_path: str, korean_text: str, rounds: int = 3):
+    """
+    fused 호출과 기존 2회 호출(묘사 + 번역, 병렬)의 지연시간과 토큰 사용량을 비교합니다.
+    캐시를 거치지 않고 Gemini를 직접 호출하며, 토큰 수는 응답의 usage_metadata에서 집계합니다.
+    
+        python main.py --benchmark-fused [이미지 경로] [한국어 프롬프트] [반복 횟수]
+    """
+    image = Image.open(image_path)
+    image.load()
+    fused_seconds = []
+    split_seconds = []
+    
+    async def describe_uncached():
+        call_start = time.time()
+        response = await gemini_models.generate_content_async([DEFAULT_FACE_PROMPT, image])
+        record_gemini_usage("split_describe", time.time() - call_start, response)
+        return response.text
+    
+    for round_index in range(rounds):
+        start = time.time()
+        await describe_and_translate_fused(image, korean_text)
+        fused_seconds.append(time.time() - start)
+        
+        start = time.time()
+        await asyncio.gather(describe_uncached(), translate_with_gemini(korean_text))
+        split_seconds.append(time.time() - start)
+        print(f"[BENCHMARK] {round_index + 1}/{rounds}: fused {fused_seconds[-1]:.2f}초, split {split_seconds[-1]:.2f}초")
+    
+    stats = gemini_usage_stats()
+    print(f"📊 fused vs split 벤치마크: {image_path} ({rounds}회)")
+    print(f"   - fused 평균: {sum(fused_seconds) / rounds:.2f}초")
+    print(f"   - split 평균 (병렬 2회 호출): {sum(split_seconds) / rounds:.2f}초")
+    print(f"   - 모드별 호출 통계: {json.dumps(stats['modes'], ensure_ascii=False)}")
+    print(f"   - 토큰 비교: {json.dumps(stats['fused_vs_split'], ensure_ascii=False)}")
+
+async def translate_with_gemini(korean_text: str) -> Optional[str]:
+    """
+    Gemini로 한국어 텍스트를 영어로 번역합니다. (캐시를 거치지 않음)
+    직업적 표현은 제거하고 외모와 행동 묘사만 번역합니다.
+    
+    Args:
+        korean_text (str): 번역할 한국어 텍스트
+    
+    Returns:
+        str: 영어로 번역된 텍스트
+        None: 에러가 발생한 경우
+    """
+    try:
+        prompt = f"""{TRANSLATION_RULES}
 
 Korean text: {korean_text}
 
 Provide only the translated English text with appearance and behavior descriptions:"""
         
-        response = model.generate_content(prompt)
+        call_start = time.time()
+        response = await gemini_models.generate_content_async(prompt)
+        record_gemini_usage("split_translate", time.time() - call_start, response)
         
         if response.text:
             return response.text.strip()
@@ -282,30 +704,12 @@ def generate_cartoon_with_replicate(character_image_url: str, face_description:
         
         print("🚀 Replicate API 호출 시작...")
         
-        # 타임아웃과 재시도 로직 추가
-        max_retries = 2
-        timeout_seconds = 300  # 5분
+        # 예측 생성 요청만 재시도하고(유료 예측이 중복 생성되지 않도록) 결과는 폴링으로 기다림
+        start_time = time.time()
+        output = run_prediction(replicate.default_client, "black-forest-labs/flux-kontext-pro", input_data)
+        end_time = time.time()
         
-        for attempt in range(max_retries + 1):
-            try:
-                if attempt > 0:
-                    print(f"🔄 재시도 {attempt}/{max_retries}")
-                    time.sleep(5)  # 5초 대기 후 재시도
-                
-                start_time = time.time()
-                output = replicate.run(
-                    "black-forest-labs/flux-kontext-pro",
-                    input=input_data
-                )
-                end_time = time.time()
-                
-                print(f"⏱️ API 호출 소요 시간: {end_time - start_time:.2f}초")
-                break
-                
-            except Exception as retry_error:
-                print(f"❌ 시도 {attempt + 1} 실패: {str(retry_error)}")
-                if attempt == max_retries:
-                    raise retry_error
+        print(f"⏱️ API 호출 소요 시간: {end_time - start_time:.2f}초")
         
         print(f"📥 Replicate API 응답 받음 - 타입: {type(output)}")
         print(f"📄 응답 내용: {output}")
@@ -374,6 +778,83 @@ def generate_cartoon_with_replicate(character_image_url: str, face_description:
         print(f"❌ 스택 트레이스: {traceback.format_exc()}")
         return None
 
+# Gemini 배경 제거 설정
+GEMINI_BG_MAX_SIZE = 1024  # Gemini에 보낼 이미지의 최대 변 길이
+GEMINI_BG_SINGLE_REQUEST = os.getenv("GEMINI_BG_SINGLE_REQUEST", "1") == "1"  # 분석+경계 추출을 한 번의 호출로
+
+GEMINI_BG_SEGMENTATION_PROMPT = """Analyze this image for background removal and respond with a single JSON object with these keys:
+- main_subject: short description of the main subject
+- background_type: one of "solid", "gradient", "complex"
+- has_person: true or false
+- complexity: one of "easy", "medium", "hard"
+- recommended_method: recommended background removal method
+- description: one-sentence description of the whole image
+- boundaries: object with "top", "bottom", "left", "right" of the main subject's bounding box,
+  each a percentage (0-100) of the image height or width"""
+
+# 배경 제거 1건당 Gemini 호출 수 통계
+gemini_bg_removal_lock = threading.Lock()
+gemini_bg_removal_stats = {"removals": 0, "gemini_calls": 0}
+
+def record_gemini_bg_removal(gemini_calls: int):
+    """Gemini 배경 제거 1건과 그 과정에서 발생한 Gemini 호출 수를 기록합니다."""
+    with gemini_bg_removal_lock:
+        gemini_bg_removal_stats["removals"] += 1
+        gemini_bg_removal_stats["gemini_calls"] += gemini_calls
+
+def gemini_bg_removal_summary() -> dict:
+    """Gemini 배경 제거 건수와 건당 평균 Gemini 호출 수를 반환합니다."""
+    with gemini_bg_removal_lock:
+        removals = gemini_bg_removal_stats["removals"]
+        calls = gemini_bg_removal_stats["gemini_calls"]
+    return {
+        "single_request_mode": GEMINI_BG_SINGLE_REQUEST,
+        "removals": removals,
+        "gemini_calls": calls,
+        "calls_per_removal": round(calls / removals, 2) if removals else 0.0
+    }
+
+def resize_for_gemini(image: Image.Image, max_size: int = GEMINI_BG_MAX_SIZE) -> Image.Image:
+    """Gemini API 효율성을 위해 긴 변이 max_size를 넘지 않도록 축소합니다. (한 번 만들어 재사용)"""
+    if max(image.size) <= max_size:
+        return image
+    ratio = max_size / max(image.size)
+    new_size = (int(image.size[0] * ratio), int(image.size[1] * ratio))
+    print(f"🔄 이미지 크기 조정: {new_size}")
+    return image.resize(new_size, Image.Resampling.LANCZOS)
+
+def segment_subject_with_gemini(gemini_image: Image.Image, model_name: str = "gemini-2.0-flash-exp") -> Optional[dict]:
+    """
+    한 번의 구조화된(JSON) Gemini 요청으로 이미지 분류와 피사체 경계를 함께 받습니다.
+    
+    Args:
+        gemini_image: Gemini용으로 축소된 PIL 이미지
+        model_name: 사용할 Gemini 모델 이름
+    
+    Returns:
+        dict: 분석 결과 (analyze_image_with_gemini_for_bg_removal 키 + boundaries)
+        None: 호출 또는 파싱에 실패한 경우
+    """
+    try:
+        print(f"🔍 Gemini {model_name} 단일 요청으로 분석 + 피사체 경계 추출")
+        call_start = time.time()
+        response = gemini_models.generate_content(
+            [GEMINI_BG_SEGMENTATION_PROMPT, gemini_image],
+            model_name=model_name,
+            generation_config={"response_mime_type": "application/json"}
+        )
+        record_gemini_usage("bg_single_request", time.time() - call_start, response)
+        
+        segmentation = json.loads(response.text)
+        if not isinstance(segmentation, dict):
+            print(f"⚠️ 예상하지 못한 응답 형식: {segmentation}")
+            return None
+        print(f"✅ 분석 + 경계 추출 완료: {segmentation}")
+        return segmentation
+    except Exception as e:
+        print(f"❌ Gemini 단일 요청 분석 실패: {e}")
+        return None
+
 def analyze_image_with_gemini_for_bg_removal(image_data: bytes, model_name: str = "gemini-2.0-flash-exp") -> dict:
     """
     Gemini를 사용하여 배경 제거를 위한 이미지 분석
@@ -391,9 +872,6 @@ def analyze_image_with_gemini_for_bg_removal(image_data: bytes, model_name: str
         # 이미지를 PIL Image로 변환
         image = Image.open(io.BytesIO(image_data))
         
-        # Gemini 모델 초기화
-        model = genai.GenerativeModel(model_name)
-        
         # 프롬프트 작성
         prompt = """
         이 이미지를 분석하고 다음 정보를 JSON 형식으로 제공해주세요:
@@ -409,7 +887,9 @@ def analyze_image_with_gemini_for_bg_removal(image_data: bytes, model_name: str
         """
         
         # 이미지 분석 요청
-        response = model.generate_content([prompt, image])
+        call_start = time.time()
+        response = gemini_models.generate_content([prompt, image], model_name=model_name)
+        record_gemini_usage("bg_analyze", time.time() - call_start, response)
         
         # 응답 파싱
         try:
@@ -447,34 +927,43 @@ def analyze_image_with_gemini_for_bg_removal(image_data: bytes, model_name: str
             "description": "이미지 분석에 실패했습니다."
         }
 
-def remove_background_with_gemini(image_data: bytes, analysis: dict = None, model_name: str = "gemini-2.0-flash-exp") -> bytes:
+def remove_background_with_gemini(image_data: bytes, analysis: dict = None, model_name: str = "gemini-2.0-flash-exp",
+                                  single_request: Optional[bool] = None) -> bytes:
     """
     Gemini AI를 사용한 배경 제거 처리
     
+    단일 요청 모드(기본)에서는 분석과 피사체 경계를 한 번의 JSON 요청으로 받아 마스크를 적용합니다.
+    그렇지 않으면 이미지 생성 시도 후 마스크 요청으로 대체하는 기존 방식을 사용합니다.
+    디코딩과 축소는 한 번만 수행하여 모든 시도에서 재사용합니다.
+    
     Args:
         image_data: 원본 이미지 데이터
         analysis: Gemini 분석 결과 (선택적)
         model_name: 사용할 Gemini 모델명
+        single_request: 단일 요청 모드 여부 (None이면 GEMINI_BG_SINGLE_REQUEST 설정)
     
     Returns:
         배경이 제거된 이미지 데이터
     """
+    if single_request is None:
+        single_request = GEMINI_BG_SINGLE_REQUEST
+    # 호출 측에서 미리 분석했다면 그 호출도 이번 배경 제거에 포함
+    gemini_calls = 1 if analysis else 0
+    
     try:
         print("🤖 Gemini AI 배경 제거 처리 시작")
         
-        # 이미지를 PIL Image로 변환
+        # 이미지를 PIL Image로 변환하고 Gemini용 축소본을 한 번만 생성
         image = Image.open(io.BytesIO(image_data))
+        gemini_image = resize_for_gemini(image)
         
-        # 이미지 크기 최적화 (Gemini API 효율성을 위해)
-        max_size = 1024
-        if max(image.size) > max_size:
-            ratio = max_size / max(image.size)
-            new_size = (int(image.size[0] * ratio), int(image.size[1] * ratio))
-            image = image.resize(new_size, Image.Resampling.LANCZOS)
-            print(f"🔄 이미지 크기 조정: {new_size}")
-        
-        # Gemini 모델 초기화
-        model = genai.GenerativeModel(model_name)
+        if single_request and not analysis:
+            segmentation = segment_subject_with_gemini(gemini_image, model_name)
+            gemini_calls += 1
+            if segmentation and isinstance(segmentation.get('boundaries'), dict):
+                return apply_mask_to_remove_background(image, segmentation)
+            print("⚠️ 피사체 경계를 받지 못함, 단순 투명 배경 처리로 대체")
+            return create_simple_transparent_background_from_pil(image)
         
         # 분석 정보가 있으면 활용하여 더 정확한 프롬프트 생성
         main_subject = analysis.get('main_subject', 'main object') if analysis else 'main object'
@@ -494,7 +983,10 @@ Focus only on extracting the {main_subject} with perfect edge quality and transp
         print(f"🎯 배경 제거 프롬프트: {main_subject} 추출")
         
         # Gemini API로 배경 제거된 이미지 생성
-        response = model.generate_content([prompt, image])
+        call_start = time.time()
+        response = gemini_models.generate_content([prompt, gemini_image], model_name=model_name)
+        gemini_calls += 1
+        record_gemini_usage("bg_generate", time.time() - call_start, response)
         
         # 응답이 이미지인지 확인하고 처리
         if hasattr(response, 'candidates') and response.candidates:
@@ -513,16 +1005,21 @@ Focus only on extracting the {main_subject} with perfect edge quality and transp
                         print("✅ Gemini로 배경 제거 완료")
                         return generated_image_data
         
-        # 텍스트 응답만 있는 경우 다른 방식으로 시도
+        # 텍스트 응답만 있는 경우 다른 방식으로 시도 (이미 디코딩/축소한 이미지 재사용)
         print("⚠️ Gemini에서 직접 이미지 생성 실패, 마스크 기반 방식 시도")
-        return create_transparent_background_mask(image_data, analysis, model_name)
+        gemini_calls += 1
+        return create_transparent_background_mask(image_data, analysis, model_name, image=image, gemini_image=gemini_image)
         
     except Exception as e:
         print(f"❌ Gemini 배경 제거 실패: {e}")
         # 실패 시 기본 투명 배경 처리
         return create_simple_transparent_background(image_data)
+    finally:
+        record_gemini_bg_removal(gemini_calls)
 
-def create_transparent_background_mask(image_data: bytes, analysis: dict = None, model_name: str = "gemini-2.0-flash-exp") -> bytes:
+def create_transparent_background_mask(image_data: bytes, analysis: dict = None, model_name: str = "gemini-2.0-flash-exp",
+                                       image: Optional[Image.Image] = None,
+                                       gemini_image: Optional[Image.Image] = None) -> bytes:
     """
     Gemini로 마스크를 생성하여 배경 제거
     
@@ -530,6 +1027,8 @@ def create_transparent_background_mask(image_data: bytes, analysis: dict = None,
         image_data: 원본 이미지 데이터
         analysis: Gemini 분석 결과
         model_name: 사용할 Gemini 모델명
+        image: 이미 디코딩한 원본 이미지 (선택적, 없으면 image_data에서 디코딩)
+        gemini_image: 이미 축소한 Gemini용 이미지 (선택적)
     
     Returns:
         배경이 제거된 이미지 데이터
@@ -537,11 +1036,11 @@ def create_transparent_background_mask(image_data: bytes, analysis: dict = None,
     try:
         print("🎭 Gemini 마스크 기반 배경 제거 시작")
         
-        # 이미지를 PIL Image로 변환
-        image = Image.open(io.BytesIO(image_data))
-        
-        # Gemini 모델 초기화
-        model = genai.GenerativeModel(model_name)
+        # 이미지를 PIL Image로 변환 (전달받은 이미지가 있으면 재사용)
+        if image is None:
+            image = Image.open(io.BytesIO(image_data))
+        if gemini_image is None:
+            gemini_image = resize_for_gemini(image)
         
         main_subject = analysis.get('main_subject', 'main object') if analysis else 'main object'
         
@@ -558,7 +1057,9 @@ Please provide detailed information about:
 Respond in JSON format with precise boundary information."""
 
         # 마스크 정보 생성
-        response = model.generate_content([mask_prompt, image])
+        call_start = time.time()
+        response = gemini_models.generate_content([mask_prompt, gemini_image], model_name=model_name)
+        record_gemini_usage("bg_mask", time.time() - call_start, response)
         
         if response.text:
             # JSON 응답 파싱 시도
@@ -601,15 +1102,8 @@ def apply_mask_to_remove_background(image: Image.Image, mask_info: dict) -> byte
     try:
         print("🖼️ 마스크 적용하여 배경 제거 중")
         
-        # RGBA 모드로 변환
-        if image.mode != 'RGBA':
-            image = image.convert('RGBA')
-        
-        # 이미지를 numpy 배열로 변환
-        img_array = np.array(image)
-        
         # 경계 정보 추출 (퍼센트를 픽셀로 변환)
-        height, width = img_array.shape[:2]
+        width, height = image.size
         
         # 기본값 설정 (전체 이미지의 중앙 80% 영역)
         boundaries = mask_info.get('boundaries', {})
@@ -622,29 +1116,38 @@ def apply_mask_to_remove_background(image: Image.Image, mask_info: dict) -> byte
         mask = np.zeros((height, width), dtype=np.uint8)
         mask[top:bottom, left:right] = 255
         
-        # 가장자리 부드럽게 처리
-        mask_smooth = gaussian_filter(mask.astype(float), sigma=2.0)
-        mask_smooth = (mask_smooth / mask_smooth.max() * 255).astype(np.uint8)
-        
-        # 알파 채널에 마스크 적용
-        img_array[:, :, 3] = mask_smooth
-        
-        # PIL Image로 변환
-        result_image = Image.fromarray(img_array, 'RGBA')
-        
-        # 바이트로 변환하여 반환
-        output_buffer = io.BytesIO()
-        result_image.save(output_buffer, format='PNG', optimize=True)
-        output_buffer.seek(0)
+        # 가장자리 부드럽게 처리 후 알파 채널에 마스크 적용
+        alpha = smooth_alpha_tiled(mask, sigma=2.0, normalize=True)
+        result_data = encode_png_with_alpha(image, alpha)
         
         print("✅ 마스크 적용 배경 제거 완료")
-        return output_buffer.getvalue()
+        return result_data
         
     except Exception as e:
         print(f"❌ 마스크 적용 실패: {e}")
         # 최후 수단으로 단순 투명 배경 생성
         return create_simple_transparent_background_from_pil(image)
 
+def encode_png_with_alpha(image: Image.Image, alpha: np.ndarray) -> bytes:
+    """
+    uint8 알파를 이미지의 알파 채널로 넣고 PNG로 인코딩합니다.
+    RGBA 배열 복사본을 만들지 않고 putalpha로 제자리 적용합니다. (RGBA 이미지는 알파가 교체됨)
+    
+    Args:
+        image: PIL 이미지 객체
+        alpha: (H, W) uint8 알파
+    
+    Returns:
+        PNG 이미지 데이터
+    """
+    if image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    image.putalpha(Image.fromarray(alpha, mode='L'))
+    
+    output_buffer = io.BytesIO()
+    image.save(output_buffer, format='PNG', optimize=True)
+    return output_buffer.getvalue()
+
 def create_simple_transparent_background(image_data: bytes) -> bytes:
     """
     단순한 투명 배경 생성 (최후 수단)
@@ -677,47 +1180,21 @@ def create_simple_transparent_background_from_pil(image: Image.Image) -> bytes:
         투명 배경이 적용된 이미지 데이터
     """
     try:
-        # RGBA 모드로 변환
-        if image.mode != 'RGBA':
-            image = image.convert('RGBA')
-        
-        # 이미지를 numpy 배열로 변환
-        img_array = np.array(image)
-        
         # 단순히 모서리 픽셀을 배경색으로 간주하고 제거
-        height, width = img_array.shape[:2]
+        rgb_array = np.asarray(image.convert('RGB'))
+        bg_color = mean_border_color(rgb_array)
         
-        # 모서리 픽셀들의 평균 색상 계산
-        edge_pixels = []
-        edge_pixels.extend(img_array[0, :, :3].reshape(-1, 3))  # 상단
-        edge_pixels.extend(img_array[-1, :, :3].reshape(-1, 3))  # 하단
-        edge_pixels.extend(img_array[:, 0, :3].reshape(-1, 3))  # 좌측
-        edge_pixels.extend(img_array[:, -1, :3].reshape(-1, 3))  # 우측
-        
-        edge_pixels = np.array(edge_pixels)
-        bg_color = np.mean(edge_pixels, axis=0)
-        
-        # 배경색과 유사한 픽셀들의 알파값을 0으로 설정
-        color_diff = np.linalg.norm(img_array[:, :, :3] - bg_color, axis=2)
+        # 배경색과 유사한 픽셀들의 알파값을 0으로 설정 (행 타일 단위 float32 연산)
         threshold = 50  # 색상 차이 임계값
-        
-        alpha_channel = np.where(color_diff < threshold, 0, 255).astype(np.uint8)
-        img_array[:, :, 3] = alpha_channel
+        alpha = background_alpha_tiled(rgb_array, bg_color, threshold)
+        del rgb_array
         
         # 가장자리 부드럽게 처리
-        alpha_smooth = gaussian_filter(alpha_channel.astype(float), sigma=1.0)
-        img_array[:, :, 3] = np.clip(alpha_smooth, 0, 255).astype(np.uint8)
-        
-        # PIL Image로 변환
-        result_image = Image.fromarray(img_array, 'RGBA')
-        
-        # 바이트로 변환하여 반환
-        output_buffer = io.BytesIO()
-        result_image.save(output_buffer, format='PNG', optimize=True)
-        output_buffer.seek(0)
+        alpha = smooth_alpha_tiled(alpha, sigma=1.0)
+        result_data = encode_png_with_alpha(image, alpha)
         
         print("✅ 단순 투명 배경 생성 완료")
-        return output_buffer.getvalue()
+        return result_data
         
     except Exception as e:
         print(f"❌ 투명 배경 생성 실패: {e}")
@@ -727,99 +1204,9 @@ def create_simple_transparent_background_from_pil(image: Image.Image) -> bytes:
         output_buffer.seek(0)
         return output_buffer.getvalue()
 
-def remove_background_with_rapidapi(image_url: str) -> Optional[bytes]:
+async def download_image_from_url_async(image_url: str) -> Optional[bytes]:
     """
-    RapidAPI의 remove background API를 사용하여 배경을 제거합니다.
-    
-    Args:
-        image_url (str): 배경을 제거할 이미지 URL
-    
-    Returns:
-        bytes: 배경이 제거된 이미지 데이터
-        None: 에러가 발생한 경우
-    """
-    try:
-        import http.client
-        import urllib.parse
-        
-        print(f"🔧 RapidAPI를 사용한 배경 제거 시작: {image_url}")
-        
-
-        
-        # HTTP 연결 설정
-        conn = http.client.HTTPSConnection("remove-background18.p.rapidapi.com")
-        
-        # 요청 페이로드 (URL 인코딩된 형태로 이미지 URL 전송)
-        payload = urllib.parse.urlencode({
-            'image_url': image_url
-        })
-        
-        # 헤더 설정
-        headers = {
-            'x-rapidapi-key': "83c9d8d142msh1a0fc7490405bd2p1937f6jsnb3258526aab8",
-            'x-rapidapi-host': "remove-background18.p.rapidapi.com",
-            'Content-Type': "application/x-www-form-urlencoded"
-        }
-        
-        # API 요청
-        print("📡 RapidAPI에 배경 제거 요청 중...")
-        conn.request("POST", "/public/remove-background", payload, headers)
-        
-        # 응답 받기
-        res = conn.getresponse()
-        data = res.read()
-        conn.close()
-        
-        print(f"📥 RapidAPI 응답 상태: {res.status}")
-        
-        if res.status != 200:
-            print(f"❌ RapidAPI 요청 실패: HTTP {res.status}")
-            return None
-        
-        # 응답 데이터 파싱
-        try:
-            import json
-            response_data = json.loads(data.decode("utf-8"))
-            print(f"📋 RapidAPI 응답: {response_data}")
-            
-            # 응답에서 결과 URL 추출 (API 응답 구조에 따라 조정 필요)
-            result_url = None
-            if isinstance(response_data, dict):
-                # 가능한 키들을 확인
-                if 'result_url' in response_data:
-                    result_url = response_data['result_url']
-                elif 'url' in response_data:
-                    result_url = response_data['url']
-                elif 'output_url' in response_data:
-                    result_url = response_data['output_url']
-                elif 'image_url' in response_data:
-                    result_url = response_data['image_url']
-                elif 'data' in response_data and isinstance(response_data['data'], dict):
-                    data_obj = response_data['data']
-                    if 'url' in data_obj:
-                        result_url = data_obj['url']
-            
-            if not result_url:
-                print(f"❌ 응답에서 결과 URL을 찾을 수 없습니다: {response_data}")
-                return None
-                
-            print(f"✅ 배경 제거된 이미지 URL 획득: {result_url}")
-            
-            # 결과 이미지 다운로드
-            return download_image_from_url(result_url)
-            
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON 응답 파싱 실패: {e}")
-            print(f"원본 응답: {data.decode('utf-8')[:500]}...")
-            return None
-            
-    except Exception as e:
-        print(f"❌ RapidAPI 배경 제거 중 오류 발생: {str(e)}")
-        return None
-
-def download_image_from_url(image_url: str) -> Optional[bytes]:
-    """
-    URL에서 이미지를 다운로드하여 바이트 데이터로 반환합니다.
+    URL에서 이미지를 공유 비동기 세션으로 다운로드합니다. (실행기 스레드를 사용하지 않음)
     
     Args:
         image_url (str): 다운로드할 이미지의 URL
@@ -830,59 +1217,17 @@ def download_image_from_url(image_url: str) -> Optional[bytes]:
     """
     try:
         print(f"⬇️ 이미지 다운로드 시작: {image_url}")
-        
-        # 헤더 설정 (일부 사이트의 봇 차단 우회)
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        # 이미지 다운로드
-        response = requests.get(image_url, headers=headers, timeout=60)
-        response.raise_for_status()
-        
-        # Content-Type 확인
-        content_type = response.headers.get('content-type', '').lower()
-        if 'image' not in content_type:
-            print(f"⚠️ URL이 이미지가 아닙니다: {content_type}")
-        
-        image_data = response.content
+        image_data = await call_async("image_download", fetch_bytes_async, image_url)
         print(f"✅ 이미지 다운로드 완료 (크기: {len(image_data)} bytes)")
-        
         return image_data
-        
     except Exception as e:
         print(f"❌ 이미지 다운로드 중 오류 발생: {str(e)}")
         return None
 
-def remove_background_from_url(image_url: str) -> Optional[bytes]:
-    """
-    이미지 URL에서 이미지를 다운로드하고 RapidAPI를 활용하여 배경을 제거합니다.
-    
-    Args:
-        image_url (str): 배경을 제거할 이미지 URL
-    
-    Returns:
-        bytes: 배경이 제거된 이미지 데이터
-        None: 에러가 발생한 경우
-    """
-    try:
-        print(f"🖼️ 배경 제거 프로세스 시작: {image_url}")
-        
-        # RapidAPI를 사용하여 배경 제거
-        background_removed_data = remove_background_with_rapidapi(image_url)
-        
-        if background_removed_data:
-            print(f"✅ 배경 제거 완료 (크기: {len(background_removed_data)} bytes)")
-            return background_removed_data
-        else:
-            print("❌ 배경 제거 실패")
-            return None
-        
-    except Exception as e:
-        print(f"❌ 배경 제거 중 오류 발생: {str(e)}")
-        return None
+# 배경 제거 엔진 (요청별 지정 또는 BG_REMOVAL_ORDER 순서로 시도, 엔진별 지연시간/오류율 기록)
+background_removal_router = create_default_router()
 
-def upload_image_to_supabase(image_data: bytes, file_name: str = None) -> Optional[str]:
+async def upload_image_to_supabase(image_data: bytes, file_name: str = None) -> Optional[str]:
     """
     이미지 데이터를 Supabase 스토리지에 업로드하고 공개 URL을 반환합니다.
     
@@ -895,7 +1240,7 @@ def upload_image_to_supabase(image_data: bytes, file_name: str = None) -> Option
         None: 에러가 발생한 경우
     """
     try:
-        supabase = get_supabase_client()
+        supabase = get_supabase_gateway()
         
         # 파일명 생성
         if not file_name:
@@ -907,10 +1252,11 @@ def upload_image_to_supabase(image_data: bytes, file_name: str = None) -> Option
         bucket_name = "images"  # Supabase에서 생성한 버킷명으로 변경
         
         # 이미지 업로드
-        upload_response = supabase.storage.from_(bucket_name).upload(
-            path=file_name,
-            file=image_data,
-            file_options={"content-type": "image/png"}
+        upload_response = await supabase.upload_async(
+            bucket_name,
+            file_name,
+            image_data,
+            content_type="image/png"
         )
         
         # Supabase storage 응답 확인 (에러가 없으면 성공)
@@ -921,7 +1267,7 @@ def upload_image_to_supabase(image_data: bytes, file_name: str = None) -> Option
             print(f"✅ 이미지 업로드 성공: {file_name}")
             
             # 공개 URL 생성
-            public_url = supabase.storage.from_(bucket_name).get_public_url(file_name)
+            public_url = await supabase.get_public_url_async(bucket_name, file_name)
             print(f"🌐 공개 URL: {public_url}")
             
             return public_url
@@ -930,7 +1276,7 @@ def upload_image_to_supabase(image_data: bytes, file_name: str = None) -> Option
         print(f"❌ Supabase 업로드 중 오류 발생: {str(e)}")
         return None
 
-def update_image_result_in_supabase(job_id: str, result_data: dict) -> bool:
+async def update_image_result_in_supabase(job_id: str, result_data: dict) -> bool:
     """
     Supabase의 image 테이블에서 job_id로 찾아서 result 컬럼을 업데이트합니다.
     
@@ -946,16 +1292,16 @@ def update_image_result_in_supabase(job_id: str, result_data: dict) -> bool:
             print("❌ job_id가 제공되지 않아 Supabase 업데이트를 건너뜁니다.")
             return False
             
-        supabase = get_supabase_client()
+        supabase = get_supabase_gateway()
         
         print(f"📝 Supabase image 테이블 업데이트 중 (job_id: {job_id})")
         
         # job_id로 행을 찾아서 result 컬럼 업데이트
-        response = supabase.table("image").update({
+        updated_rows = await supabase.update_async("image", {
             "result": result_data
-        }).eq("job_id", job_id).execute()
+        }, {"job_id": job_id})
         
-        if response.data:
+        if updated_rows:
             print(f"✅ Supabase 업데이트 성공 (job_id: {job_id})")
             return True
         else:
@@ -966,6 +1312,20 @@ def update_image_result_in_supabase(job_id: str, result_data: dict) -> bool:
         print(f"❌ Supabase 업데이트 중 오류 발생: {str(e)}")
         return False
 
+def compute_critical_path_time(timing: TimingInfo, parallel_stage_time: float) -> float:
+    """
+    병렬 단계의 실제 대기시간과 이후 순차 단계들의 소요시간을 합산하여 임계 경로 시간을 계산합니다.
+    
+    Args:
+        timing (TimingInfo): 단계별 소요시간 정보
+        parallel_stage_time (float): 병렬 단계 전체 대기시간
+    
+    Returns:
+        float: 임계 경로 소요시간(초)
+    """
+    sequential_stages = [timing.image_generation, timing.background_removal, timing.image_upload]
+    return round(parallel_stage_time + sum(t for t in sequential_stages if t), 2)
+
 @app.get("/")
 async def root():
     """API 상태 확인"""
@@ -999,11 +1359,11 @@ async def describe_image(request: ImageDescribeRequest):
             print(f"캐릭터 ID {request.character_id}에 대한 이미지 묘사 요청")
             print("📥 캐릭터 이미지 URL 가져오는 중...")
             # 캐릭터 이미지 URL 가져오기
-            character_image_url = get_random_character_image(request.character_id)
+            character_image_url = await run_blocking(get_random_character_image, request.character_id)
         
         # 이미지 묘사 수행
         print("🔍 이미지 묘사 생성 중...")
-        description = describe_face_simple(str(request.image_url), request.custom_prompt)
+        description = await describe_face_simple(str(request.image_url), request.custom_prompt)
         
         # 총 소요시간 계산
         processing_time = round(time.time() - start_time, 2)
@@ -1021,7 +1381,7 @@ async def describe_image(request: ImageDescribeRequest):
             
             # Supabase에 결과 업데이트
             if request.job_id:
-                update_image_result_in_supabase(request.job_id, response_data.dict())
+                await update_image_result_in_supabase(request.job_id, response_data.dict())
             
             return response_data
         else:
@@ -1036,7 +1396,7 @@ async def describe_image(request: ImageDescribeRequest):
             
             # Supabase에 결과 업데이트 (실패한 경우에도)
             if request.job_id:
-                update_image_result_in_supabase(request.job_id, response_data.dict())
+                await update_image_result_in_supabase(request.job_id, response_data.dict())
             
             return response_data
             
@@ -1052,6 +1412,14 @@ async def describe_image(request: ImageDescribeRequest):
 async def cartoonize_image(request: CartoonizeRequest):
     """
     이미지 URL, 캐릭터 ID, 커스텀 프롬프트를 받아서 캐릭터 이미지와 결합한 카툰화 이미지를 생성합니다.
+    요청 전체에 CARTOONIZE_DEADLINE_SECONDS 데드라인을 두어 남은 시간보다 긴 재시도 대기는 하지 않습니다.
+    """
+    with deadline_scope(CARTOONIZE_DEADLINE_SECONDS):
+        return await process_cartoonize(request)
+
+async def process_cartoonize(request: CartoonizeRequest):
+    """
+    카툰화 요청을 처리합니다.
     
     Args:
         request: 이미지 URL, 캐릭터 ID, 커스텀 프롬프트가 포함된 요청 객체
@@ -1097,15 +1465,43 @@ async def cartoonize_image(request: CartoonizeRequest):
         
         print(f"캐릭터 ID {request.character_id}에 대한 카툰화 요청")
         
-        # 1. 캐릭터 이미지 URL 가져오기
+        # 1~3. 서로 의존성이 없는 단계들을 병렬로 실행
+        # (캐릭터 이미지 URL 가져오기, 얼굴 묘사 생성, 프롬프트 번역)
+        # fused 모드에서는 얼굴 묘사와 프롬프트 번역을 하나의 Gemini 호출로 처리
+        use_fused = request.fused if request.fused is not None else GEMINI_FUSED_MODE
         step_start = time.time()
-        print("📥 1단계: 캐릭터 이미지 URL 가져오는 중...")
-        character_image_url = get_random_character_image(request.character_id)
-        timing.character_image_fetch = round(time.time() - step_start, 2)
-        print(f"✅ 1단계 완료 (소요시간: {timing.character_image_fetch}초)")
+        print("⚡ 1~3단계: 캐릭터 이미지 / 얼굴 묘사 / 프롬프트 번역 병렬 실행 중...")
+        if use_fused:
+            stage_results = await run_parallel_stages({
+                "character_image_fetch": (get_random_character_image, request.character_id),
+                "face_and_prompt": (describe_face_and_prepare_prompt, str(request.image_url), request.custom_prompt),
+            })
+        else:
+            stage_results = await run_parallel_stages({
+                "character_image_fetch": (get_random_character_image, request.character_id),
+                "face_description": (describe_face_simple, str(request.image_url)),
+                "prompt_translation": (prepare_custom_prompt, request.custom_prompt),
+            })
+        parallel_stage_time = round(time.time() - step_start, 2)
+        
+        character_image_url, timing.character_image_fetch = stage_results["character_image_fetch"]
+        if use_fused:
+            fused_result, fused_stage_time = stage_results["face_and_prompt"]
+            face_description, translated_prompt, timing.translation_skipped, timing.fused_call = fused_result
+            timing.face_description = fused_stage_time
+            timing.prompt_translation = fused_stage_time
+        else:
+            face_description, timing.face_description = stage_results["face_description"]
+            (translated_prompt, timing.translation_skipped), timing.prompt_translation = stage_results["prompt_translation"]
+            timing.fused_call = False
+        print(f"✅ 1단계 완료 - 캐릭터 이미지 (소요시간: {timing.character_image_fetch}초)")
+        print(f"✅ 2단계 완료 - 얼굴 묘사 (소요시간: {timing.face_description}초)")
+        print(f"✅ 3단계 완료 - 프롬프트 번역 (소요시간: {timing.prompt_translation}초, 번역 생략: {timing.translation_skipped})")
+        print(f"⚡ 병렬 단계 전체 대기시간: {parallel_stage_time}초")
         
         if not character_image_url:
             timing.total_time = round(time.time() - start_time, 2)
+            timing.critical_path_time = compute_critical_path_time(timing, parallel_stage_time)
             response_data = CartoonizeResponse(
                 success=False,
                 character_id=request.character_id,
@@ -1116,19 +1512,13 @@ async def cartoonize_image(request: CartoonizeRequest):
             
             # Supabase에 결과 업데이트 (실패한 경우에도)
             if request.job_id:
-                update_image_result_in_supabase(request.job_id, response_data.dict())
+                await update_image_result_in_supabase(request.job_id, response_data.dict())
             
             return response_data
         
-        # 2. 입력 이미지의 얼굴 묘사 생성
-        step_start = time.time()
-        print("🔍 2단계: 입력 이미지의 얼굴 묘사 생성 중...")
-        face_description = describe_face_simple(str(request.image_url))
-        timing.face_description = round(time.time() - step_start, 2)
-        print(f"✅ 2단계 완료 (소요시간: {timing.face_description}초)")
-        
         if not face_description:
             timing.total_time = round(time.time() - start_time, 2)
+            timing.critical_path_time = compute_critical_path_time(timing, parallel_stage_time)
             response_data = CartoonizeResponse(
                 success=False,
                 character_id=request.character_id,
@@ -1140,19 +1530,13 @@ async def cartoonize_image(request: CartoonizeRequest):
             
             # Supabase에 결과 업데이트 (실패한 경우에도)
             if request.job_id:
-                update_image_result_in_supabase(request.job_id, response_data.dict())
+                await update_image_result_in_supabase(request.job_id, response_data.dict())
             
             return response_data
         
-        # 3. 커스텀 프롬프트를 영어로 번역
-        step_start = time.time()
-        print("🔄 3단계: 커스텀 프롬프트를 영어로 번역 중...")
-        translated_prompt = translate_to_english(request.custom_prompt)
-        timing.prompt_translation = round(time.time() - step_start, 2)
-        print(f"✅ 3단계 완료 (소요시간: {timing.prompt_translation}초)")
-        
         if not translated_prompt:
             timing.total_time = round(time.time() - start_time, 2)
+            timing.critical_path_time = compute_critical_path_time(timing, parallel_stage_time)
             response_data = CartoonizeResponse(
                 success=False,
                 character_id=request.character_id,
@@ -1165,7 +1549,7 @@ async def cartoonize_image(request: CartoonizeRequest):
             
             # Supabase에 결과 업데이트 (실패한 경우에도)
             if request.job_id:
-                update_image_result_in_supabase(request.job_id, response_data.dict())
+                await update_image_result_in_supabase(request.job_id, response_data.dict())
             
             return response_data
         
@@ -1175,7 +1559,8 @@ async def cartoonize_image(request: CartoonizeRequest):
         print(f"👤 얼굴 묘사: {face_description[:100]}...")
         print(f"🎬 번역된 프롬프트: {translated_prompt}")
         
-        result_image_url = generate_cartoon_with_replicate(
+        result_image_url = await run_blocking(
+            generate_cartoon_with_replicate,
             character_image_url, 
             face_description, 
             translated_prompt
@@ -1189,17 +1574,29 @@ async def cartoonize_image(request: CartoonizeRequest):
             # 5. 생성된 이미지에서 배경 제거
             step_start = time.time()
             print("🎭 5단계: 생성된 이미지에서 배경 제거 중...")
-            background_removed_data = remove_background_from_url(result_image_url)
+            # 생성된 이미지는 한 번만 받아 로컬 엔진에 바이트로 전달
+            generated_image_data = await download_image_from_url_async(result_image_url)
+            background_removed_data, timing.background_engine = await run_blocking(
+                background_removal_router.remove,
+                generated_image_data,
+                result_image_url,
+                request.background_engine
+            )
             timing.background_removal = round(time.time() - step_start, 2)
             print(f"✅ 5단계 완료 (소요시간: {timing.background_removal}초)")
             
+            # 투명 여백 자르기 (선택) - 업로드/다운로드 크기 감소
+            background_crop = None
+            if background_removed_data and BG_AUTOCROP:
+                background_removed_data, background_crop = await run_blocking(autocrop_png, background_removed_data)
+            
             background_removed_url = None
             if background_removed_data:
                 # 6. 배경 제거된 이미지를 Supabase에 업로드
                 step_start = time.time()
                 print("📤 6단계: 배경 제거된 이미지를 Supabase에 업로드 중...")
                 bg_removed_filename = f"cartoon_bg_removed_{uuid.uuid4().hex}.png"
-                background_removed_url = upload_image_to_supabase(background_removed_data, bg_removed_filename)
+                background_removed_url = await upload_image_to_supabase(background_removed_data, bg_removed_filename)
                 timing.image_upload = round(time.time() - step_start, 2)
                 print(f"✅ 6단계 완료 (소요시간: {timing.image_upload}초)")
                 
@@ -1212,8 +1609,9 @@ async def cartoonize_image(request: CartoonizeRequest):
             
             # 전체 소요시간 계산
             timing.total_time = round(time.time() - start_time, 2)
+            timing.critical_path_time = compute_critical_path_time(timing, parallel_stage_time)
             
-            print(f"🎉 모든 단계 완료! 전체 소요시간: {timing.total_time}초")
+            print(f"🎉 모든 단계 완료! 전체 소요시간: {timing.total_time}초 (임계 경로: {timing.critical_path_time}초)")
             print(f"📊 단계별 소요시간:")
             print(f"  - 캐릭터 이미지 가져오기: {timing.character_image_fetch}초")
             print(f"  - 얼굴 묘사 생성: {timing.face_description}초")
@@ -1232,12 +1630,13 @@ async def cartoonize_image(request: CartoonizeRequest):
                 translated_prompt=translated_prompt,
                 face_description=face_description,
                 timing=timing,
+                background_crop=background_crop,
                 job_id=request.job_id
             )
             
             # Supabase에 결과 업데이트
             if request.job_id:
-                update_image_result_in_supabase(request.job_id, response_data.dict())
+                await update_image_result_in_supabase(request.job_id, response_data.dict())
             
             return response_data
         else:
@@ -1245,6 +1644,7 @@ async def cartoonize_image(request: CartoonizeRequest):
             
             # 전체 소요시간 계산
             timing.total_time = round(time.time() - start_time, 2)
+            timing.critical_path_time = compute_critical_path_time(timing, parallel_stage_time)
             
             # 더 구체적인 에러 메시지 제공
             error_message = """이미지 생성에 실패했습니다. 가능한 원인:
@@ -1267,7 +1667,7 @@ async def cartoonize_image(request: CartoonizeRequest):
             
             # Supabase에 결과 업데이트 (실패한 경우에도)
             if request.job_id:
-                update_image_result_in_supabase(request.job_id, response_data.dict())
+                await update_image_result_in_supabase(request.job_id, response_data.dict())
             
             return response_data
             
@@ -1279,6 +1679,88 @@ async def cartoonize_image(request: CartoonizeRequest):
             detail=f"서버 오류가 발생했습니다: {str(e)}"
         )
 
+@app.on_event("startup")
+async def startup_event():
+    """애플리케이션 시작 시 공유 클라이언트 초기화"""
+    global catalog_refresh_task
+    
+    # Gemini 모델을 한 번만 생성하여 이후 모든 호출에서 재사용
+    try:
+        gemini_models.preload([gemini_models.DEFAULT_MODEL_NAME])
+    except ValueError as e:
+        print(f"⚠️ Gemini 모델 초기화 건너뜀: {e}")
+    
+    try:
+        get_supabase_gateway()
+        print("✅ Supabase 게이트웨이 초기화 완료")
+    except ValueError as e:
+        print(f"⚠️ Supabase 게이트웨이 초기화 건너뜀: {e}")
+        return
+    
+    # 캐릭터 카탈로그 적재 및 백그라운드 갱신 시작
+    try:
+        await run_blocking(character_catalog.refresh)
+    except Exception:
+        print("⚠️ 캐릭터 카탈로그 초기 적재 실패 - 요청 시 개별 조회로 대체합니다.")
+    catalog_refresh_task = asyncio.create_task(character_catalog.run_refresh_loop(blocking_executor))
+
+async def prewarm_translation_cache():
+    """자주 쓰는 프롬프트 파일로 번역 캐시를 백그라운드에서 사전 적재합니다."""
+    loop = asyncio.get_running_loop()
+    
+    def translate_sync(text: str) -> Optional[str]:
+        # 실행기 스레드에서 이벤트 루프의 비동기 번역을 호출
+        return asyncio.run_coroutine_threadsafe(translate_with_gemini(text), loop).result()
+    
+    try:
+        await run_blocking(translation_cache.prewarm_from_file, TRANSLATION_PREWARM_FILE, translate_sync)
+    except Exception as e:
+        print(f"⚠️ 번역 캐시 사전 적재 실패: {e}")
+
+@app.on_event("startup")
+async def startup_prewarm_event():
+    """TRANSLATION_PREWARM_FILE이 설정된 경우 번역 캐시 사전 적재 시작"""
+    if translation_cache is not None and TRANSLATION_PREWARM_FILE:
+        asyncio.create_task(prewarm_translation_cache())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """애플리케이션 종료 시 블로킹 작업 실행기 정리"""
+    if catalog_refresh_task:
+        catalog_refresh_task.cancel()
+    print("🛑 블로킹 작업 실행기 종료 중...")
+    blocking_executor.shutdown(wait=False)
+    await close_all_http_sessions()
+
+@app.get("/metrics")
+async def metrics():
+    """공유 클라이언트 및 캐시 통계 조회"""
+    try:
+        supabase_stats = get_supabase_gateway().stats()
+    except ValueError:
+        supabase_stats = {}
+    return {
+        "supabase": supabase_stats,
+        "character_catalog": character_catalog.stats(),
+        "face_description_cache": face_description_cache.stats() if face_description_cache else None,
+        "translation_cache": translation_cache.stats() if translation_cache else None,
+        "gemini_usage": gemini_usage_stats(),
+        "gemini_models": gemini_models.loaded_models(),
+        "background_removal": background_removal_router.stats(),
+        "gemini_background_removal": gemini_bg_removal_summary(),
+        "provider_limits": provider_limits.stats(),
+        "resilience": resilience.stats()
+    }
+
+@app.post("/characters/invalidate")
+async def invalidate_character_catalog():
+    """캐릭터 카탈로그를 무효화하고 즉시 다시 적재합니다."""
+    try:
+        count = await run_blocking(character_catalog.refresh)
+        return {"success": True, "characters": count, "catalog": character_catalog.stats()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"캐릭터 카탈로그 갱신 실패: {str(e)}")
+
 @app.get("/health")
 async def health_check():
     """헬스 체크 엔드포인트"""
@@ -1299,25 +1781,31 @@ async def health_check():
         if not replicate_token:
             return {"status": "unhealthy", "error": "REPLICATE_API_TOKEN이 설정되지 않음"}
         
-        # RapidAPI 키 확인
+        # RapidAPI는 선택 엔진이므로 키가 없어도 정상 (배경 제거는 다른 엔진으로 대체)
         rapidapi_key = os.getenv("RAPIDAPI_KEY")
-        if not rapidapi_key:
-            return {"status": "unhealthy", "error": "RAPIDAPI_KEY가 설정되지 않음"}
         
         return {
             "status": "healthy", 
             "gemini_api": "configured",
             "supabase": "configured",
             "replicate_api": "configured",
-            "rapidapi": "configured"
+            "rapidapi": "configured" if rapidapi_key else "not_configured"
         }
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "fastapi_image_describe:app", 
-        host="0.0.0.0", 
-        port=8000, 
-        reload=True
-    )
+    # python main.py --benchmark-fused [이미지 경로] [한국어 프롬프트] [반복 횟수]: fused vs split 비교만 실행
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark-fused":
+        asyncio.run(benchmark_fused_vs_split(
+            sys.argv[2] if len(sys.argv) > 2 else "test_remove_bg.jpg",
+            sys.argv[3] if len(sys.argv) > 3 else "웃으면서 손을 흔드는 모습",
+            int(sys.argv[4]) if len(sys.argv) > 4 else 3
+        ))
+    else:
+        uvicorn.run(
+            "fastapi_image_describe:app", 
+            host="0.0.0.0", 
+            port=8000, 
+            reload=True
+        )
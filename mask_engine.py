@@ -0,0 +1,364 @@
+"""
+로컬 배경 마스크 엔진
+
+Replicate로 생성하는 캐리커처는 "white background"로 프롬프트되므로 대부분
+밝고 균일한 배경을 가집니다. 이런 이미지는 외부 API 없이 다음 단계로 배경을 제거합니다.
+
+1. 가장자리(테두리) 픽셀 통계로 밝고 균일한 배경인지 판별하고 신뢰도를 계산
+2. 배경색과 가까운 픽셀 중 테두리와 연결된 영역만 배경으로 선택 (벡터화된 flood fill)
+   - 인물 안쪽의 흰 영역(눈, 치아, 흰 옷)은 테두리와 연결되지 않으므로 유지됩니다.
+3. 경계 부근은 배경색과의 거리로 알파를 점진적으로 주고(크로마 키) 가볍게 블러하여 페더링
+
+신뢰도가 낮으면 None을 반환하여 호출 측이 원격/모델 기반 배경 제거로 대체하도록 합니다.
+
+큰 이미지용 거리 마스크(background_mask_tiled)는 행 타일 단위로 float32 연산을 수행하여
+추가 메모리를 타일 크기(MASK_TILE_ROWS x 너비 x 3 x 4 bytes)로 제한합니다.
+알파 계산(background_alpha_tiled, smooth_alpha_tiled)은 임시 버퍼 크기를
+ALPHA_TILE_MAX_BYTES 이하로 맞추어 행 수를 정하므로, 이미지 크기와 무관하게
+전체 크기의 float 버퍼를 만들지 않습니다.
+"""
+
+import io
+import os
+from typing import NamedTuple, Optional
+
+import numpy as np
+from PIL import Image
+from scipy import ndimage
+
+# 빠른 경로 설정
+MASK_BORDER_WIDTH = int(os.getenv("MASK_BORDER_WIDTH", "4"))  # 통계를 낼 테두리 두께(px)
+MASK_MIN_BACKGROUND_LUMA = float(os.getenv("MASK_MIN_BACKGROUND_LUMA", "200"))  # 밝은 배경 기준 휘도
+MASK_COLOR_TOLERANCE = float(os.getenv("MASK_COLOR_TOLERANCE", "30"))  # 배경으로 볼 RGB 거리
+MASK_FEATHER_RAMP = float(os.getenv("MASK_FEATHER_RAMP", "40"))  # 경계 알파가 0→1로 변하는 RGB 거리 폭
+MASK_FEATHER_RADIUS = int(os.getenv("MASK_FEATHER_RADIUS", "2"))  # 경계로 보는 반경(px)
+MASK_FAST_PATH_MIN_CONFIDENCE = float(os.getenv("MASK_FAST_PATH_MIN_CONFIDENCE", "0.9"))
+MASK_TILE_ROWS = int(os.getenv("MASK_TILE_ROWS", "256"))  # 타일 단위 처리 시 한 번에 처리할 행 수
+BG_AUTOCROP = os.getenv("BG_AUTOCROP", "0") == "1"  # 배경 제거 결과를 알파 영역에 맞춰 자르기
+BG_AUTOCROP_PADDING = int(os.getenv("BG_AUTOCROP_PADDING", "8"))  # 자를 때 남길 여백(px)
+ALPHA_TILE_MAX_BYTES = int(os.getenv("ALPHA_TILE_MAX_BYTES", str(16 * 1024 * 1024)))  # 알파 계산 임시 버퍼 상한
+MASK_MIN_FOREGROUND_RATIO = 0.02
+MASK_MAX_FOREGROUND_RATIO = 0.98
+
+
+class BackgroundEstimate(NamedTuple):
+    color: np.ndarray       # 추정 배경색 (RGB float32)
+    luma: float             # 배경 휘도
+    uniformity: float       # 배경색 허용 범위 안에 드는 테두리 픽셀 비율
+    is_light_uniform: bool  # 밝고 균일한 배경 여부
+
+
+def border_pixels(rgb: np.ndarray, width: int = MASK_BORDER_WIDTH) -> np.ndarray:
+    """이미지 테두리(상/하/좌/우 width px)의 픽셀을 (N, 3) 배열로 반환합니다."""
+    width = max(1, min(width, rgb.shape[0] // 2, rgb.shape[1] // 2))
+    return np.concatenate([
+        rgb[:width].reshape(-1, 3),
+        rgb[-width:].reshape(-1, 3),
+        rgb[width:-width, :width].reshape(-1, 3),
+        rgb[width:-width, -width:].reshape(-1, 3)
+    ])
+
+
+def color_distance(rgb: np.ndarray, color: np.ndarray) -> np.ndarray:
+    """각 픽셀과 기준 색 사이의 RGB 유클리드 거리를 float32로 계산합니다."""
+    diff = rgb.astype(np.float32) - color.astype(np.float32)
+    return np.sqrt(np.einsum("...c,...c->...", diff, diff))
+
+
+def mean_border_color(rgb: np.ndarray, width: int = 1) -> np.ndarray:
+    """테두리 픽셀의 평균 색을 float32로 반환합니다."""
+    return border_pixels(rgb, width).astype(np.float32).mean(axis=0)
+
+
+def background_mask_tiled(rgb: np.ndarray, color: np.ndarray, threshold: float,
+                          tile_rows: int = MASK_TILE_ROWS) -> np.ndarray:
+    """
+    기준 색과의 RGB 거리가 threshold 미만인 픽셀을 True로 하는 마스크를 행 타일 단위로 계산합니다.
+    제곱 거리로 비교하여 sqrt를 생략하고, 타일 버퍼 하나를 재사용합니다.
+
+    Args:
+        rgb: (H, W, 3) uint8 배열
+        color: 기준 색 (RGB)
+        threshold: 배경으로 볼 RGB 거리 (미만)
+        tile_rows: 한 번에 처리할 행 수
+
+    Returns:
+        np.ndarray: (H, W) bool 배열
+    """
+    height, width = rgb.shape[:2]
+    tile_rows = max(1, min(tile_rows, height))
+    color = np.asarray(color, dtype=np.float32)
+    threshold_sq = np.float32(threshold) ** 2
+
+    mask = np.empty((height, width), dtype=bool)
+    buffer = np.empty((tile_rows, width, 3), dtype=np.float32)
+    distance_sq = np.empty((tile_rows, width), dtype=np.float32)
+    for start in range(0, height, tile_rows):
+        stop = min(start + tile_rows, height)
+        tile = buffer[:stop - start]
+        tile_distance = distance_sq[:stop - start]
+        np.subtract(rgb[start:stop], color, out=tile)
+        np.multiply(tile, tile, out=tile)
+        np.sum(tile, axis=2, out=tile_distance)
+        np.less(tile_distance, threshold_sq, out=mask[start:stop])
+    return mask
+
+
+def rows_within_budget(width: int, bytes_per_pixel: int,
+                       max_bytes: int = ALPHA_TILE_MAX_BYTES, halo_rows: int = 0) -> int:
+    """임시 버퍼가 max_bytes를 넘지 않도록 한 번에 처리할 행 수를 계산합니다. (최소 1행)"""
+    rows = max_bytes // max(1, width * bytes_per_pixel) - 2 * halo_rows
+    return max(1, rows)
+
+
+def background_alpha_tiled(rgb: np.ndarray, color: np.ndarray, threshold: float,
+                           max_bytes: int = ALPHA_TILE_MAX_BYTES) -> np.ndarray:
+    """
+    기준 색과 가까운 픽셀은 0, 나머지는 255인 uint8 알파를 타일 단위로 계산합니다.
+
+    Args:
+        rgb: (H, W, 3) uint8 배열
+        color: 배경색 (RGB)
+        threshold: 배경으로 볼 RGB 거리 (미만)
+        max_bytes: 임시 버퍼 상한
+
+    Returns:
+        np.ndarray: (H, W) uint8 알파
+    """
+    # 타일당 임시 버퍼: RGB 차이 float32 3채널 + 거리 float32 1채널 = 16 bytes/px
+    tile_rows = rows_within_budget(rgb.shape[1], 16, max_bytes)
+    mask = background_mask_tiled(rgb, color, threshold, tile_rows)
+    # 제자리 연산으로 전체 크기 배열을 하나만 사용
+    alpha = np.logical_not(mask, out=mask).view(np.uint8)
+    alpha *= 255
+    return alpha
+
+
+def smooth_alpha_tiled(alpha: np.ndarray, sigma: float,
+                       max_bytes: int = ALPHA_TILE_MAX_BYTES, normalize: bool = False) -> np.ndarray:
+    """
+    uint8 알파에 가우시안 블러를 행 타일 단위로 적용합니다.
+    각 타일은 위아래로 필터 반경만큼 겹쳐 읽으므로 전체 이미지에 한 번에 적용한 결과와 같습니다.
+
+    Args:
+        alpha: (H, W) uint8 알파
+        sigma: 가우시안 표준편차
+        max_bytes: 임시 버퍼 상한
+        normalize: True면 최대값이 255가 되도록 다시 스케일
+
+    Returns:
+        np.ndarray: 블러된 (H, W) uint8 알파 (새 배열)
+    """
+    height, width = alpha.shape
+    halo = int(4.0 * sigma + 0.5)  # gaussian_filter 기본 truncate=4.0의 필터 반경
+    # 타일당 임시 버퍼: 입력 float32 + 출력 float32 = 8 bytes/px
+    tile_rows = rows_within_budget(width, 8, max_bytes, halo)
+
+    smoothed_alpha = np.empty_like(alpha)
+    peak = 0.0
+    for start in range(0, height, tile_rows):
+        stop = min(start + tile_rows, height)
+        low = max(0, start - halo)
+        high = min(height, stop + halo)
+        tile = alpha[low:high].astype(np.float32)
+        smoothed = np.empty_like(tile)
+        ndimage.gaussian_filter(tile, sigma=sigma, output=smoothed)
+        core = smoothed[start - low:stop - low]
+        np.clip(core, 0, 255, out=core)
+        peak = max(peak, float(core.max()))
+        smoothed_alpha[start:stop] = core
+
+    if normalize and 0 < peak < 255:
+        scale = np.float32(255 / peak)
+        for start in range(0, height, tile_rows):
+            stop = min(start + tile_rows, height)
+            tile = smoothed_alpha[start:stop].astype(np.float32)
+            tile *= scale
+            smoothed_alpha[start:stop] = tile
+
+    return smoothed_alpha
+
+
+def estimate_background(rgb: np.ndarray,
+                        tolerance: float = MASK_COLOR_TOLERANCE,
+                        min_luma: float = MASK_MIN_BACKGROUND_LUMA) -> BackgroundEstimate:
+    """
+    테두리 통계로 배경색과 균일도를 추정합니다.
+    평균 대신 중앙값을 사용하여 테두리에 걸친 인물 일부의 영향을 줄입니다.
+
+    Args:
+        rgb: (H, W, 3) uint8 배열
+        tolerance: 배경색으로 볼 RGB 거리
+        min_luma: 밝은 배경으로 볼 최소 휘도
+
+    Returns:
+        BackgroundEstimate: 배경 추정 결과
+    """
+    border = border_pixels(rgb)
+    color = np.median(border, axis=0).astype(np.float32)
+    luma = float(0.299 * color[0] + 0.587 * color[1] + 0.114 * color[2])
+    uniformity = float(np.mean(color_distance(border, color) <= tolerance))
+    return BackgroundEstimate(
+        color=color,
+        luma=luma,
+        uniformity=uniformity,
+        is_light_uniform=luma >= min_luma
+    )
+
+
+def border_connected_mask(candidates: np.ndarray) -> np.ndarray:
+    """
+    후보 픽셀(True) 중 이미지 테두리와 연결된 영역만 True로 남깁니다.
+    연결 요소 라벨링으로 flood fill을 한 번에 수행합니다.
+
+    Args:
+        candidates: (H, W) bool 배열
+
+    Returns:
+        np.ndarray: 테두리와 연결된 후보 영역 (H, W) bool 배열
+    """
+    labels, _ = ndimage.label(candidates)
+    border_labels = np.unique(np.concatenate([labels[0], labels[-1], labels[:, 0], labels[:, -1]]))
+    border_labels = border_labels[border_labels != 0]
+    return np.isin(labels, border_labels)
+
+
+def feathered_alpha(distance: np.ndarray, background: np.ndarray,
+                    tolerance: float = MASK_COLOR_TOLERANCE,
+                    ramp: float = MASK_FEATHER_RAMP,
+                    radius: int = MASK_FEATHER_RADIUS) -> np.ndarray:
+    """
+    배경 마스크로 uint8 알파를 만들고 경계를 페더링합니다.
+    배경과 맞닿은 전경 경계 픽셀은 배경색과의 거리에 비례한 알파를 받아
+    안티에일리어싱된 밝은 테두리(헤일로)가 남지 않습니다.
+
+    Args:
+        distance: 픽셀별 배경색 거리 (H, W)
+        background: 배경 마스크 (H, W) bool
+        tolerance: 배경으로 볼 RGB 거리
+        ramp: 경계 알파가 0→1로 변하는 거리 폭
+        radius: 경계로 보는 반경(px)
+
+    Returns:
+        np.ndarray: (H, W) uint8 알파
+    """
+    alpha = np.where(background, 0.0, 1.0).astype(np.float32)
+    if radius > 0:
+        edge_band = ndimage.binary_dilation(background, iterations=radius) & ~background
+        alpha[edge_band] = np.clip((distance[edge_band] - tolerance) / max(ramp, 1e-6), 0.0, 1.0)
+        alpha = ndimage.gaussian_filter(alpha, sigma=radius / 2)
+    return (alpha * 255 + 0.5).astype(np.uint8)
+
+
+def compute_light_background_alpha(rgb: np.ndarray) -> tuple:
+    """
+    밝고 균일한 배경을 제거하는 알파와 신뢰도를 계산합니다.
+
+    Args:
+        rgb: (H, W, 3) uint8 배열
+
+    Returns:
+        tuple: (알파 (H, W) uint8 또는 None, 신뢰도 0~1)
+    """
+    estimate = estimate_background(rgb)
+    if not estimate.is_light_uniform:
+        return None, 0.0
+
+    distance = color_distance(rgb, estimate.color)
+    background = border_connected_mask(distance <= MASK_COLOR_TOLERANCE)
+    foreground_ratio = 1.0 - float(np.mean(background))
+    if not (MASK_MIN_FOREGROUND_RATIO <= foreground_ratio <= MASK_MAX_FOREGROUND_RATIO):
+        # 배경이 거의 전부이거나 거의 없으면 판별이 잘못된 것으로 간주
+        return None, 0.0
+
+    return feathered_alpha(distance, background), estimate.uniformity
+
+
+def remove_light_background(image_data: bytes,
+                            min_confidence: float = MASK_FAST_PATH_MIN_CONFIDENCE) -> tuple:
+    """
+    밝고 균일한 배경의 이미지에서 로컬로 배경을 제거합니다.
+
+    Args:
+        image_data: 입력 이미지 데이터
+        min_confidence: 결과를 사용할 최소 신뢰도
+
+    Returns:
+        tuple: (배경이 제거된 PNG 바이트 또는 None, 신뢰도)
+               신뢰도가 min_confidence보다 낮으면 PNG 바이트는 None
+    """
+    image = Image.open(io.BytesIO(image_data)).convert("RGB")
+    rgb = np.asarray(image)
+    alpha, confidence = compute_light_background_alpha(rgb)
+    if alpha is None or confidence < min_confidence:
+        return None, confidence
+
+    image.putalpha(Image.fromarray(alpha, mode="L"))
+    output_buffer = io.BytesIO()
+    image.save(output_buffer, format="PNG")
+    return output_buffer.getvalue(), confidence
+
+
+def alpha_crop_box(image: Image.Image, padding: int = BG_AUTOCROP_PADDING) -> Optional[tuple]:
+    """
+    알파가 0이 아닌 영역의 경계 상자에 여백을 더한 자르기 영역을 계산합니다.
+
+    Returns:
+        tuple: (left, top, right, bottom)
+        None: 알파 채널이 없거나, 완전히 투명하거나, 자를 필요가 없는 경우
+    """
+    if "A" not in image.getbands():
+        return None
+    bbox = image.getchannel("A").getbbox()
+    if bbox is None:
+        return None
+
+    width, height = image.size
+    left, top, right, bottom = bbox
+    box = (max(0, left - padding), max(0, top - padding), min(width, right + padding), min(height, bottom + padding))
+    if box == (0, 0, width, height):
+        return None
+    return box
+
+
+def crop_to_alpha(image: Image.Image, padding: int = BG_AUTOCROP_PADDING) -> tuple:
+    """
+    투명 여백을 잘라냅니다.
+
+    Returns:
+        tuple: (잘린 이미지, 자르기 정보 dict 또는 None)
+               자르기 정보: 원본 기준 x, y 오프셋과 잘린 크기, 원본 크기
+    """
+    if image.mode == "P" and "transparency" in image.info:
+        image = image.convert("RGBA")
+    box = alpha_crop_box(image, padding)
+    if box is None:
+        return image, None
+
+    crop = {
+        "x": box[0],
+        "y": box[1],
+        "width": box[2] - box[0],
+        "height": box[3] - box[1],
+        "original_width": image.width,
+        "original_height": image.height
+    }
+    return image.crop(box), crop
+
+
+def autocrop_png(png_data: bytes, padding: int = BG_AUTOCROP_PADDING) -> tuple:
+    """
+    PNG 이미지의 투명 여백을 잘라 다시 인코딩합니다.
+
+    Returns:
+        tuple: (PNG 바이트, 자르기 정보 dict 또는 None) - 자를 필요가 없으면 원본 바이트 그대로 반환
+    """
+    cropped, crop = crop_to_alpha(Image.open(io.BytesIO(png_data)), padding)
+    if crop is None:
+        return png_data, None
+
+    output_buffer = io.BytesIO()
+    cropped.save(output_buffer, format="PNG")
+    print(f"[MASK_ENGINE] 투명 여백 자르기: {crop['original_width']}x{crop['original_height']} -> "
+          f"{crop['width']}x{crop['height']} ({len(png_data)} -> {output_buffer.tell()} bytes)")
+    return output_buffer.getvalue(), crop
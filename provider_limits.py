@@ -0,0 +1,433 @@
+"""
+외부 API 제공자별 동시 처리 수 제한 및 토큰 버킷 속도 제한
+
+OpenAI, Replicate, Gemini, RapidAPI, Supabase는 각자 속도 제한이 있으므로
+스레드가 허용하는 만큼 호출을 보내고 429를 받는 대신, 제공자마다 하나의 제한기로 호출 속도를 맞춥니다.
+main.py와 app.py(및 worker.py)가 같은 모듈을 사용하며, 제한기는 프로세스 단위입니다.
+
+- 동시 처리 수: 스레드(동기)와 이벤트 루프(비동기) 호출자가 같은 슬롯을 도착 순서대로 나눠 씀
+- 토큰 버킷: 초당 요청 수(rate)와 버스트 크기(burst), rate가 0이면 속도 제한 없음
+- 응답 적응: 429/503 또는 남은 요청 수 0이면 Retry-After / 속도 제한 리셋 헤더만큼 모든 호출을 멈추고,
+  429를 받으면 속도를 절반으로 줄였다가 성공할 때마다 조금씩 원래 속도로 회복
+
+설정: PROVIDER_LIMITS="openai=4:1:4,gemini=8:5:10" (이름=동시 처리 수:초당 요청 수:버스트, 일부만 지정 가능)
+
+    with limit("openai"):
+        client.responses.create(...)
+
+    async with limit_async("gemini"):
+        await model.generate_content_async(...)
+
+    with limit("rapidapi") as limiter:
+        res = session.post(...)
+        limiter.observe_response(res.status_code, res.headers)
+"""
+
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# 제공자별 기본값: (동시 처리 수, 초당 요청 수, 버스트)
+PROVIDER_DEFAULTS = {
+    "openai": (4, 1.0, 4),
+    "replicate": (4, 1.0, 4),
+    "gemini": (8, 5.0, 10),
+    "rapidapi": (2, 1.0, 2),
+    "supabase": (16, 20.0, 40),
+}
+PROVIDER_DEFAULT_LIMIT = (4, 0.0, 1)  # 목록에 없는 제공자
+PROVIDER_LIMITS_SPEC = os.getenv("PROVIDER_LIMITS", "")
+# 429를 받았는데 Retry-After 등 힌트가 없을 때 멈추는 시간(초)
+PROVIDER_THROTTLE_BACKOFF_SECONDS = float(os.getenv("PROVIDER_THROTTLE_BACKOFF_SECONDS", "2.0"))
+PROVIDER_MAX_BLOCK_SECONDS = float(os.getenv("PROVIDER_MAX_BLOCK_SECONDS", "120"))
+
+THROTTLE_STATUSES = (429, 503)
+RATE_DECREASE_FACTOR = 0.5    # 429를 받았을 때 속도 감소 비율
+RATE_RECOVERY_STEP = 0.05     # 성공 1건당 기본 속도 대비 회복량
+RATE_MIN_FRACTION = 0.1       # 기본 속도 대비 최저 속도
+
+# 남은 요청 수 / 리셋 시간 헤더 (앞에서부터 확인)
+REMAINING_HEADERS = ("x-ratelimit-remaining-requests", "x-ratelimit-requests-remaining",
+                     "x-ratelimit-remaining", "ratelimit-remaining")
+RESET_HEADERS = ("x-ratelimit-reset-requests", "x-ratelimit-requests-reset",
+                 "x-ratelimit-reset", "ratelimit-reset")
+
+# OpenAI 형식의 기간 값 ('6m0s', '20ms')
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_PATTERN = re.compile(r"(?:\d+(?:\.\d+)?(?:ms|h|m|s))+")
+DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_limits(spec: str) -> dict:
+    """
+    'openai=4:1:4,gemini=8' 형식의 설정을 {제공자: (동시 처리 수, 초당 요청 수, 버스트)}로 변환합니다.
+    생략한 값은 기본값을 사용합니다.
+
+    Raises:
+        ValueError: 형식이 잘못된 경우
+    """
+    limits = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, values = item.partition("=")
+        name = name.strip()
+        if not name or not values.strip():
+            raise ValueError(f"제공자 제한 설정 형식이 잘못되었습니다: {item!r} (예: openai=4:1:4)")
+        defaults = PROVIDER_DEFAULTS.get(name, PROVIDER_DEFAULT_LIMIT)
+        parts = [part.strip() for part in values.split(":")]
+        concurrency = int(parts[0]) if parts[0] else defaults[0]
+        rate = float(parts[1]) if len(parts) > 1 and parts[1] else defaults[1]
+        burst = int(parts[2]) if len(parts) > 2 and parts[2] else defaults[2]
+        limits[name] = (concurrency, rate, burst)
+    return limits
+
+
+def parse_duration(value) -> Optional[float]:
+    """
+    속도 제한 헤더의 시간 값을 초 단위로 변환합니다.
+    초(숫자), OpenAI 형식('1s', '6m0s', '20ms'), Unix 타임스탬프, HTTP 날짜를 지원합니다.
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        seconds = float(text)
+        # 큰 값은 리셋 시각(Unix 타임스탬프)으로 해석
+        return max(0.0, seconds - time.time()) if seconds > 1e9 else max(0.0, seconds)
+    except ValueError:
+        pass
+
+    if DURATION_PATTERN.fullmatch(text):
+        return sum(float(number) * DURATION_UNITS[unit] for number, unit in DURATION_PART.findall(text))
+
+    try:
+        return max(0.0, parsedate_to_datetime(text).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def error_status_code(error: BaseException) -> Optional[int]:
+    """
+    SDK/HTTP 라이브러리 예외에서 HTTP 상태 코드를 찾습니다.
+    (requests/openai: response.status_code, aiohttp: status, replicate: status, google api_core: code)
+    """
+    response = getattr(error, "response", None)
+    for source, attribute in ((error, "status_code"), (error, "status"), (error, "code"),
+                              (response, "status_code"), (response, "status")):
+        value = getattr(source, attribute, None) if source is not None else None
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    if type(error).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests"):
+        return 429
+    return None
+
+
+def error_headers(error: BaseException):
+    """예외에 응답 헤더가 있으면 반환합니다."""
+    return getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None)
+
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """Retry-After(-ms) 헤더의 대기 시간(초)을 반환합니다."""
+    retry_after_ms = parse_duration(_header(headers, "retry-after-ms"))
+    if retry_after_ms is not None:
+        return retry_after_ms / 1000
+    return parse_duration(_header(headers, "retry-after"))
+
+
+def _header(headers, name: str):
+    if not headers:
+        return None
+    try:
+        return headers.get(name)
+    except AttributeError:
+        return None
+
+
+class ProviderLimiter:
+    """한 제공자에 대한 동시 처리 수 제한 + 토큰 버킷 (스레드/이벤트 루프 공용)"""
+
+    def __init__(self, name: str, max_concurrency: int, rate_per_second: float, burst: int):
+        """
+        Args:
+            name (str): 제공자 이름
+            max_concurrency (int): 동시에 진행할 수 있는 최대 호출 수
+            rate_per_second (float): 초당 요청 수 (0이면 속도 제한 없음)
+            burst (int): 한 번에 보낼 수 있는 최대 요청 수 (토큰 버킷 크기)
+        """
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.base_rate = max(0.0, rate_per_second)
+        self.rate = self.base_rate
+        self.burst = max(1, burst)
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._active = 0
+        self._waiters = deque()  # 슬롯을 기다리는 (threading.Event) 또는 (loop, future)
+        self.acquired = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.throttled = 0
+        self.blocks = 0
+
+    # 동시 처리 슬롯
+    def _try_take_slot(self, waiter) -> bool:
+        """슬롯이 비어 있고 앞선 대기자가 없으면 바로 가져가고, 아니면 대기열에 넣습니다. (락 안에서 호출)"""
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            return True
+        self._waiters.append(waiter)
+        return False
+
+    def _release_slot(self):
+        """슬롯을 반납하고, 기다리는 호출자가 있으면 그대로 넘겨줍니다."""
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                if not future.done():
+                    loop.call_soon_threadsafe(self._grant_future, future)
+                    return
+            self._active -= 1
+
+    def _grant_future(self, future):
+        """이벤트 루프에서 슬롯을 넘겨받습니다. 그사이 취소되었다면 다음 대기자에게 넘깁니다."""
+        if future.done():
+            self._release_slot()
+        else:
+            future.set_result(True)
+
+    # 토큰 버킷
+    def _reserve_token(self) -> float:
+        """토큰 하나를 예약하고 호출 전에 기다려야 할 시간(초)을 반환합니다."""
+        with self._lock:
+            now = time.monotonic()
+            block_wait = max(0.0, self._blocked_until - now)
+            if self.rate <= 0:
+                return block_wait
+            self._tokens = min(float(self.burst), self._tokens + (now - self._refilled_at) * self.rate)
+            self._refilled_at = now
+            # 토큰이 없으면 음수로 예약해 두고 다시 채워질 때까지 기다림 (도착 순서대로 간격이 벌어짐)
+            self._tokens -= 1
+            token_wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(block_wait, token_wait)
+
+    def _record_wait(self, waited: float):
+        with self._lock:
+            self.acquired += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def acquire(self):
+        """슬롯과 토큰을 얻을 때까지 현재 스레드에서 기다립니다."""
+        start = time.monotonic()
+        event = threading.Event()
+        with self._lock:
+            granted = self._try_take_slot(event)
+        if not granted:
+            event.wait()
+        try:
+            wait = self._reserve_token()
+            if wait > 0:
+                time.sleep(wait)
+        except BaseException:
+            self._release_slot()
+            raise
+        self._record_wait(time.monotonic() - start)
+
+    async def acquire_async(self):
+        """슬롯과 토큰을 얻을 때까지 이벤트 루프를 막지 않고 기다립니다."""
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            granted = self._try_take_slot((loop, future))
+        if not granted:
+            try:
+                await future
+            except asyncio.CancelledError:
+                with self._lock:
+                    try:
+                        self._waiters.remove((loop, future))
+                        granted_meanwhile = False
+                    except ValueError:
+                        granted_meanwhile = True
+                if granted_meanwhile and future.done() and not future.cancelled():
+                    self._release_slot()
+                raise
+        try:
+            wait = self._reserve_token()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        except BaseException:
+            self._release_slot()
+            raise
+        self._record_wait(time.monotonic() - start)
+
+    def release(self):
+        """acquire/acquire_async로 얻은 슬롯을 반납합니다."""
+        self._release_slot()
+
+    # 응답 적응
+    def block_for(self, seconds: float, reason: str):
+        """지정한 시간 동안 새 호출을 멈춥니다."""
+        seconds = min(max(0.0, seconds), PROVIDER_MAX_BLOCK_SECONDS)
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until <= self._blocked_until:
+                return
+            self._blocked_until = until
+            self.blocks += 1
+        print(f"[PROVIDER_LIMIT] {self.name} 호출 {seconds:.2f}초 중지: {reason}")
+
+    def observe_response(self, status_code: Optional[int], headers=None):
+        """
+        응답 상태 코드와 속도 제한 헤더를 반영합니다.
+
+        Args:
+            status_code (Optional[int]): HTTP 상태 코드
+            headers: 응답 헤더 (get 메서드가 있는 매핑)
+        """
+        retry_after = retry_after_seconds(headers)
+
+        if status_code in THROTTLE_STATUSES:
+            reset = next((parse_duration(_header(headers, name)) for name in RESET_HEADERS
+                          if _header(headers, name) is not None), None)
+            wait = retry_after if retry_after is not None else reset
+            self.block_for(PROVIDER_THROTTLE_BACKOFF_SECONDS if wait is None else wait, f"HTTP {status_code}")
+            if status_code == 429:
+                with self._lock:
+                    self.throttled += 1
+                    if self.base_rate > 0:
+                        self.rate = max(self.base_rate * RATE_MIN_FRACTION, self.rate * RATE_DECREASE_FACTOR)
+            return
+
+        remaining = next((_header(headers, name) for name in REMAINING_HEADERS
+                          if _header(headers, name) is not None), None)
+        if remaining is not None:
+            try:
+                exhausted = float(remaining) <= 0
+            except ValueError:
+                exhausted = False
+            if exhausted:
+                reset = next((parse_duration(_header(headers, name)) for name in RESET_HEADERS
+                              if _header(headers, name) is not None), None)
+                self.block_for(reset if reset is not None else PROVIDER_THROTTLE_BACKOFF_SECONDS, "남은 요청 수 0")
+
+        if status_code is not None and status_code < 400:
+            self.record_success()
+
+    def observe_exception(self, error: BaseException):
+        """SDK 예외에서 상태 코드와 헤더를 찾아 속도 제한 응답이면 반영합니다."""
+        status_code = error_status_code(error)
+        if status_code in THROTTLE_STATUSES:
+            self.observe_response(status_code, error_headers(error))
+
+    def record_success(self):
+        """성공한 호출을 반영해 줄어든 속도를 조금씩 회복합니다."""
+        if self.rate < self.base_rate:
+            with self._lock:
+                self.rate = min(self.base_rate, self.rate + self.base_rate * RATE_RECOVERY_STEP)
+
+    @contextmanager
+    def slot(self):
+        """동기 호출 구간 (예외가 속도 제한 응답이면 자동으로 반영)"""
+        self.acquire()
+        try:
+            yield self
+        except Exception as e:
+            self.observe_exception(e)
+            raise
+        else:
+            self.record_success()
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def slot_async(self):
+        """비동기 호출 구간 (예외가 속도 제한 응답이면 자동으로 반영)"""
+        await self.acquire_async()
+        try:
+            yield self
+        except Exception as e:
+            self.observe_exception(e)
+            raise
+        else:
+            self.record_success()
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        """동시 처리/대기 수, 현재 속도, 대기 시간과 속도 제한 응답 통계를 반환합니다."""
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "active": self._active,
+                "waiting": len(self._waiters),
+                "base_rate_per_second": self.base_rate,
+                "rate_per_second": round(self.rate, 3),
+                "burst": self.burst,
+                "blocked_for_seconds": round(max(0.0, self._blocked_until - time.monotonic()), 3),
+                "acquired": self.acquired,
+                "avg_wait_seconds": round(self.total_wait_seconds / self.acquired, 3) if self.acquired else 0.0,
+                "max_wait_seconds": round(self.max_wait_seconds, 3),
+                "throttled": self.throttled,
+                "blocks": self.blocks
+            }
+
+
+class ProviderLimits:
+    """제공자 이름별 제한기 모음 (처음 사용할 때 생성)"""
+
+    def __init__(self, overrides: Optional[dict] = None):
+        """
+        Args:
+            overrides (Optional[dict]): {제공자: (동시 처리 수, 초당 요청 수, 버스트)} 기본값 대신 사용할 설정
+        """
+        self.overrides = overrides or {}
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> ProviderLimiter:
+        """제공자의 제한기를 반환합니다."""
+        with self._lock:
+            limiter = self._limiters.get(name)
+            if limiter is None:
+                concurrency, rate, burst = self.overrides.get(name, PROVIDER_DEFAULTS.get(name, PROVIDER_DEFAULT_LIMIT))
+                limiter = ProviderLimiter(name, concurrency, rate, burst)
+                self._limiters[name] = limiter
+                print(f"[PROVIDER_LIMIT] 제한기 생성: {name} (동시 {concurrency}, 초당 {rate}, 버스트 {burst})")
+            return limiter
+
+    def stats(self) -> dict:
+        """제공자별 통계를 반환합니다."""
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+provider_limits = ProviderLimits(parse_limits(PROVIDER_LIMITS_SPEC))
+
+
+def limit(name: str):
+    """제공자 호출 구간을 감싸는 동기 컨텍스트 매니저를 반환합니다."""
+    return provider_limits.get(name).slot()
+
+
+def limit_async(name: str):
+    """제공자 호출 구간을 감싸는 비동기 컨텍스트 매니저를 반환합니다."""
+    return provider_limits.get(name).slot_async()
@@ -0,0 +1,72 @@
+"""
+Replicate 예측 실행 (생성만 재시도하고 결과는 폴링)
+
+replicate.run은 예측 생성과 완료 대기를 한 번에 하므로 call()로 감싸면
+대기 중의 5xx/연결 오류/타임아웃에도 유료 예측을 처음부터 다시 만들게 됩니다.
+여기서는 생성 요청만 재시도하고, 이미 만든 예측은 상태 조회(GET)만 재시도하면서 완료를 기다립니다.
+deadline_scope 안에서는 데드라인이 지나면 예측을 취소하고 DeadlineExceededError를 올립니다.
+
+    output = run_prediction(replicate_client, "flux-kontext-apps/cartoonify", {"input_image": url})
+"""
+
+import os
+import time
+
+from replicate.exceptions import ModelError
+from replicate.helpers import transform_output
+
+from provider_limits import limit
+from resilience import DeadlineExceededError, call, remaining_time
+
+REPLICATE_POLL_INTERVAL = float(os.getenv("REPLICATE_POLL_INTERVAL", "0.5"))  # 상태 조회 간격(초)
+
+TERMINAL_STATUSES = ("succeeded", "failed", "canceled")
+
+
+def run_prediction(client, model: str, input_data: dict):
+    """
+    모델 예측을 만들고 완료될 때까지 기다립니다.
+
+    Args:
+        client: replicate.Client
+        model (str): "owner/name" 형식의 모델 이름
+        input_data (dict): 모델 입력
+
+    Returns:
+        replicate.run과 같은 형태의 출력 (파일은 FileOutput)
+
+    Raises:
+        ModelError: 예측이 실패하거나 취소된 경우
+        DeadlineExceededError: 완료 전에 데드라인이 지난 경우 (예측은 취소 요청)
+    """
+    def create():
+        with limit("replicate"):
+            return client.models.predictions.create(model=model, input=input_data)
+
+    prediction = call("replicate", create)
+    print(f"[REPLICATE] 예측 생성: {prediction.id} ({model})")
+
+    try:
+        while prediction.status not in TERMINAL_STATUSES:
+            remaining = remaining_time()
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceededError(f"replicate 예측 {prediction.id}이 데드라인 안에 끝나지 않았습니다.")
+            time.sleep(REPLICATE_POLL_INTERVAL if remaining is None else min(REPLICATE_POLL_INTERVAL, remaining))
+            # 상태 조회는 멱등이므로 조회만 재시도
+            call("replicate", prediction.reload)
+    except DeadlineExceededError:
+        _cancel(prediction)
+        raise
+
+    if prediction.status != "succeeded":
+        raise ModelError(prediction)
+    return transform_output(prediction.output, client)
+
+
+def _cancel(prediction):
+    """더 기다리지 않을 예측을 취소합니다. (실패해도 원래 오류를 올리도록 삼킴)"""
+    try:
+        prediction.cancel()
+        print(f"[REPLICATE] 데드라인 초과로 예측 취소: {prediction.id}")
+    except Exception as e:
+        print(f"[REPLICATE] 예측 취소 실패: {prediction.id}, 에러: {str(e) or type(e).__name__}")
@@ -0,0 +1,385 @@
+"""
+외부 API 호출 재시도 및 서킷 브레이커
+
+제공자 호출이 실패했을 때 고정 시간 sleep으로 재시도하거나 전체 타임아웃을 기다리는 대신,
+
+- 재시도 분류: 408/425/429/5xx, 연결 오류, 타임아웃은 재시도하고 그 밖의 4xx와 응답 해석 오류는 즉시 실패
+- 지수 백오프 + full jitter (Retry-After 헤더가 있으면 그 이상 대기)
+- 제공자별 서킷 브레이커: 재시도 가능한 실패가 연속 CIRCUIT_FAILURE_THRESHOLD번이면 CIRCUIT_OPEN_SECONDS 동안
+  호출을 바로 거절(CircuitOpenError)하고, 이후 반열림(half-open) 상태에서 소수의 탐색 호출로 회복 여부를 확인
+- 데드라인: deadline_scope 안에서는 남은 시간보다 긴 백오프를 하지 않고 마지막 오류를 그대로 올림
+
+설정: RETRY_POLICIES="replicate=3:2:30,gemini=2" (이름=최대 시도 횟수:기본 대기(초):최대 대기(초), 일부만 지정 가능)
+
+    result = call("openai", create_response)                # 동기 (스레드에서)
+    result = await call_async("gemini", generate_async)     # 비동기
+
+    with deadline_scope(120):
+        ...
+"""
+
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import NamedTuple, Optional
+
+from provider_limits import error_status_code, error_headers, retry_after_seconds
+
+
+class RetryPolicy(NamedTuple):
+    max_attempts: int               # 첫 호출을 포함한 최대 시도 횟수
+    base_delay: float               # 첫 재시도 전 최대 대기(초), 시도마다 2배
+    max_delay: float                # 재시도 간 최대 대기(초)
+    circuit_breaker: bool = True    # 제공자 서킷 브레이커 사용 여부
+
+
+# 제공자별 기본 정책
+RETRY_POLICY_DEFAULTS = {
+    "openai": RetryPolicy(3, 1.0, 20.0),
+    "replicate": RetryPolicy(3, 2.0, 30.0),
+    "gemini": RetryPolicy(3, 0.5, 10.0),
+    "rapidapi": RetryPolicy(2, 0.5, 5.0),      # 실패하면 배경 제거 라우터가 다른 엔진으로 대체
+    "supabase": RetryPolicy(3, 0.2, 5.0),
+    # 호스트가 요청마다 달라 한 호스트의 장애로 전체를 막지 않도록 브레이커 없이 재시도만
+    "image_download": RetryPolicy(3, 0.5, 5.0, circuit_breaker=False),
+}
+DEFAULT_RETRY_POLICY = RetryPolicy(3, 0.5, 10.0)
+RETRY_POLICIES_SPEC = os.getenv("RETRY_POLICIES", "")
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "1"))
+
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+# 상태 코드가 없는 예외 중 재시도할 예외 클래스 이름 (MRO 기준, 라이브러리를 import하지 않고 판별)
+RETRYABLE_ERROR_NAMES = {
+    "ConnectionError", "TimeoutError", "Timeout", "ConnectTimeout", "ReadTimeout",
+    "APIConnectionError", "APITimeoutError", "ClientConnectionError", "ClientPayloadError",
+    "ServerDisconnectedError", "ServerTimeoutError", "RemoteDisconnected", "ProtocolError",
+    "ChunkedEncodingError", "ServiceUnavailable", "InternalServerError", "DeadlineExceeded",
+    "NetworkError", "RemoteProtocolError",  # httpx (Replicate SDK)
+}
+
+
+class CircuitOpenError(Exception):
+    """서킷 브레이커가 열려 있어 호출하지 않고 바로 실패한 경우"""
+
+
+class DeadlineExceededError(Exception):
+    """요청/작업 데드라인이 지나 외부 호출을 시작하지 않은 경우"""
+
+
+def parse_policies(spec: str) -> dict:
+    """
+    'replicate=3:2:30,gemini=2' 형식의 설정을 {제공자: RetryPolicy}로 변환합니다.
+    생략한 값은 기본 정책 값을 사용합니다.
+
+    Raises:
+        ValueError: 형식이 잘못된 경우
+    """
+    policies = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, values = item.partition("=")
+        name = name.strip()
+        if not name or not values.strip():
+            raise ValueError(f"재시도 정책 설정 형식이 잘못되었습니다: {item!r} (예: replicate=3:2:30)")
+        default = RETRY_POLICY_DEFAULTS.get(name, DEFAULT_RETRY_POLICY)
+        parts = [part.strip() for part in values.split(":")]
+        policies[name] = default._replace(
+            max_attempts=max(1, int(parts[0])) if parts[0] else default.max_attempts,
+            base_delay=float(parts[1]) if len(parts) > 1 and parts[1] else default.base_delay,
+            max_delay=float(parts[2]) if len(parts) > 2 and parts[2] else default.max_delay
+        )
+    return policies
+
+
+RETRY_POLICIES = {**RETRY_POLICY_DEFAULTS, **parse_policies(RETRY_POLICIES_SPEC)}
+
+
+def policy_for(provider: str) -> RetryPolicy:
+    """제공자의 재시도 정책을 반환합니다."""
+    return RETRY_POLICIES.get(provider, DEFAULT_RETRY_POLICY)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    다시 시도하면 성공할 수 있는 오류인지 판별합니다.
+
+    Returns:
+        bool: 재시도 가능(일시적 오류)이면 True, 요청 자체의 문제이거나 판별할 수 없으면 False
+    """
+    if isinstance(error, (CircuitOpenError, DeadlineExceededError)):
+        return False
+    status_code = error_status_code(error)
+    if status_code is not None and 100 <= status_code < 600:
+        return status_code in RETRYABLE_STATUSES
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def backoff_delay(attempt: int, policy: RetryPolicy, error: Optional[BaseException] = None) -> float:
+    """
+    attempt번째 시도가 실패한 뒤 기다릴 시간을 계산합니다. (지수 백오프 + full jitter)
+    예외에 Retry-After 헤더가 있으면 그보다 짧게 기다리지 않습니다.
+    """
+    ceiling = min(policy.max_delay, policy.base_delay * 2 ** (attempt - 1))
+    delay = random.uniform(0, ceiling)
+    if error is not None:
+        retry_after = retry_after_seconds(error_headers(error))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, policy.max_delay))
+    return delay
+
+
+# 데드라인 (time.monotonic 기준 절대 시각, 컨텍스트별)
+_deadline: contextvars.ContextVar = contextvars.ContextVar("resilience_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """
+    이 구간 안의 외부 호출이 지켜야 할 데드라인을 설정합니다. 바깥 데드라인보다 늘어나지는 않습니다.
+    실행기 스레드로 넘길 때는 contextvars.copy_context()로 컨텍스트를 복사해야 전달됩니다.
+    """
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """현재 데드라인까지 남은 시간(초)을 반환합니다. (데드라인이 없으면 None)"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class CircuitBreaker:
+    """제공자 하나의 서킷 브레이커 (closed → open → half_open → closed)"""
+
+    def __init__(self, name: str,
+                 failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 open_seconds: float = CIRCUIT_OPEN_SECONDS,
+                 half_open_probes: int = CIRCUIT_HALF_OPEN_PROBES):
+        """
+        Args:
+            name (str): 제공자 이름
+            failure_threshold (int): 열림으로 바꿀 연속 실패 횟수
+            open_seconds (float): 열림 상태 유지 시간(초), 지나면 반열림
+            half_open_probes (int): 반열림 상태에서 동시에 허용할 탐색 호출 수
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.opened = 0
+
+    def allow(self) -> bool:
+        """호출을 진행해도 되는지 확인합니다. 반열림 상태에서는 탐색 호출 수만큼만 허용합니다."""
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    return False
+                self.state = "half_open"
+                self._probes = 0
+                print(f"[CIRCUIT] {self.name} 반열림 - 탐색 호출 허용")
+            if self.state == "half_open":
+                if self._probes >= self.half_open_probes:
+                    return False
+                self._probes += 1
+            return True
+
+    def record_success(self):
+        """제공자가 응답했음을 기록합니다. (반열림이면 닫힘으로 회복)"""
+        with self._lock:
+            if self.state != "closed":
+                print(f"[CIRCUIT] {self.name} 닫힘 - 제공자 회복")
+            self.state = "closed"
+            self._consecutive_failures = 0
+            self._probes = 0
+
+    def record_failure(self):
+        """재시도 가능한 실패(제공자 장애)를 기록합니다."""
+        with self._lock:
+            self._consecutive_failures += 1
+            if self.state == "half_open" or self._consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opened += 1
+                    print(f"[CIRCUIT] {self.name} 열림 - {self.open_seconds:g}초 동안 호출 차단 "
+                          f"(연속 실패 {self._consecutive_failures}회)")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self._consecutive_failures,
+                "opened": self.opened,
+                "open_remaining_seconds": round(max(0.0, self._opened_at + self.open_seconds - time.monotonic()), 3)
+                if self.state == "open" else 0.0
+            }
+
+
+_breakers = {}
+_stats = {}
+_lock = threading.Lock()
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """제공자의 서킷 브레이커를 반환합니다. (처음 사용할 때 생성)"""
+    with _lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = CircuitBreaker(provider)
+            _breakers[provider] = breaker
+        return breaker
+
+
+def _record(provider: str, outcome: str):
+    with _lock:
+        stats = _stats.setdefault(provider, {
+            "calls": 0, "successes": 0, "retries": 0, "retryable_failures": 0,
+            "fatal_failures": 0, "short_circuited": 0, "deadline_exceeded": 0
+        })
+        stats[outcome] += 1
+
+
+def _before_attempt(provider: str, breaker: Optional[CircuitBreaker]):
+    """데드라인과 서킷 브레이커를 확인합니다."""
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        _record(provider, "deadline_exceeded")
+        raise DeadlineExceededError(f"{provider} 호출 전에 데드라인이 지났습니다.")
+    if breaker is not None and not breaker.allow():
+        _record(provider, "short_circuited")
+        raise CircuitOpenError(f"{provider} 서킷 브레이커가 열려 있어 호출하지 않습니다.")
+    _record(provider, "calls")
+
+
+def _after_failure(provider: str, breaker: Optional[CircuitBreaker], error: Exception,
+                   attempt: int, attempts: int, policy: RetryPolicy) -> Optional[float]:
+    """
+    실패를 기록하고 재시도 전 대기 시간을 반환합니다.
+
+    Returns:
+        Optional[float]: 대기 시간(초), 재시도하지 않아야 하면 None
+    """
+    retryable = is_retryable(error)
+    if breaker is not None:
+        if retryable:
+            breaker.record_failure()
+        else:
+            # 요청 자체의 오류라도 제공자는 응답한 것이므로 장애로 보지 않음
+            breaker.record_success()
+
+    if not retryable:
+        _record(provider, "fatal_failures")
+        return None
+    _record(provider, "retryable_failures")
+    if attempt >= attempts:
+        return None
+
+    delay = backoff_delay(attempt, policy, error)
+    remaining = remaining_time()
+    if remaining is not None and delay >= remaining:
+        print(f"[RETRY] {provider} 남은 시간({max(0.0, remaining):.1f}초)이 부족해 재시도하지 않음: {str(error) or type(error).__name__}")
+        return None
+
+    _record(provider, "retries")
+    print(f"[RETRY] {provider} 시도 {attempt}/{attempts} 실패 - {delay:.2f}초 후 재시도: {str(error) or type(error).__name__}")
+    return delay
+
+
+def call(provider: str, func, *args, retry: bool = True):
+    """
+    동기 함수로 제공자를 호출합니다. 일시적 오류는 정책에 따라 백오프 후 재시도합니다.
+
+    Args:
+        provider (str): 제공자 이름 (정책과 서킷 브레이커 선택)
+        func: 호출할 함수
+        *args: 함수 인자
+        retry (bool): False면 한 번만 시도 (멱등성이 없는 호출)
+
+    Raises:
+        CircuitOpenError: 서킷 브레이커가 열려 있는 경우
+        DeadlineExceededError: 호출 전에 데드라인이 지난 경우
+        Exception: 재시도하지 않는 오류 또는 마지막 시도의 오류
+    """
+    policy = policy_for(provider)
+    attempts = policy.max_attempts if retry else 1
+    breaker = get_breaker(provider) if policy.circuit_breaker else None
+    for attempt in range(1, attempts + 1):
+        _before_attempt(provider, breaker)
+        try:
+            result = func(*args)
+        except Exception as e:
+            delay = _after_failure(provider, breaker, e, attempt, attempts, policy)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
+        if breaker is not None:
+            breaker.record_success()
+        _record(provider, "successes")
+        return result
+
+
+async def call_async(provider: str, func, *args, retry: bool = True):
+    """
+    코루틴 함수로 제공자를 호출합니다. 재시도 대기 동안 이벤트 루프를 막지 않습니다.
+
+    Args:
+        provider (str): 제공자 이름 (정책과 서킷 브레이커 선택)
+        func: 호출할 코루틴 함수
+        *args: 함수 인자
+        retry (bool): False면 한 번만 시도 (멱등성이 없는 호출)
+    """
+    policy = policy_for(provider)
+    attempts = policy.max_attempts if retry else 1
+    breaker = get_breaker(provider) if policy.circuit_breaker else None
+    for attempt in range(1, attempts + 1):
+        _before_attempt(provider, breaker)
+        try:
+            result = await func(*args)
+        except Exception as e:
+            delay = _after_failure(provider, breaker, e, attempt, attempts, policy)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        if breaker is not None:
+            breaker.record_success()
+        _record(provider, "successes")
+        return result
+
+
+def stats() -> dict:
+    """제공자별 호출/재시도/실패 통계와 서킷 브레이커 상태를 반환합니다."""
+    with _lock:
+        providers = set(_stats) | set(_breakers)
+        call_stats = {provider: dict(_stats.get(provider, {})) for provider in providers}
+        breakers = dict(_breakers)
+    return {
+        provider: {
+            **call_stats[provider],
+            "circuit": breakers[provider].stats() if provider in breakers else None
+        }
+        for provider in sorted(providers)
+    }
@@ -0,0 +1,218 @@
+"""
+Supabase 스토리지/DB 게이트웨이
+
+create_client를 호출할 때마다 새 HTTP 세션이 만들어지므로,
+프로세스당 한 번만 클라이언트를 생성하고 모든 업로드/조회/업데이트에서 재사용합니다.
+동기 메서드는 스레드 풀 작업에서, *_async 메서드는 이벤트 루프에서 사용합니다.
+작업별 호출 수, 오류 수, 지연시간을 집계합니다.
+네트워크 호출은 "supabase" 제공자 제한기(provider_limits)를 거치고, 일시적 오류는 resilience 정책에 따라 재시도합니다.
+(행 삽입은 중복될 수 있으므로 재시도하지 않음)
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from supabase import create_client, Client
+
+from provider_limits import limit, limit_async
+from resilience import call, call_async
+
+
+class SupabaseGateway:
+    """프로세스 전역에서 공유하는 Supabase 클라이언트 래퍼"""
+
+    def __init__(self, url: str, key: str, executor=None):
+        """
+        Args:
+            url (str): Supabase 프로젝트 URL
+            key (str): Supabase 접근 키
+            executor: 비동기 메서드가 사용할 실행기 (None이면 이벤트 루프 기본 실행기)
+        """
+        self.client: Client = create_client(url, key)
+        self.executor = executor
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    @contextmanager
+    def _measure(self, operation: str):
+        """작업 지연시간과 성공/실패 여부를 기록합니다."""
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._stats_lock:
+                stat = self._stats.setdefault(operation, {
+                    "count": 0,
+                    "errors": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0
+                })
+                stat["count"] += 1
+                stat["total_ms"] += elapsed_ms
+                stat["max_ms"] = max(stat["max_ms"], elapsed_ms)
+                if failed:
+                    stat["errors"] += 1
+
+    def _apply_filters(self, query, filters: Optional[dict]):
+        """{컬럼: 값} 형태의 동등 조건을 쿼리에 적용합니다."""
+        for column, value in (filters or {}).items():
+            query = query.eq(column, value)
+        return query
+
+    def _call(self, operation: str, func, *args):
+        """작업을 실행하고 지연시간을 기록합니다. (제한기는 호출 측에서 잡음)"""
+        with self._measure(operation):
+            return func(*args)
+
+    def _limited(self, operation: str, func, *args, retry: bool = True):
+        """supabase 제공자 제한기를 거쳐 작업을 현재 스레드에서 실행합니다."""
+        def attempt():
+            with limit("supabase"):
+                return self._call(operation, func, *args)
+
+        return call("supabase", attempt, retry=retry)
+
+    async def _run(self, operation: str, func, *args, retry: bool = True):
+        """이벤트 루프에서 제한기 슬롯을 기다린 뒤 작업을 실행기에서 실행합니다."""
+        # supabase 클라이언트는 동기 방식이므로 실행기 스레드에서 실행
+        loop = asyncio.get_running_loop()
+
+        async def attempt():
+            async with limit_async("supabase"):
+                context = contextvars.copy_context()
+                return await loop.run_in_executor(
+                    self.executor, context.run, functools.partial(self._call, operation, func, *args)
+                )
+
+        return await call_async("supabase", attempt, retry=retry)
+
+    # 스토리지 작업
+    def _upload(self, bucket: str, path: str, data: bytes, content_type: Optional[str] = None,
+                upsert: bool = False):
+        file_options = {}
+        if content_type:
+            file_options["content-type"] = content_type
+        if upsert:
+            file_options["upsert"] = "true"
+        if file_options:
+            return self.client.storage.from_(bucket).upload(
+                path=path,
+                file=data,
+                file_options=file_options
+            )
+        return self.client.storage.from_(bucket).upload(path, data)
+
+    def _remove(self, bucket: str, paths: list):
+        return self.client.storage.from_(bucket).remove(paths)
+
+    def upload(self, bucket: str, path: str, data: bytes, content_type: Optional[str] = None,
+               upsert: bool = False):
+        """스토리지 버킷에 파일을 업로드하고 원본 응답을 반환합니다. (upsert면 같은 경로의 파일을 덮어씀)"""
+        return self._limited("storage.upload", self._upload, bucket, path, data, content_type, upsert)
+
+    def get_public_url(self, bucket: str, path: str):
+        """스토리지 파일의 공개 URL을 반환합니다. (로컬에서 URL만 만들므로 제한기를 거치지 않음)"""
+        with self._measure("storage.get_public_url"):
+            return self.client.storage.from_(bucket).get_public_url(path)
+
+    def remove(self, bucket: str, paths: list):
+        """스토리지 버킷에서 파일들을 삭제합니다."""
+        return self._limited("storage.remove", self._remove, bucket, paths)
+
+    # 테이블 작업
+    def _select(self, table: str, columns: str = "*", filters: Optional[dict] = None) -> list:
+        query = self._apply_filters(self.client.table(table).select(columns), filters)
+        return query.execute().data
+
+    def _insert(self, table: str, values: dict) -> list:
+        return self.client.table(table).insert(values).execute().data
+
+    def _update(self, table: str, values: dict, filters: Optional[dict] = None) -> list:
+        query = self._apply_filters(self.client.table(table).update(values), filters)
+        return query.execute().data
+
+    def select(self, table: str, columns: str = "*", filters: Optional[dict] = None) -> list:
+        """테이블을 조회하고 행 목록을 반환합니다."""
+        return self._limited("table.select", self._select, table, columns, filters)
+
+    def insert(self, table: str, values: dict) -> list:
+        """테이블에 행을 추가하고 추가된 행 목록을 반환합니다."""
+        return self._limited("table.insert", self._insert, table, values, retry=False)
+
+    def update(self, table: str, values: dict, filters: Optional[dict] = None) -> list:
+        """조건에 맞는 행을 업데이트하고 업데이트된 행 목록을 반환합니다."""
+        return self._limited("table.update", self._update, table, values, filters)
+
+    # 비동기 작업
+    async def upload_async(self, bucket: str, path: str, data: bytes, content_type: Optional[str] = None,
+                           upsert: bool = False):
+        return await self._run("storage.upload", self._upload, bucket, path, data, content_type, upsert)
+
+    async def get_public_url_async(self, bucket: str, path: str):
+        return self.get_public_url(bucket, path)
+
+    async def remove_async(self, bucket: str, paths: list):
+        return await self._run("storage.remove", self._remove, bucket, paths)
+
+    async def select_async(self, table: str, columns: str = "*", filters: Optional[dict] = None) -> list:
+        return await self._run("table.select", self._select, table, columns, filters)
+
+    async def insert_async(self, table: str, values: dict) -> list:
+        return await self._run("table.insert", self._insert, table, values, retry=False)
+
+    async def update_async(self, table: str, values: dict, filters: Optional[dict] = None) -> list:
+        return await self._run("table.update", self._update, table, values, filters)
+
+    def stats(self) -> dict:
+        """
+        작업별 지연시간 통계를 반환합니다.
+
+        Returns:
+            dict: {작업명: {count, errors, avg_ms, max_ms, total_ms}}
+        """
+        with self._stats_lock:
+            return {
+                operation: {
+                    "count": stat["count"],
+                    "errors": stat["errors"],
+                    "avg_ms": round(stat["total_ms"] / stat["count"], 2) if stat["count"] else 0.0,
+                    "max_ms": round(stat["max_ms"], 2),
+                    "total_ms": round(stat["total_ms"], 2)
+                }
+                for operation, stat in self._stats.items()
+            }
+
+
+_gateways = {}
+_gateways_lock = threading.Lock()
+
+
+def get_gateway(url: str, key: str, executor=None) -> SupabaseGateway:
+    """
+    (URL, 키) 조합마다 하나의 게이트웨이만 생성하여 반환합니다.
+
+    Args:
+        url (str): Supabase 프로젝트 URL
+        key (str): Supabase 접근 키
+        executor: 비동기 메서드가 사용할 실행기 (최초 생성 시에만 적용)
+
+    Returns:
+        SupabaseGateway: 공유 게이트웨이
+    """
+    with _gateways_lock:
+        gateway = _gateways.get((url, key))
+        if gateway is None:
+            print("[SUPABASE] Supabase 게이트웨이 생성")
+            gateway = SupabaseGateway(url, key, executor=executor)
+            _gateways[(url, key)] = gateway
+        return gateway
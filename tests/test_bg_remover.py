@@ -0,0 +1,88 @@
+"""
+bg_remover 마스크 예측 테스트
+
+u2net과 입출력 모양이 같은 작은 ONNX 모델(합성곱 + 시그모이드)로 rembg 세션을 만들고,
+기본 모드의 predict_masks / remove_background_batch가 rembg의 predict / remove와 같은 결과를 내는지 확인합니다.
+(실제 u2net 가중치는 테스트에서 내려받지 않음)
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+onnx = pytest.importorskip("onnx")
+ort = pytest.importorskip("onnxruntime")
+pytest.importorskip("rembg")
+Image = pytest.importorskip("PIL.Image")
+
+from onnx import TensorProto, helper, numpy_helper
+from rembg import remove
+from rembg.sessions.u2net import U2netSession
+
+import bg_remover
+
+MODEL_SIZE = 320
+
+
+def build_model(path, batch) -> str:
+    """(batch, 3, 320, 320) -> (batch, 1, 320, 320) 모델을 저장합니다. (batch가 문자열이면 동적 배치)"""
+    weights = np.random.default_rng(0).normal(size=(1, 3, 5, 5)).astype(np.float32)
+    graph = helper.make_graph(
+        [
+            helper.make_node("Conv", ["input.1", "W"], ["conv"], pads=[2, 2, 2, 2]),
+            helper.make_node("Sigmoid", ["conv"], ["output"]),
+        ],
+        "u2net_standin",
+        [helper.make_tensor_value_info("input.1", TensorProto.FLOAT, [batch, 3, MODEL_SIZE, MODEL_SIZE])],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, [batch, 1, MODEL_SIZE, MODEL_SIZE])],
+        [numpy_helper.from_array(weights, "W")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, str(path))
+    return str(path)
+
+
+@pytest.fixture
+def u2net_session(tmp_path, monkeypatch):
+    """가짜 가중치의 u2net 세션을 세션 관리자에 등록합니다."""
+    session = U2netSession.__new__(U2netSession)
+    session.model_name = "u2net"
+    session.inner_session = ort.InferenceSession(build_model(tmp_path / "u2net.onnx", 1))
+    monkeypatch.setitem(bg_remover.session_manager._sessions, "u2net", session)
+    return session
+
+
+def synthetic_image(width: int = 1200, height: int = 900) -> "Image.Image":
+    """리사이즈 방식 차이가 드러나도록 고주파 무늬가 섞인 RGB 이미지"""
+    rng = np.random.default_rng(1)
+    rows, cols = np.mgrid[:height, :width]
+    rgb = np.stack([(rows * 7) % 256, (cols * 5) % 256, (rows + cols) % 256], axis=-1).astype(np.int16)
+    rgb += rng.integers(-20, 21, size=rgb.shape)
+    return Image.fromarray(np.clip(rgb, 0, 255).astype(np.uint8), mode="RGB")
+
+
+def test_default_mask_matches_rembg_predict(u2net_session):
+    image = synthetic_image()
+
+    expected = np.asarray(u2net_session.predict(image)[0])
+    actual = np.asarray(bg_remover.predict_masks([image], "u2net")[0])
+
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_default_cutout_matches_rembg_remove(u2net_session):
+    image = synthetic_image()
+
+    expected = np.asarray(remove(image, session=u2net_session))
+    actual = np.asarray(bg_remover.remove_background_batch([image], "u2net", lowres=False)[0])
+
+    np.testing.assert_array_equal(actual, expected)
+
+
+@pytest.mark.parametrize("batch, expected", [(1, False), ("N", True)])
+def test_supports_batch_follows_model_batch_dim(tmp_path, monkeypatch, batch, expected):
+    session = U2netSession.__new__(U2netSession)
+    session.inner_session = ort.InferenceSession(build_model(tmp_path / "u2net.onnx", batch))
+    monkeypatch.setitem(bg_remover.session_manager._sessions, "u2net", session)
+
+    assert bg_remover.session_manager.supports_batch("u2net") is expected
@@ -0,0 +1,113 @@
+"""
+/cartoonize 동시 요청 중 이벤트 루프 응답성 부하 테스트
+
+제공자 호출(Replicate, 배경 제거, 캐릭터 조회)을 time.sleep으로 막히는 가짜 함수로 바꾸고
+여러 /cartoonize 요청을 동시에 보내는 동안 /health 지연시간의 p95를 측정합니다.
+블로킹 단계가 run_blocking(전용 스레드 풀)으로 실행되면 /health는 블로킹 시간과 무관하게 바로 응답해야 합니다.
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+pytest.importorskip("httpx")
+
+# 로컬 SQLite 캐시를 만들지 않도록 import 전에 비활성화
+os.environ.setdefault("FACE_CACHE_ENABLED", "0")
+os.environ.setdefault("TRANSLATION_CACHE_ENABLED", "0")
+
+import httpx
+
+main = pytest.importorskip("main")
+
+CONCURRENT_REQUESTS = 8
+BLOCKING_SECONDS = 0.5               # 가짜 제공자 호출 한 번이 스레드를 막는 시간
+HEALTH_INTERVAL_SECONDS = 0.02
+HEALTH_P95_LIMIT_SECONDS = 0.1
+
+
+def p95(values: list) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+@pytest.fixture
+def mocked_providers(monkeypatch):
+    """외부 제공자 호출을 블로킹 sleep으로 흉내 내는 가짜 함수로 바꿉니다."""
+    for name in ("GEMINI_API_KEY", "REPLICATE_API_TOKEN", "SUPABASE_URL", "SUPABASE_ACCESS_KEY", "RAPIDAPI_KEY"):
+        monkeypatch.setenv(name, "x" * 32)
+
+    def fetch_character_image(character_id):
+        time.sleep(BLOCKING_SECONDS)
+        return f"https://example.com/characters/{character_id}.png"
+
+    async def describe_face(image_url, custom_prompt=None):
+        return await main.run_blocking(lambda: time.sleep(BLOCKING_SECONDS) or "round face, big eyes")
+
+    async def prepare_prompt(custom_prompt):
+        return "waving hands", False
+
+    def generate_cartoon(character_image_url, face_description, translated_prompt):
+        time.sleep(BLOCKING_SECONDS)
+        return "https://example.com/result.png"
+
+    async def download_image(image_url):
+        return b"image"
+
+    def remove_background(image_data, image_url, preferred=None):
+        time.sleep(BLOCKING_SECONDS)
+        return b"png", "chroma_key"
+
+    async def upload_image(image_data, file_name=None):
+        return f"https://example.com/{file_name}"
+
+    monkeypatch.setattr(main, "get_random_character_image", fetch_character_image)
+    monkeypatch.setattr(main, "describe_face_simple", describe_face)
+    monkeypatch.setattr(main, "prepare_custom_prompt", prepare_prompt)
+    monkeypatch.setattr(main, "generate_cartoon_with_replicate", generate_cartoon)
+    monkeypatch.setattr(main, "download_image_from_url_async", download_image)
+    monkeypatch.setattr(main.background_removal_router, "remove", remove_background)
+    monkeypatch.setattr(main, "upload_image_to_supabase", upload_image)
+    monkeypatch.setattr(main, "BG_AUTOCROP", False)
+
+
+async def measure_health_during_cartoonize() -> tuple:
+    """동시 /cartoonize 요청이 끝날 때까지 /health를 반복 호출하여 지연시간 목록과 응답들을 반환합니다."""
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+        payload = {
+            "image_url": "https://example.com/face.jpg",
+            "character_id": "1",
+            "custom_prompt": "손을 흔드는 모습",
+            "fused": False
+        }
+        cartoonize = asyncio.gather(*(
+            client.post("/cartoonize", json=payload) for _ in range(CONCURRENT_REQUESTS)
+        ))
+        cartoonize_task = asyncio.ensure_future(cartoonize)
+
+        latencies = []
+        while not cartoonize_task.done():
+            start = time.perf_counter()
+            response = await client.get("/health")
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200
+            await asyncio.sleep(HEALTH_INTERVAL_SECONDS)
+        return latencies, await cartoonize_task
+
+
+def test_health_stays_responsive_during_concurrent_cartoonize(mocked_providers):
+    started = time.perf_counter()
+    latencies, responses = asyncio.run(measure_health_during_cartoonize())
+    elapsed = time.perf_counter() - started
+
+    assert all(response.status_code == 200 and response.json()["success"] for response in responses)
+    # 요청마다 블로킹 단계가 3번(병렬 단계 1번 + 이미지 생성 + 배경 제거) 있으므로
+    # 순차 실행이었다면 CONCURRENT_REQUESTS * 3 * BLOCKING_SECONDS가 걸림
+    assert elapsed < CONCURRENT_REQUESTS * 3 * BLOCKING_SECONDS / 2
+    assert len(latencies) >= 10
+    health_p95 = p95(latencies)
+    print(f"/health p95: {health_p95 * 1000:.1f}ms ({len(latencies)}회, 전체 {elapsed:.2f}초)")
+    assert health_p95 < HEALTH_P95_LIMIT_SECONDS
@@ -0,0 +1,47 @@
+"""
+gemini_remove_bg 마스크 생성 테스트
+
+벡터화된 create_mask_from_analysis가 이전 픽셀 루프 방식(create_mask_per_pixel)과 같은 마스크를 만드는지 확인합니다.
+"""
+
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+pytest.importorskip("cv2")
+pytest.importorskip("google.generativeai")
+Image = pytest.importorskip("PIL.Image")
+
+from gemini_remove_bg import create_mask_from_analysis, create_mask_per_pixel
+
+
+def synthetic_image(height: int = 48, width: int = 40) -> "Image.Image":
+    """균일한 테두리 안에 배경색과 가깝거나 먼 픽셀이 섞인 이미지"""
+    rng = np.random.default_rng(0)
+    rgb = np.full((height, width, 3), 240, dtype=np.uint8)
+    # 임계값 경계 부근을 포함하도록 배경색 주변에서 무작위로 흔듦
+    noise = rng.integers(-60, 61, size=(height - 2, width - 2, 3))
+    rgb[1:-1, 1:-1] = np.clip(240 + noise, 0, 255)
+    return Image.fromarray(rgb, mode="RGB")
+
+
+def test_vectorized_mask_matches_per_pixel():
+    image = synthetic_image()
+
+    expected = np.asarray(create_mask_per_pixel(image))
+    actual = np.asarray(create_mask_from_analysis(image, "", flood_fill=False))
+
+    # 배경/전경이 모두 들어 있어야 비교가 의미 있음
+    assert (expected == 0).any() and (expected == 255).any()
+    np.testing.assert_array_equal(actual, expected)
+
+
+@pytest.mark.skipif(os.getenv("MASK_FLOOD_FILL") == "1", reason="MASK_FLOOD_FILL=1로 기본값을 바꾼 환경")
+def test_flood_fill_is_opt_in():
+    image = synthetic_image()
+
+    default = np.asarray(create_mask_from_analysis(image, ""))
+
+    np.testing.assert_array_equal(default, np.asarray(create_mask_per_pixel(image)))
@@ -0,0 +1,80 @@
+"""
+mask_engine 타일 단위 알파 계산 테스트
+
+큰 이미지에서도 임시 버퍼가 ALPHA_TILE_MAX_BYTES(max_bytes)를 넘지 않는지 tracemalloc으로 최대 메모리를 확인하고,
+타일 단위 블러가 전체 이미지에 한 번에 적용한 gaussian_filter와 같은지 확인합니다.
+"""
+
+import tracemalloc
+
+import pytest
+
+np = pytest.importorskip("numpy")
+ndimage = pytest.importorskip("scipy.ndimage")
+pytest.importorskip("PIL")
+
+from mask_engine import background_alpha_tiled, smooth_alpha_tiled
+
+HEIGHT, WIDTH = 3000, 2000           # 6MP: 타일 없이 계산하면 float32 버퍼 하나만 24MB (RGB 차이는 72MB)
+MAX_BYTES = 2 * 1024 * 1024
+# scipy가 타일 안에서 만드는 임시 복사본과 할당기 여유분
+SLACK_BYTES = MAX_BYTES + 1024 * 1024
+
+
+def synthetic_rgb() -> "np.ndarray":
+    """흰 배경 위에 어두운 원이 있는 (H, W, 3) uint8 이미지"""
+    rows, cols = np.ogrid[:HEIGHT, :WIDTH]
+    circle = (rows - HEIGHT // 2) ** 2 + (cols - WIDTH // 2) ** 2 < (min(HEIGHT, WIDTH) // 3) ** 2
+    rgb = np.full((HEIGHT, WIDTH, 3), 250, dtype=np.uint8)
+    rgb[circle] = (40, 60, 80)
+    return rgb
+
+
+def traced_peak(func, *args, **kwargs) -> tuple:
+    """함수 실행 중 새로 할당된 메모리의 최대치(bytes)와 결과를 반환합니다."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = func(*args, **kwargs)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def test_background_alpha_peak_memory_is_bounded():
+    rgb = synthetic_rgb()
+    color = np.array([250, 250, 250])
+
+    alpha, peak = traced_peak(background_alpha_tiled, rgb, color, 30.0, max_bytes=MAX_BYTES)
+
+    output_bytes = HEIGHT * WIDTH  # uint8 알파
+    assert peak < MAX_BYTES + output_bytes + SLACK_BYTES
+    assert alpha.dtype == np.uint8
+    assert alpha[0, 0] == 0
+    assert alpha[HEIGHT // 2, WIDTH // 2] == 255
+
+
+def test_smooth_alpha_peak_memory_is_bounded():
+    alpha = background_alpha_tiled(synthetic_rgb(), np.array([250, 250, 250]), 30.0)
+
+    smoothed, peak = traced_peak(smooth_alpha_tiled, alpha, 2.0, max_bytes=MAX_BYTES)
+
+    output_bytes = HEIGHT * WIDTH
+    assert peak < MAX_BYTES + output_bytes + SLACK_BYTES
+    assert smoothed.shape == alpha.shape
+    assert smoothed.dtype == np.uint8
+
+
+@pytest.mark.parametrize("sigma", [1.0, 2.0, 3.5])
+def test_smooth_alpha_tiled_matches_full_gaussian_filter(sigma):
+    rng = np.random.default_rng(0)
+    alpha = (rng.random((257, 61)) > 0.5).astype(np.uint8) * 255
+
+    # 타일이 여러 개가 되도록 작은 버퍼 상한 사용
+    tiled = smooth_alpha_tiled(alpha, sigma, max_bytes=61 * 8 * 48)
+
+    full = ndimage.gaussian_filter(alpha.astype(np.float32), sigma=sigma)
+    expected = np.clip(full, 0, 255).astype(np.uint8)
+    np.testing.assert_array_equal(tiled, expected)
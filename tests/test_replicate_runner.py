@@ -0,0 +1,84 @@
+"""
+Replicate 예측 실행(run_prediction) 테스트
+
+폴링 중 일시적 오류가 나도 예측을 새로 만들지 않고 상태 조회만 재시도하는지,
+데드라인이 지나면 예측을 취소하는지 가짜 클라이언트로 확인합니다.
+"""
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("replicate")
+
+import replicate_runner
+import resilience
+from replicate.exceptions import ModelError
+from resilience import DeadlineExceededError, deadline_scope
+
+
+class FakePrediction:
+    def __init__(self, statuses: list, reload_errors: int = 0):
+        self.id = "prediction-1"
+        self.statuses = list(statuses)
+        self.status = self.statuses.pop(0)
+        self.output = "https://example.com/output.jpg"
+        self.error = "model failed"
+        self.reload_errors = reload_errors
+        self.canceled = False
+
+    def reload(self):
+        if self.reload_errors:
+            self.reload_errors -= 1
+            raise httpx.ConnectError("connection reset")
+        if self.statuses:
+            self.status = self.statuses.pop(0)
+
+    def cancel(self):
+        self.canceled = True
+
+
+class FakeClient:
+    """client.models.predictions.create(...)만 흉내 내는 가짜 클라이언트"""
+
+    def __init__(self, prediction: FakePrediction):
+        self.prediction = prediction
+        self.creates = 0
+        self.models = self
+        self.predictions = self
+
+    def create(self, model, input):
+        self.creates += 1
+        return self.prediction
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(replicate_runner, "REPLICATE_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(resilience.time, "sleep", lambda seconds: None)
+
+
+def test_poll_errors_do_not_create_a_new_prediction():
+    client = FakeClient(FakePrediction(["starting", "processing", "succeeded"], reload_errors=2))
+
+    output = replicate_runner.run_prediction(client, "owner/model", {"prompt": "x"})
+
+    assert client.creates == 1
+    assert output.url == "https://example.com/output.jpg"
+
+
+def test_failed_prediction_raises_model_error():
+    client = FakeClient(FakePrediction(["starting", "failed"]))
+
+    with pytest.raises(ModelError):
+        replicate_runner.run_prediction(client, "owner/model", {})
+    assert client.creates == 1
+
+
+def test_prediction_is_canceled_after_deadline():
+    prediction = FakePrediction(["starting"] * 1000)
+    client = FakeClient(prediction)
+
+    with deadline_scope(0.05), pytest.raises(DeadlineExceededError):
+        replicate_runner.run_prediction(client, "owner/model", {})
+    assert prediction.canceled
+    assert client.creates == 1
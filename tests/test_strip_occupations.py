@@ -0,0 +1,51 @@
+"""
+영어 프롬프트 직업 표현 제거(strip_occupations) 테스트
+
+직업 표현만 있는 프롬프트는 빈 문자열이 되고(prepare_custom_prompt가 중립 프롬프트로 대체),
+소유격은 단어 중간에서 잘리지 않고 통째로 제거되는지 확인합니다.
+"""
+
+import asyncio
+import os
+
+import pytest
+
+# 로컬 SQLite 캐시를 만들지 않도록 import 전에 비활성화
+os.environ.setdefault("FACE_CACHE_ENABLED", "0")
+os.environ.setdefault("TRANSLATION_CACHE_ENABLED", "0")
+
+main = pytest.importorskip("main")
+
+
+@pytest.mark.parametrize("prompt", [
+    "as a doctor",
+    "Actor",
+    "as a doctor.",
+    "dressed as a navy officer",
+    "teachers and doctors",
+])
+def test_occupation_only_prompt_becomes_empty(prompt):
+    assert main.strip_occupations(prompt) == ""
+
+
+@pytest.mark.parametrize("prompt, expected", [
+    ("wearing a painter's hat", "wearing a hat"),
+    ("the officers' cap", "the cap"),
+    ("smiling police officer waving, wearing glasses", "smiling waving, wearing glasses"),
+    ("dressed as a navy officer, smiling.", "smiling."),
+    ("a doctor and smiling", "smiling"),
+])
+def test_occupation_is_removed(prompt, expected):
+    assert main.strip_occupations(prompt) == expected
+
+
+@pytest.mark.parametrize("prompt", ["waving hands!", "android waving", "sandy hair"])
+def test_prompt_without_occupation_is_unchanged(prompt):
+    assert main.strip_occupations(prompt) == prompt
+
+
+def test_prepare_custom_prompt_uses_neutral_prompt_when_everything_is_stripped():
+    prompt, skipped = asyncio.run(main.prepare_custom_prompt("as a doctor"))
+
+    assert skipped
+    assert prompt == main.NEUTRAL_PROMPT
@@ -0,0 +1,134 @@
+"""
+프롬프트 번역 캐시
+
+실제 트래픽은 "손 들기", "웃는 얼굴" 같은 소수의 행동 프롬프트를 반복 사용하므로,
+공백/문장부호를 정규화한 프롬프트를 키로 번역 결과를 저장합니다.
+
+- 1단계: 메모리 LRU
+- 2단계: SQLite (재시작 후에도 유지)
+- 자주 쓰는 프롬프트 파일로 일괄 사전 적재(pre-warm) 지원
+"""
+
+import os
+import re
+import unicodedata
+from typing import Callable, Optional
+
+from cache_store import LRUCache, SQLiteKVStore
+
+# 캐시 설정
+TRANSLATION_CACHE_ENABLED = os.getenv("TRANSLATION_CACHE_ENABLED", "1") == "1"
+TRANSLATION_CACHE_MEMORY_SIZE = int(os.getenv("TRANSLATION_CACHE_MEMORY_SIZE", "4096"))
+TRANSLATION_CACHE_MAX_ROWS = int(os.getenv("TRANSLATION_CACHE_MAX_ROWS", "100000"))
+TRANSLATION_CACHE_TTL = float(os.getenv("TRANSLATION_CACHE_TTL", str(30 * 24 * 3600)))  # 기본 30일
+TRANSLATION_CACHE_DB_PATH = os.getenv("TRANSLATION_CACHE_DB_PATH", "cache/translations.sqlite3")
+TRANSLATION_PREWARM_FILE = os.getenv("TRANSLATION_PREWARM_FILE")
+
+# 의미에 영향을 주지 않는 문장부호 (정규화 시 제거)
+_TRAILING_PUNCTUATION = ".,!?~…。、·"
+_QUOTE_TRANSLATION = str.maketrans({
+    "“": '"', "”": '"', "‘": "'", "’": "'", "「": '"', "」": '"'
+})
+_WHITESPACE_RE = re.compile(r"\s+")
+_REPEATED_PUNCTUATION_RE = re.compile(r"([!?.~,])\1+")
+_SPACE_BEFORE_PUNCTUATION_RE = re.compile(r"\s+([!?.~,])")
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    캐시 키로 사용할 수 있도록 프롬프트를 정규화합니다.
+
+    - 유니코드 NFKC 정규화 (전각 문자 등)
+    - 따옴표 통일, 반복 문장부호 축약, 문장부호 앞 공백 제거
+    - 연속 공백을 하나로, 앞뒤 공백 및 끝 문장부호 제거
+    - 영문은 소문자로 변환
+
+    Args:
+        text (str): 원본 프롬프트
+
+    Returns:
+        str: 정규화된 프롬프트
+    """
+    normalized = unicodedata.normalize("NFKC", text).translate(_QUOTE_TRANSLATION)
+    normalized = _REPEATED_PUNCTUATION_RE.sub(r"\1", normalized)
+    normalized = _SPACE_BEFORE_PUNCTUATION_RE.sub(r"\1", normalized)
+    normalized = _WHITESPACE_RE.sub(" ", normalized).strip()
+    normalized = normalized.rstrip(_TRAILING_PUNCTUATION).strip()
+    return normalized.lower()
+
+
+class TranslationCache:
+    """메모리 LRU + SQLite 2단계 번역 캐시"""
+
+    def __init__(self,
+                 db_path: str = TRANSLATION_CACHE_DB_PATH,
+                 memory_size: int = TRANSLATION_CACHE_MEMORY_SIZE,
+                 max_rows: int = TRANSLATION_CACHE_MAX_ROWS,
+                 ttl_seconds: float = TRANSLATION_CACHE_TTL):
+        self.memory = LRUCache(max_entries=memory_size, ttl_seconds=ttl_seconds)
+        self.store = SQLiteKVStore(db_path, "translations", max_rows=max_rows, ttl_seconds=ttl_seconds)
+        self.prewarmed = 0
+
+    def get(self, text: str) -> Optional[str]:
+        """캐시된 번역을 조회합니다. 없으면 None을 반환합니다."""
+        key = normalize_prompt(text)
+        translation = self.memory.get(key)
+        if translation is not None:
+            return translation
+
+        translation = self.store.get(key)
+        if translation is not None:
+            self.memory.put(key, translation)
+        return translation
+
+    def put(self, text: str, translation: str):
+        """번역 결과를 메모리와 SQLite에 저장합니다."""
+        key = normalize_prompt(text)
+        self.memory.put(key, translation)
+        self.store.put(key, translation)
+
+    def prewarm_from_file(self, path: str, translate_fn: Callable[[str], Optional[str]]) -> int:
+        """
+        자주 쓰는 프롬프트 목록 파일(한 줄에 하나, '#'으로 시작하면 주석)을 읽어
+        캐시에 없는 프롬프트만 번역하여 일괄 저장합니다.
+
+        Args:
+            path (str): 프롬프트 목록 파일 경로
+            translate_fn: 캐시를 거치지 않는 번역 함수
+
+        Returns:
+            int: 새로 번역하여 저장한 프롬프트 수
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+
+        pending = {}
+        for line in lines:
+            if not line or line.startswith("#"):
+                continue
+            key = normalize_prompt(line)
+            if key and key not in pending and self.store.get(key) is None:
+                pending[key] = line
+
+        print(f"[TRANSLATION_CACHE] 사전 적재 대상: {len(pending)}개 (파일: {path})")
+
+        translated = []
+        for key, original in pending.items():
+            translation = translate_fn(original)
+            if translation:
+                translated.append((key, translation))
+                self.memory.put(key, translation)
+
+        if translated:
+            self.store.put_many(translated)
+        self.prewarmed += len(translated)
+        print(f"[TRANSLATION_CACHE] 사전 적재 완료: {len(translated)}개")
+        return len(translated)
+
+    def stats(self) -> dict:
+        """캐시 적중/제거 통계를 반환합니다."""
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.store.stats(),
+            "prewarmed": self.prewarmed
+        }
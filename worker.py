@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+작업 대기열 워커 데몬
+
+API 프로세스(app.py)는 작업을 대기열에 등록만 하고(JOB_EMBEDDED_WORKER=0),
+이 프로세스가 공유 대기열(JOB_QUEUE_DB_PATH)에서 얼굴 스왑, 캐리커쳐 변환, 배경 제거 작업을 가져와 처리합니다.
+웹 계층(gunicorn 워커 수)과 워커 계층(이 프로세스 수 × 작업 종류별 JOB_TYPE_CONCURRENCY)을 따로 늘릴 수 있습니다.
+
+    python worker.py                                   # 모든 작업 종류 처리
+    JOB_WORKER_TYPES=background_removal python worker.py  # 배경 제거 작업만 처리
+
+SIGTERM/SIGINT를 받으면 새 작업 임대를 멈추고 처리 중인 작업이 끝날 때까지 기다린 뒤 종료합니다.
+(실행기 스레드는 중단할 수 없으므로 작업을 대기열로 되돌리지 않음, 강제 종료되면 임대 만료 후 다른 워커가 회수)
+"""
+
+import asyncio
+import os
+import signal
+
+from app import JOB_HANDLERS, bg_worker_pool
+from executor_pools import executor_pools
+from http_client import close_all_http_sessions
+from job_queue import job_queue, JobWorker
+
+# 처리할 작업 종류 (쉼표 구분, 비어 있으면 전체)
+JOB_WORKER_TYPES = [name.strip() for name in os.getenv("JOB_WORKER_TYPES", "").split(",") if name.strip()]
+
+
+async def run_worker():
+    """워커 루프를 실행하고 종료 신호를 받을 때까지 기다립니다."""
+    unknown = [name for name in JOB_WORKER_TYPES if name not in JOB_HANDLERS]
+    if unknown:
+        raise ValueError(f"알 수 없는 작업 종류입니다: {unknown} (사용 가능: {', '.join(JOB_HANDLERS)})")
+    handlers = {name: JOB_HANDLERS[name] for name in (JOB_WORKER_TYPES or JOB_HANDLERS)}
+
+    if "background_removal" in handlers:
+        print("[WORKER] 배경 제거 워커 풀 시작")
+        await bg_worker_pool.start()
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    worker = JobWorker(job_queue, handlers)
+    worker.start()
+    try:
+        await stop_event.wait()
+        print("[WORKER] 종료 신호 수신 - 처리 중인 작업을 기다린 뒤 종료")
+    finally:
+        await worker.stop()
+        executor_pools.shutdown(wait=True)
+        bg_worker_pool.shutdown()
+        await close_all_http_sessions()
+        print(f"[WORKER] 워커 종료: {worker.stats()}")
+
+
+if __name__ == "__main__":
+    print(f"[WORKER] 작업 대기열 워커 시작: pid={os.getpid()}, 대기열={job_queue.db_path}")
+    asyncio.run(run_worker())